@@ -0,0 +1,144 @@
+"""
+Micro-batching Scheduler
+------------------------
+Collects requests that arrive within a short window and hands them to a batch function
+in a single call, returning each result to its waiting caller.
+
+Used to serve concurrent chatbot requests with one padded `generate` call instead of
+running the model once per HTTP request.
+"""
+
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+
+
+class _PendingRequest:
+    __slots__ = ("item", "enqueued_at", "done", "result", "error")
+
+    def __init__(self, item):
+        self.item = item
+        self.enqueued_at = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class BatchScheduler:
+    """
+    Groups submitted items into batches and processes them on a background thread.
+
+    Args:
+        batch_fn (callable): Takes a list of items and returns a list of results in the same order.
+        max_batch_size (int): Maximum number of items passed to `batch_fn` at once.
+        max_wait_ms (float): How long to wait for more items after the first one arrives.
+        name (str): Name of the worker thread, used in logs.
+    """
+
+    def __init__(self, batch_fn, max_batch_size=8, max_wait_ms=25, name="batch-scheduler"):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.name = name
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._batch_sizes = Counter()
+        self._requests = 0
+        self._total_wait = 0.0
+        self._max_wait_seen = 0.0
+        self._total_batch_seconds = 0.0
+        self._errors = 0
+
+    def start(self):
+        """Starts the worker thread if it is not already running."""
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def submit(self, item, timeout=None):
+        """
+        Queues an item and blocks until its result is ready.
+
+        Args:
+            item: The request payload passed to `batch_fn`.
+            timeout (float): Seconds to wait for the result. None waits indefinitely.
+
+        Returns:
+            The result produced by `batch_fn` for this item.
+
+        Raises:
+            TimeoutError: If the result is not ready within `timeout`.
+            Exception: Any error raised by `batch_fn` for the batch containing this item.
+        """
+        self.start()
+        pending = _PendingRequest(item)
+        self._queue.put(pending)
+        if not pending.done.wait(timeout):
+            raise TimeoutError(f"{self.name}: no result within {timeout}s")
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _collect_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            started = time.perf_counter()
+            waits = [started - pending.enqueued_at for pending in batch]
+            try:
+                results = self.batch_fn([pending.item for pending in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(f"{self.name}: batch function returned {len(results)} results for {len(batch)} items")
+                for pending, result in zip(batch, results):
+                    pending.result = result
+            except Exception as e:
+                logging.error(f"{self.name}: batch of {len(batch)} failed: {e}")
+                for pending in batch:
+                    pending.error = e
+                with self._stats_lock:
+                    self._errors += 1
+            finally:
+                elapsed = time.perf_counter() - started
+                with self._stats_lock:
+                    self._batch_sizes[len(batch)] += 1
+                    self._requests += len(batch)
+                    self._total_wait += sum(waits)
+                    self._max_wait_seen = max(self._max_wait_seen, max(waits))
+                    self._total_batch_seconds += elapsed
+                for pending in batch:
+                    pending.done.set()
+
+    def stats(self):
+        """Returns batch-size distribution, queue-wait and throughput statistics."""
+        with self._stats_lock:
+            batches = sum(self._batch_sizes.values())
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": round(self.max_wait * 1000, 1),
+                "queue_depth": self._queue.qsize(),
+                "requests": self._requests,
+                "batches": batches,
+                "errors": self._errors,
+                "avg_batch_size": round(self._requests / batches, 2) if batches else 0,
+                "batch_size_histogram": {str(size): count for size, count in sorted(self._batch_sizes.items())},
+                "avg_queue_wait_ms": round(self._total_wait / self._requests * 1000, 2) if self._requests else 0,
+                "max_queue_wait_ms": round(self._max_wait_seen * 1000, 2),
+                "avg_batch_seconds": round(self._total_batch_seconds / batches, 3) if batches else 0,
+            }
@@ -0,0 +1,322 @@
+"""
+Berth Scheduling
+----------------
+Conflict-free berth allocation that minimizes total vessel waiting time.
+
+Each call has an ETA, a service duration and the vessel's length (and optionally draft);
+each berth has a length, an optional maximum draft and the time it becomes available.
+A call can only use a berth it fits, starts no earlier than its ETA and occupies the berth
+until its service ends, so no two calls ever overlap on a berth.
+
+Planning is a list-scheduling heuristic: calls are inserted in a priority order onto the
+compatible berth where they can start earliest (ties go to the shortest fitting berth, to
+keep long berths free for long vessels). A few priority orders are tried and the best
+schedule kept, then adjacent calls on each berth are swapped while that reduces waiting.
+Each pass is O(calls x berths); 10,000 calls over 30 berths plan in about a second.
+
+`replan` handles a changed ETA incrementally: the call is moved to the cheapest position in
+the existing schedule and only the calls queued behind it are re-timed.
+
+Times are plain numbers (hours from the start of the planning horizon, or epoch seconds);
+service durations use the same unit.
+"""
+
+import random
+import time
+
+
+def _fits(call, berth):
+    if call.get("length", 0) > berth.get("length", float("inf")):
+        return False
+    if call.get("draft", 0) > berth.get("max_draft", float("inf")):
+        return False
+    return True
+
+
+def _summary(assignments, unassigned):
+    waits = [a["wait"] for a in assignments]
+    return {
+        "assignments": sorted(assignments, key=lambda a: (a["start"], a["berth"])),
+        "unassigned": unassigned,
+        "total_wait": round(sum(waits), 4),
+        "max_wait": round(max(waits), 4) if waits else 0,
+        "calls": len(assignments),
+    }
+
+
+class BerthScheduler:
+    """
+    Plans berth schedules for a fixed set of berths.
+
+    Args:
+        berths (list): Dicts with "name", "length" and optional "max_draft" and "available_from".
+        improvement_passes (int): Maximum rounds of adjacent-swap improvement per berth.
+    """
+
+    # Priority orders tried when planning: first come first served, then two orders that
+    # favour short services (which reduces the total waiting of the queue behind them)
+    PRIORITIES = {
+        "eta": lambda call: (call["eta"], call["duration"]),
+        "earliest_finish": lambda call: (call["eta"] + call["duration"], call["eta"]),
+        "eta_then_shortest": lambda call: (round(call["eta"]), call["duration"], call["eta"]),
+    }
+
+    def __init__(self, berths, improvement_passes=3):
+        if not berths:
+            raise ValueError("At least one berth is required")
+        self.berths = list(berths)
+        self.improvement_passes = improvement_passes
+        self.last_stats = {}
+
+    @staticmethod
+    def _normalize(calls):
+        normalized = []
+        for call in calls:
+            if call.get("vessel") is None or call.get("eta") is None:
+                raise ValueError("Each call needs a vessel and an eta")
+            duration = call.get("duration", call.get("service_hours"))
+            if duration is None or duration < 0:
+                raise ValueError(f"Call for {call['vessel']} needs a non-negative duration")
+            normalized.append({**call, "eta": float(call["eta"]), "duration": float(duration)})
+        return normalized
+
+    def _insert(self, calls, free_at, order):
+        # List scheduling: each call goes to the fitting berth where it can start earliest
+        free_at = dict(free_at)
+        assignments, unassigned = [], []
+        for call in sorted(calls, key=order):
+            best = None
+            for berth in self.berths:
+                if not _fits(call, berth):
+                    continue
+                start = max(call["eta"], free_at[berth["name"]])
+                rank = (start, berth.get("length", float("inf")), berth["name"])
+                if best is None or rank < best[0]:
+                    best = (rank, berth["name"])
+            if best is None:
+                unassigned.append(call["vessel"])
+                continue
+            start, berth_name = best[0][0], best[1]
+            end = start + call["duration"]
+            free_at[berth_name] = end
+            assignments.append({
+                "vessel": call["vessel"], "berth": berth_name, "eta": call["eta"],
+                "start": start, "end": end, "wait": start - call["eta"], "duration": call["duration"],
+            })
+        return assignments, unassigned
+
+    @staticmethod
+    def _retime(sequence, available_from, force_first=False):
+        # Recomputes start/end/wait for calls served in this order on one berth, stopping once
+        # a start time is unchanged (everything after it is then unchanged too). Returns calls updated.
+        t = available_from
+        for count, a in enumerate(sequence):
+            start = max(a["eta"], t)
+            if start == a["start"] and not (force_first and count == 0):
+                return count
+            a["start"] = start
+            a["end"] = start + a["duration"]
+            a["wait"] = start - a["eta"]
+            t = a["end"]
+        return len(sequence)
+
+    def _improve(self, assignments, free_at):
+        # Adjacent-swap local search per berth; only swaps that lower that berth's total wait are kept
+        by_berth = {}
+        for a in sorted(assignments, key=lambda a: a["start"]):
+            by_berth.setdefault(a["berth"], []).append(a)
+        for berth_name, sequence in by_berth.items():
+            for _ in range(self.improvement_passes):
+                improved = False
+                for i in range(len(sequence) - 1):
+                    first, second = sequence[i], sequence[i + 1]
+                    if second["eta"] >= first["end"]:
+                        continue  # no queue here, swapping cannot help
+                    t = sequence[i - 1]["end"] if i else free_at[berth_name]
+                    before = first["wait"] + second["wait"]
+                    start_second = max(second["eta"], t)
+                    start_first = max(first["eta"], start_second + second["duration"])
+                    end_pair = start_first + first["duration"]
+                    after = (start_second - second["eta"]) + (start_first - first["eta"])
+                    # Swap only if the pair waits less and does not finish later (so later calls are unaffected or better off)
+                    if after < before - 1e-9 and end_pair <= second["end"] + 1e-9:
+                        sequence[i], sequence[i + 1] = second, first
+                        self._retime(sequence[i:], t)
+                        improved = True
+                if not improved:
+                    break
+        return [a for sequence in by_berth.values() for a in sequence]
+
+    def plan(self, calls, free_at=None):
+        """
+        Plans a conflict-free schedule for `calls`.
+
+        Args:
+            calls (list): Dicts with "vessel", "eta", "duration" (or "service_hours"), and
+                optional "length" and "draft".
+            free_at (dict): Optional berth name -> time the berth is free, overriding "available_from".
+
+        Returns:
+            dict: "assignments" (vessel, berth, eta, start, end, wait, duration) ordered by start,
+            "unassigned" vessels that fit no berth, "total_wait", "max_wait" and "calls".
+        """
+        started = time.perf_counter()
+        calls = self._normalize(calls)
+        berth_free = {b["name"]: float(b.get("available_from", float("-inf"))) for b in self.berths}
+        berth_free.update(free_at or {})
+        best = None
+        for name, order in self.PRIORITIES.items():
+            assignments, unassigned = self._insert(calls, berth_free, order)
+            assignments = self._improve(assignments, berth_free)
+            total = sum(a["wait"] for a in assignments)
+            if best is None or total < best[0]:
+                best = (total, name, assignments, unassigned)
+        schedule = _summary(best[2], best[3])
+        self.last_stats = {"strategy": best[1], "calls": len(calls),
+                           "seconds": round(time.perf_counter() - started, 4)}
+        return schedule
+
+    def replan(self, schedule, call, now=None):
+        """
+        Updates a schedule after one call's ETA (or duration) changes, or a new call arrives,
+        without planning the horizon again.
+
+        The call is taken off its berth (the calls queued behind it move up), then inserted
+        at the position, over all fitting berths, that adds the least total waiting time.
+        Only the calls queued behind the affected positions are re-timed.
+
+        Args:
+            schedule (dict): The current schedule returned by `plan` or `replan`.
+            call (dict): The updated call ("vessel", "eta", "duration" and optional "length"/"draft").
+            now: Current time; assignments that have already started are never moved.
+
+        Returns:
+            dict: The updated schedule (the input schedule is not modified).
+        """
+        started = time.perf_counter()
+        call = self._normalize([call])[0]
+        now = float("-inf") if now is None else float(now)
+        previous = next((a for a in schedule["assignments"] if a["vessel"] == call["vessel"]), None)
+        if previous is not None and previous["start"] < now:
+            return schedule  # already being served, the change no longer matters
+
+        free_at = {b["name"]: float(b.get("available_from", float("-inf"))) for b in self.berths}
+        by_berth = {name: [] for name in free_at}
+        for a in schedule["assignments"]:
+            if a["vessel"] != call["vessel"]:
+                by_berth.setdefault(a["berth"], []).append(dict(a))
+
+        def ready(sequence, index, berth_name):
+            # When the berth can take the call at `index`: after the previous call, and not in the past
+            return max(sequence[index - 1]["end"] if index else free_at[berth_name], now)
+
+        retimed = 0
+        if previous is not None:
+            sequence = by_berth[previous["berth"]]
+            index = next((i for i, a in enumerate(sequence) if a["start"] > previous["start"]), len(sequence))
+            retimed += self._retime(sequence[index:], ready(sequence, index, previous["berth"]))
+
+        best = None
+        for berth in self.berths:
+            if not _fits(call, berth):
+                continue
+            sequence = by_berth[berth["name"]]
+            # Insert before the first call that has not started and starts after the new ETA, or one slot later
+            first = next((i for i, a in enumerate(sequence) if a["start"] >= max(call["eta"], now)), len(sequence))
+            for index in range(first, min(first + 2, len(sequence) + 1)):
+                cost = self._insertion_cost(sequence, index, call, ready(sequence, index, berth["name"]))
+                if best is None or cost < best[0]:
+                    best = (cost, berth["name"], index)
+        unassigned = [v for v in schedule["unassigned"] if v != call["vessel"]]
+        if best is None:
+            unassigned.append(call["vessel"])
+        else:
+            _, berth_name, index = best
+            sequence = by_berth[berth_name]
+            sequence.insert(index, {"vessel": call["vessel"], "berth": berth_name, "eta": call["eta"],
+                                    "start": 0.0, "end": 0.0, "wait": 0.0, "duration": call["duration"]})
+            retimed += self._retime(sequence[index:], ready(sequence, index, berth_name), force_first=True)
+        self.last_stats = {"strategy": "repair", "retimed_calls": retimed,
+                           "seconds": round(time.perf_counter() - started, 4)}
+        return _summary([a for sequence in by_berth.values() for a in sequence], unassigned)
+
+    @staticmethod
+    def _insertion_cost(sequence, index, call, ready_at):
+        # Added total waiting if `call` is served at `index` of a berth's sequence
+        start = max(call["eta"], ready_at)
+        cost = start - call["eta"]
+        t = start + call["duration"]
+        for a in sequence[index:]:
+            new_start = max(a["eta"], t)
+            if new_start <= a["start"]:
+                break  # the queue has absorbed the delay
+            cost += new_start - a["start"]
+            t = new_start + a["duration"]
+        return cost
+
+
+def random_assignment(calls, berths, seed=0):
+    """Baseline: a random fitting berth per call, served first come first served (for the benchmark)."""
+    rng = random.Random(seed)
+    free_at = {b["name"]: float(b.get("available_from", float("-inf"))) for b in berths}
+    waits = []
+    for call in sorted(calls, key=lambda c: c["eta"]):
+        fitting = [b for b in berths if _fits(call, b)] or berths
+        berth = rng.choice(fitting)["name"]
+        start = max(call["eta"], free_at[berth])
+        free_at[berth] = start + call["duration"]
+        waits.append(start - call["eta"])
+    return sum(waits)
+
+
+def benchmark_scheduling(calls=3000, berths=12, utilization=0.85, seed=7):
+    """
+    Plans `calls` random calls over `berths` berths at the given berth utilization, compares
+    the waiting time with random assignment, and times an incremental re-plan after one ETA
+    change against planning again from scratch.
+
+    Returns:
+        dict: Plan and re-plan times and total waiting hours.
+    """
+    rng = random.Random(seed)
+    berth_list = [{"name": f"Berth {i + 1}", "length": rng.choice([250, 300, 350, 400])} for i in range(berths)]
+    mean_duration = 21
+    horizon_hours = calls * mean_duration / (berths * utilization)
+    call_list = [{
+        "vessel": f"Vessel {i}",
+        "eta": rng.uniform(0, horizon_hours),
+        "duration": rng.uniform(6, 36),
+        "length": rng.uniform(100, 300),
+    } for i in range(calls)]
+    scheduler = BerthScheduler(berth_list)
+    schedule = scheduler.plan(call_list)
+    plan_stats = dict(scheduler.last_stats)
+
+    # The vessel due mid-horizon is delayed by 12 hours
+    late = dict(sorted(call_list, key=lambda c: c["eta"])[calls // 2])
+    late["eta"] += 12
+    updated = scheduler.replan(schedule, late)
+    replan_stats = dict(scheduler.last_stats)
+    full = scheduler.plan([late if c["vessel"] == late["vessel"] else c for c in call_list])
+    return {
+        "calls": calls,
+        "berths": berths,
+        "horizon_hours": round(horizon_hours, 1),
+        "plan_seconds": plan_stats["seconds"],
+        "strategy": plan_stats["strategy"],
+        "total_wait_hours": schedule["total_wait"],
+        "random_assignment_wait_hours": round(random_assignment(call_list, berth_list), 4),
+        "replan_seconds": replan_stats["seconds"],
+        "replan_retimed_calls": replan_stats["retimed_calls"],
+        "total_wait_after_replan": updated["total_wait"],
+        "total_wait_full_plan_after_change": full["total_wait"],
+        "full_plan_seconds": scheduler.last_stats["seconds"],
+    }
+
+
+if __name__ == "__main__":
+    import json
+    import sys
+
+    args = [int(arg) for arg in sys.argv[1:3]]
+    print(json.dumps(benchmark_scheduling(*args), indent=2))
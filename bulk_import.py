@@ -0,0 +1,202 @@
+"""
+Bulk Import
+-----------
+Streams large CSV or NDJSON fleet, logistics and emissions files into the database.
+
+Records are read lazily, validated and de-duplicated, then written with `executemany` in
+batched transactions. Records whose natural key already exists update the existing row
+instead of adding a duplicate, and rows whose values are unchanged are not written at all,
+so re-importing a file does not fire the table triggers again. Keys are looked up per batch
+by joining a VALUES list against the lookup indexes. Memory use is bounded by the batch
+size, whatever the file size.
+"""
+
+import csv
+import gzip
+import io
+import json
+import time
+
+# kind -> table, natural key, columns and their types
+IMPORT_SPECS = {
+    "vessels": {
+        "table": "vessel",
+        "key": ("name",),
+        "columns": {"name": str, "destination": str, "status": str},
+    },
+    "logistics": {
+        "table": "logistics",
+        "key": ("shipment_name",),
+        "columns": {"shipment_name": str, "location": str, "delay": int},
+    },
+    # Emission samples have no natural key; exact duplicate rows are skipped
+    "emissions": {
+        "table": "sustainability",
+        "key": ("vessel_name", "fuel_consumption", "emissions"),
+        "columns": {"vessel_name": str, "fuel_consumption": float, "emissions": float},
+    },
+}
+
+
+# Sample rows seeded by main.populate_database (also used by migration 4 to find repeated seed rows)
+SAMPLE_RECORDS = {
+    "vessels": [
+        {"name": "Vessel A", "destination": "Port X", "status": "In Transit"},
+        {"name": "Vessel B", "destination": "Port Y", "status": "Docked"},
+        {"name": "Vessel C", "destination": "Port Z", "status": "Maintenance"},
+    ],
+    "logistics": [
+        {"shipment_name": "Shipment A", "location": "Location 45", "delay": 2},
+        {"shipment_name": "Shipment B", "location": "Location 78", "delay": 4},
+        {"shipment_name": "Shipment C", "location": "Location 12", "delay": 1},
+    ],
+    "emissions": [
+        {"vessel_name": "Vessel A", "fuel_consumption": 54.56, "emissions": 146.23},
+        {"vessel_name": "Vessel B", "fuel_consumption": 67.46, "emissions": 180.80},
+        {"vessel_name": "Vessel C", "fuel_consumption": 77.18, "emissions": 206.84},
+    ],
+}
+
+
+def detect_format(filename, default="csv"):
+    """Returns "csv" or "ndjson" from a file name, ignoring a trailing .gz."""
+    name = (filename or "").lower()
+    if name.endswith(".gz"):
+        name = name[:-3]
+    if name.endswith((".ndjson", ".jsonl", ".json")):
+        return "ndjson"
+    if name.endswith(".csv"):
+        return "csv"
+    return default
+
+
+def open_records(binary_stream, fmt, compressed=False):
+    """
+    Lazily yields record dicts from a binary stream.
+
+    Args:
+        binary_stream: A file-like object opened in binary mode.
+        fmt (str): "csv" (header row required) or "ndjson".
+        compressed (bool): Whether the stream is gzip-compressed.
+    """
+    if compressed:
+        binary_stream = gzip.GzipFile(fileobj=binary_stream)
+    text = io.TextIOWrapper(binary_stream, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        yield from csv.DictReader(text)
+    elif fmt == "ndjson":
+        for line in text:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+    else:
+        raise ValueError(f"Unsupported import format: {fmt}")
+
+
+def _coerce(record, columns):
+    # Returns a tuple of typed values in column order, or None if the record is invalid.
+    try:
+        values = []
+        for column, cast in columns.items():
+            value = record.get(column)
+            if value is None or (isinstance(value, str) and not value.strip()):
+                return None
+            values.append(cast(value.strip() if isinstance(value, str) else value))
+        return tuple(values)
+    except (TypeError, ValueError):
+        return None
+
+
+def _existing_rows(conn, table, key, columns, keys, max_variables=900):
+    # {key tuple: (id, values tuple)} of the first stored row for each key, one query per chunk of keys.
+    # CROSS JOIN keeps the VALUES list as the outer loop, so each key is one index search.
+    key_positions = [columns.index(k) for k in key]
+    join = " AND ".join(f"t.{k} = k.column{i + 1}" for i, k in enumerate(key))
+    row_placeholder = "(" + ", ".join("?" * len(key)) + ")"
+    per_chunk = max(1, max_variables // len(key))
+    existing = {}
+    for start in range(0, len(keys), per_chunk):
+        chunk = keys[start:start + per_chunk]
+        sql = (f"SELECT t.id, {', '.join(f't.{c}' for c in columns)} "
+               f"FROM (VALUES {', '.join([row_placeholder] * len(chunk))}) k CROSS JOIN {table} t ON {join} "
+               f"ORDER BY t.id")
+        for row in conn.execute(sql, [value for k in chunk for value in k]):
+            values = tuple(row[1:])
+            existing.setdefault(tuple(values[i] for i in key_positions), (row[0], values))
+    return existing
+
+
+def _write_batch(conn, spec, batch):
+    # batch: {key tuple: values tuple}. Returns (inserted, updated, unchanged).
+    table, key, columns = spec["table"], spec["key"], list(spec["columns"])
+    key_positions = [columns.index(k) for k in key]
+    existing = _existing_rows(conn, table, key, columns, list(batch))
+
+    inserts = [values for k, values in batch.items() if k not in existing]
+    non_key = [c for i, c in enumerate(columns) if i not in key_positions]
+    # Only rows whose stored values differ are rewritten
+    updates = [
+        tuple(v for i, v in enumerate(values) if i not in key_positions) + (existing[k][0],)
+        for k, values in batch.items() if k in existing and existing[k][1] != values
+    ]
+
+    if inserts:
+        conn.executemany(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})", inserts)
+    if updates:
+        conn.executemany(f"UPDATE {table} SET {', '.join(f'{c} = ?' for c in non_key)} WHERE id = ?", updates)
+    return len(inserts), len(updates), len(existing) - len(updates)
+
+
+def import_records(conn, kind, records, batch_size=5000):
+    """
+    Imports records into the table for `kind` in batched transactions.
+
+    Args:
+        conn: A DB-API SQLite connection.
+        kind (str): One of IMPORT_SPECS ("vessels", "logistics", "emissions").
+        records: Iterable of record dicts.
+        batch_size (int): Records per transaction.
+
+    Returns:
+        dict: rows read, inserted, updated, unchanged (already stored with the same values),
+        duplicates (repeated within the input) and invalid rows skipped, seconds and rows/sec.
+    """
+    spec = IMPORT_SPECS[kind]
+    columns = list(spec["columns"])
+    key_positions = [columns.index(k) for k in spec["key"]]
+    stats = {"kind": kind, "read": 0, "inserted": 0, "updated": 0, "unchanged": 0, "duplicates": 0, "invalid": 0}
+    start = time.perf_counter()
+    batch = {}
+
+    def flush():
+        try:
+            inserted, updated, unchanged = _write_batch(conn, spec, batch)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        stats["inserted"] += inserted
+        stats["updated"] += updated
+        stats["unchanged"] += unchanged
+        batch.clear()
+
+    for record in records:
+        stats["read"] += 1
+        values = _coerce(record, spec["columns"]) if isinstance(record, dict) else None
+        if values is None:
+            stats["invalid"] += 1
+            continue
+        key = tuple(values[i] for i in key_positions)
+        if key in batch:
+            stats["duplicates"] += 1
+        batch[key] = values  # later records win within a batch
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+
+    elapsed = time.perf_counter() - start
+    stats["seconds"] = round(elapsed, 3)
+    stats["rows_per_second"] = round(stats["read"] / elapsed, 1) if elapsed else 0
+    return stats
@@ -0,0 +1,86 @@
+"""
+Change Tracking
+---------------
+Per-table write counters fed by a SQLAlchemy engine hook, and a small cache whose entries
+are only valid while the tables they were computed from are unchanged.
+
+The hook inspects every statement the engine executes, so ORM flushes, bulk saves and
+Query.delete() all invalidate dependent caches without callers having to remember to.
+"""
+
+import re
+import threading
+import time
+from collections import Counter
+
+from sqlalchemy import event
+
+_WRITE_STATEMENT = re.compile(
+    r'^\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM)\s+["`\[]?(\w+)',
+    re.IGNORECASE
+)
+
+
+class ChangeTracker:
+    """
+    Counts writes per table for statements executed through an attached engine.
+    """
+
+    def __init__(self):
+        self._versions = Counter()
+        self._lock = threading.Lock()
+
+    def attach(self, engine):
+        """Starts tracking writes executed through `engine`."""
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        match = _WRITE_STATEMENT.match(statement)
+        if match:
+            self.bump(match.group(1).lower())
+
+    def bump(self, table):
+        """Records a change to `table` (for writes made outside the tracked engine)."""
+        with self._lock:
+            self._versions[table] += 1
+
+    def version(self, *tables):
+        """Returns a tuple that changes whenever any of `tables` is written."""
+        with self._lock:
+            return tuple(self._versions[table] for table in tables)
+
+
+class VersionedCache:
+    """
+    Holds a single computed value tagged with the data version it was computed from.
+
+    Args:
+        ttl_seconds (float): Upper bound on an entry's age, so writes made by other
+            processes (which this process cannot see) are picked up eventually.
+    """
+
+    def __init__(self, ttl_seconds=30):
+        self.ttl_seconds = ttl_seconds
+        self._entry = None  # (version, expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, version):
+        """Returns the cached value if it was computed at `version` and has not expired, else None."""
+        with self._lock:
+            if self._entry is not None:
+                cached_version, expires_at, value = self._entry
+                if cached_version == version and time.monotonic() < expires_at:
+                    self.hits += 1
+                    return value
+            self.misses += 1
+            return None
+
+    def set(self, version, value):
+        with self._lock:
+            self._entry = (version, time.monotonic() + self.ttl_seconds, value)
+
+    def invalidate(self):
+        with self._lock:
+            self._entry = None
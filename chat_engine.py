@@ -0,0 +1,291 @@
+"""
+Chat Engine
+-----------
+The chatbot's language models and generation, separate from the web application.
+
+Importing this module loads no model, opens no application database and starts no
+scheduler, so the inference service (inference_service.py) can hold the models without
+running main.py's startup. torch and transformers are imported when a model is first loaded.
+
+- `model_registry` loads gpt2 and GPT-Neo on first use (see model_registry.py).
+- `chat_batcher` groups concurrent requests into one padded generate call.
+- `response_cache` keeps answers keyed on the normalized query (see response_cache.py).
+- `answer` / `stream_answer` serve one query: from the cache, through an inference service
+  client when one is given, or with the local models.
+
+Settings are read from the environment into `CONFIG`; main.py copies them into app.config.
+"""
+
+import logging
+import os
+import threading
+import time
+
+from batching import BatchScheduler
+from metrics import record_inference
+from model_registry import ModelRegistry
+from response_cache import ResponseCache
+from speculative_decoding import assisted_generate_kwargs
+
+CONFIG = {
+    # Model loading: memory budget for loaded models (MB, 0 disables eviction) and models to warm in the background
+    'MODEL_MEMORY_BUDGET_MB': float(os.environ.get('MODEL_MEMORY_BUDGET_MB', 0)),
+    'MODEL_WARMUP': [name for name in os.environ.get('MODEL_WARMUP', 'gpt-neo,gpt-neo-prefix').split(',') if name],
+    # Inference precision for the causal language models: fp32, bf16 or int8 (dynamic quantization)
+    'MODEL_PRECISION': os.environ.get('MODEL_PRECISION', 'fp32'),
+    # Tokens generated per chatbot answer, independent of the prompt and of the requests it is batched with
+    'CHAT_MAX_NEW_TOKENS': int(os.environ.get('CHAT_MAX_NEW_TOKENS', 64)),
+    # Chat micro-batching: requests arriving within CHAT_MAX_WAIT_MS share one generate call
+    'CHAT_MAX_BATCH_SIZE': int(os.environ.get('CHAT_MAX_BATCH_SIZE', 8)),
+    'CHAT_MAX_WAIT_MS': float(os.environ.get('CHAT_MAX_WAIT_MS', 25)),
+    # Reuse the encoded past-key-values of the fixed chat preamble instead of re-encoding it per request
+    'CHAT_PREFIX_CACHE': os.environ.get('CHAT_PREFIX_CACHE', '1') == '1',
+    # Assisted decoding: gpt2 drafts CHAT_DRAFT_TOKENS tokens per step and GPT-Neo verifies them (same output as greedy)
+    'CHAT_SPECULATIVE': os.environ.get('CHAT_SPECULATIVE', '0') == '1',
+    'CHAT_DRAFT_TOKENS': int(os.environ.get('CHAT_DRAFT_TOKENS', 5)),
+    # Chat response cache: size, TTL and optional SQLite file so cached answers survive restarts
+    'CHAT_CACHE_MAX_ENTRIES': int(os.environ.get('CHAT_CACHE_MAX_ENTRIES', 1024)),
+    'CHAT_CACHE_TTL_SECONDS': float(os.environ.get('CHAT_CACHE_TTL_SECONDS', 3600)),
+    'CHAT_CACHE_DB': os.environ.get('CHAT_CACHE_DB', ''),
+}
+
+# Model names used by the application
+gpt2_model_name = "gpt2"
+gpt_neo_model_name = "EleutherAI/gpt-neo-1.3B"
+
+
+# Load a causal language model together with its tokenizer, at the configured precision
+def load_causal_lm(model_name):
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+    from quantization import apply_precision
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = apply_precision(AutoModelForCausalLM.from_pretrained(model_name), CONFIG['MODEL_PRECISION'])
+    # GPT-style tokenizers have no pad token; pad on the left so batched prompts end where generation starts
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    tokenizer.padding_side = 'left'
+    return model, tokenizer
+
+
+# Load the gpt2 text-generation pipeline
+def load_gpt2_pipeline():
+    from transformers import pipeline
+
+    return pipeline("text-generation", model=gpt2_model_name)
+
+
+# Models are loaded on first use (or by the background warm-up) instead of at import time
+model_registry = ModelRegistry(memory_budget_mb=CONFIG['MODEL_MEMORY_BUDGET_MB'] or None)
+model_registry.register("gpt2-pipeline", load_gpt2_pipeline)
+model_registry.register("gpt2", lambda: load_causal_lm(gpt2_model_name))
+model_registry.register("gpt-neo", lambda: load_causal_lm(gpt_neo_model_name))
+
+# Fixed system text and few-shot examples placed before every chatbot query
+CHAT_PREAMBLE = (
+    "You are a helpful assistant specializing in shipping and logistics. "
+    "Answer the following query with detailed and accurate information. "
+    "Examples: \n"
+    "1. Query: What is shipping?\n"
+    "   Answer: Shipping is the process of transporting goods from one location to another, typically using ships, trucks, or planes.\n"
+    "2. Query: What is a shipping label?\n"
+    "   Answer: A shipping label is a document attached to a package that contains information about the sender, recipient, and delivery details.\n"
+)
+
+# Generation settings for chatbot answers (also part of the response cache key). max_new_tokens, not
+# max_length: a batch is padded to its longest prompt, so a total length would shrink the answer
+# budget of every short prompt batched with a long one (to nothing once the prompt reaches the limit)
+CHAT_GENERATION_SETTINGS = {"max_new_tokens": CONFIG['CHAT_MAX_NEW_TOKENS'], "num_return_sequences": 1}
+
+# Model identity used in response cache keys; answers differ between precisions
+CHAT_MODEL_ID = f"{gpt_neo_model_name}@{CONFIG['MODEL_PRECISION']}"
+
+# Response cache key settings: the cache holds only the generated answer, never the prompt text,
+# because differently phrased prompts that normalize to the same key share an entry
+CHAT_CACHE_SETTINGS = {**CHAT_GENERATION_SETTINGS, "cached": "answer"}
+
+
+# Full model input for a chatbot query
+def chat_prompt(prompt):
+    return CHAT_PREAMBLE + f"Query: {prompt}\n"
+
+
+# Build the prefix cache for the chat preamble from the loaded GPT-Neo
+def load_chat_prefix():
+    from prefix_cache import PrefixKVCache
+
+    return PrefixKVCache(*model_registry.get("gpt-neo"), CHAT_PREAMBLE)
+
+
+# The encoded preamble is registered like a model so it is built during warm-up; it is
+# derived from gpt-neo, so evicting gpt-neo drops it too
+model_registry.register("gpt-neo-prefix", load_chat_prefix, depends_on=("gpt-neo",))
+
+
+# Build generate() inputs for a list of user prompts, reusing the cached preamble when enabled
+def build_chat_inputs(gpt_neo_tokenizer, prompts, speculative=False):
+    if speculative:
+        # Assisted decoding verifies the draft against the full prompt, one sequence at a time
+        encoded = gpt_neo_tokenizer(chat_prompt(prompts[0]), return_tensors="pt")
+        draft_model, _ = model_registry.get("gpt2")
+        return {
+            "input_ids": encoded.input_ids,
+            "attention_mask": encoded.attention_mask,
+            **assisted_generate_kwargs(draft_model, CONFIG['CHAT_DRAFT_TOKENS'])
+        }
+    if CONFIG['CHAT_PREFIX_CACHE']:
+        # Only the queries are encoded; the preamble comes from its cached past-key-values
+        prefix_cache = model_registry.get("gpt-neo-prefix")
+        return prefix_cache.build_inputs(gpt_neo_tokenizer, [f"Query: {prompt}\n" for prompt in prompts])
+    contextual_prompts = [chat_prompt(prompt) for prompt in prompts]
+    encoded = gpt_neo_tokenizer(contextual_prompts, return_tensors="pt", padding=True)
+    return {"input_ids": encoded.input_ids, "attention_mask": encoded.attention_mask}
+
+
+# Tokens produced by a generate call: output positions after the prompt that are not padding
+def count_generated_tokens(outputs, inputs, pad_token_id):
+    return int((outputs[:, inputs["input_ids"].shape[1]:] != pad_token_id).sum())
+
+
+# Run generate and record its duration and generated tokens for /api/metrics
+def timed_generate(model, inputs, pad_token_id, mode, **kwargs):
+    started = time.perf_counter()
+    outputs = model.generate(**inputs, pad_token_id=pad_token_id, **kwargs)
+    record_inference(mode, time.perf_counter() - started, count_generated_tokens(outputs, inputs, pad_token_id))
+    return outputs
+
+
+# Generate chatbot answers for several prompts with a single padded generate call
+def generate_chat_batch(prompts):
+    gpt_neo_model, gpt_neo_tokenizer = model_registry.get("gpt-neo")
+    outputs = timed_generate(
+        gpt_neo_model,
+        build_chat_inputs(gpt_neo_tokenizer, prompts),
+        gpt_neo_tokenizer.pad_token_id,
+        "batch",
+        **CHAT_GENERATION_SETTINGS
+    )
+    return [gpt_neo_tokenizer.decode(output, skip_special_tokens=True) for output in outputs]
+
+
+# Generate one chatbot answer with gpt2 as the draft model for GPT-Neo
+def generate_chat_speculative(prompt):
+    gpt_neo_model, gpt_neo_tokenizer = model_registry.get("gpt-neo")
+    outputs = timed_generate(
+        gpt_neo_model,
+        build_chat_inputs(gpt_neo_tokenizer, [prompt], speculative=True),
+        gpt_neo_tokenizer.pad_token_id,
+        "speculative",
+        **CHAT_GENERATION_SETTINGS
+    )
+    return gpt_neo_tokenizer.decode(outputs[0], skip_special_tokens=True)
+
+
+chat_batcher = BatchScheduler(
+    generate_chat_batch,
+    max_batch_size=CONFIG['CHAT_MAX_BATCH_SIZE'],
+    max_wait_ms=CONFIG['CHAT_MAX_WAIT_MS'],
+    name="chat-batcher"
+)
+
+# Cache of chatbot answers keyed on the normalized prompt, model and generation settings
+response_cache = ResponseCache(
+    max_entries=CONFIG['CHAT_CACHE_MAX_ENTRIES'],
+    ttl_seconds=CONFIG['CHAT_CACHE_TTL_SECONDS'],
+    sqlite_path=CONFIG['CHAT_CACHE_DB'] or None
+)
+
+
+def answer(prompt, speculative=None, client=None):
+    """
+    Returns the chatbot response for a query: the full model input followed by the answer.
+
+    Args:
+        prompt (str): The user's query.
+        speculative (bool): Use gpt2-assisted decoding (default: CHAT_SPECULATIVE).
+        client (InferenceClient): Generate through the shared inference service instead of
+            the local models.
+
+    Raises:
+        InferenceServiceBusy: If the inference service rejects the request.
+    """
+    if speculative is None:
+        speculative = CONFIG['CHAT_SPECULATIVE']
+    # Assisted decoding matches greedy output, so both modes share cache entries
+    contextual_prompt = chat_prompt(prompt)
+    cache_key = response_cache.make_key(prompt, CHAT_MODEL_ID, CHAT_CACHE_SETTINGS)
+    cached_answer = response_cache.get(cache_key)
+    if cached_answer is not None:
+        # Same shape as a generated response, built around this request's own query
+        return contextual_prompt + cached_answer
+    if client is not None:
+        # The shared inference service holds the only copy of the models
+        response = client.chat(prompt, speculative=speculative)
+    elif speculative:
+        # Assisted decoding is single-sequence, so it bypasses the batch scheduler
+        response = generate_chat_speculative(prompt)
+    else:
+        # Concurrent requests are grouped by the batch scheduler into one model call
+        response = chat_batcher.submit(prompt)
+    if response.startswith(contextual_prompt):
+        response_cache.set(cache_key, response[len(contextual_prompt):])
+    else:
+        # The decoded text does not reproduce the prompt exactly, so the answer cannot be separated
+        logging.debug("Chatbot response not cached: prompt not found at the start of the output.")
+    return response
+
+
+def stream_answer(prompt, speculative=None, client=None):
+    """
+    Yields the generated answer text as it is produced, then caches the answer.
+
+    The cache holds the answer only (as `answer` stores it), so streaming and
+    non-streaming clients share cache entries. Arguments are as for `answer`.
+    """
+    if speculative is None:
+        speculative = CONFIG['CHAT_SPECULATIVE']
+    cache_key = response_cache.make_key(prompt, CHAT_MODEL_ID, CHAT_CACHE_SETTINGS)
+    cached_answer = response_cache.get(cache_key)
+    if cached_answer is not None:
+        yield cached_answer
+        return
+
+    if client is not None:
+        pieces_source = client.stream(prompt, speculative=speculative)
+    else:
+        pieces_source = stream_generation(prompt, speculative)
+    pieces = []
+    for text in pieces_source:
+        pieces.append(text)
+        yield text
+    response_cache.set(cache_key, "".join(pieces))
+
+
+# Run GPT-Neo in a background thread and yield decoded text as tokens are produced
+def stream_generation(prompt, speculative=False):
+    from transformers import TextIteratorStreamer
+
+    gpt_neo_model, gpt_neo_tokenizer = model_registry.get("gpt-neo")
+    streamer = TextIteratorStreamer(gpt_neo_tokenizer, skip_prompt=True, skip_special_tokens=True)
+    generation_error = []
+
+    def run_generation():
+        try:
+            timed_generate(
+                gpt_neo_model,
+                build_chat_inputs(gpt_neo_tokenizer, [prompt], speculative=speculative),
+                gpt_neo_tokenizer.pad_token_id,
+                "stream",
+                streamer=streamer,
+                **CHAT_GENERATION_SETTINGS
+            )
+        except Exception as e:
+            generation_error.append(e)
+            streamer.end()
+
+    threading.Thread(target=run_generation, name="chat-stream", daemon=True).start()
+    for text in streamer:
+        if text:
+            yield text
+    if generation_error:
+        raise generation_error[0]
@@ -0,0 +1,254 @@
+"""
+Crane Allocation
+----------------
+Assigns each vessel's cargo to one quay crane using cargo weight, crane lift capacity and
+handling rate, minimizing the makespan (the time until every crane is done) or, within a
+makespan allowance, the handling emissions.
+
+A crane can work a vessel only if its lift capacity covers the vessel's heaviest unit; a
+vessel's handling time on a crane is its cargo weight divided by the crane's rate.
+
+The solver is a bounded heuristic for this unrelated-machines problem:
+1. Longest-processing-time first: vessels in decreasing order of their shortest handling
+   time go to the crane that would finish them earliest.
+2. Local search on the busiest crane: move one of its vessels to another crane, or swap it
+   with another crane's vessel, whenever that lowers the busier of the two, up to
+   `max_iterations` improvements.
+
+Each improvement step costs O(vessels x cranes) at most, so runtime is predictable for
+hundreds of cranes and vessels. The returned lower bound (the larger of total work over total
+rate and the longest unavoidable single job) bounds the gap to the optimum.
+
+`python crane_allocation.py [vessels] [cranes]` compares the solver with round-robin.
+"""
+
+import random
+import time
+
+
+def _handling_hours(vessel, crane):
+    # None if the crane cannot lift the vessel's heaviest unit
+    if vessel.get("max_unit_weight", 0) > crane.get("capacity", float("inf")):
+        return None
+    return vessel["cargo_weight"] / crane["rate"]
+
+
+class CraneAllocator:
+    """
+    Allocates cranes to vessels.
+
+    Args:
+        cranes (list): Dicts with "name", "rate" (tonnes/hour), optional "capacity" (max lift in
+            tonnes) and optional "emissions_per_hour" (kg CO2 per working hour).
+        max_iterations (int): Upper bound on local-search improvements.
+    """
+
+    def __init__(self, cranes, max_iterations=2000):
+        if not cranes:
+            raise ValueError("At least one crane is required")
+        for crane in cranes:
+            if not crane.get("rate") or crane["rate"] <= 0:
+                raise ValueError(f"Crane {crane.get('name')} needs a positive rate")
+        self.cranes = list(cranes)
+        self.max_iterations = max_iterations
+        self.last_stats = {}
+
+    def _times(self, vessels):
+        # times[j][i]: hours for crane i to handle vessel j (None if it cannot)
+        times = []
+        for vessel in vessels:
+            if vessel.get("cargo_weight") is None or vessel["cargo_weight"] < 0:
+                raise ValueError(f"Vessel {vessel.get('vessel')} needs a non-negative cargo_weight")
+            row = [_handling_hours(vessel, crane) for crane in self.cranes]
+            if all(t is None for t in row):
+                raise ValueError(f"No crane can lift the cargo of {vessel.get('vessel')}")
+            times.append(row)
+        return times
+
+    @staticmethod
+    def _greedy(times, order, loads, limit=None, cost=None):
+        assignment = [None] * len(times)
+        for j in order:
+            best = None
+            for i, t in enumerate(times[j]):
+                if t is None:
+                    continue
+                finish = loads[i] + t
+                if cost is not None and limit is not None:
+                    # Cheapest crane that stays within the makespan allowance; otherwise earliest finish
+                    rank = (finish > limit, cost(i, j) if finish <= limit else finish, finish)
+                else:
+                    rank = (finish,)
+                if best is None or rank < best[0]:
+                    best = (rank, i)
+            i = best[1]
+            assignment[j] = i
+            loads[i] += times[j][i]
+        return assignment
+
+    def _local_search(self, times, assignment, loads, target=0.0):
+        jobs = [[] for _ in self.cranes]
+        for j, i in enumerate(assignment):
+            jobs[i].append(j)
+        iterations = 0
+        while iterations < self.max_iterations:
+            busiest = max(range(len(loads)), key=loads.__getitem__)
+            peak = loads[busiest]
+            if peak <= target:
+                break
+            best = None  # (new pair max, kind, job, other crane, other job)
+            for j in jobs[busiest]:
+                t_here = times[j][busiest]
+                for i, t_there in enumerate(times[j]):
+                    if i == busiest or t_there is None:
+                        continue
+                    moved = max(peak - t_here, loads[i] + t_there)
+                    if moved < peak - 1e-9 and (best is None or moved < best[0]):
+                        best = (moved, "move", j, i, None)
+                    for k in jobs[i]:
+                        back = times[k][busiest]
+                        if back is None:
+                            continue
+                        swapped = max(peak - t_here + back, loads[i] - times[k][i] + t_there)
+                        if swapped < peak - 1e-9 and (best is None or swapped < best[0]):
+                            best = (swapped, "swap", j, i, k)
+            if best is None:
+                break
+            _, kind, j, i, k = best
+            jobs[busiest].remove(j)
+            jobs[i].append(j)
+            loads[busiest] -= times[j][busiest]
+            loads[i] += times[j][i]
+            assignment[j] = i
+            if kind == "swap":
+                jobs[i].remove(k)
+                jobs[busiest].append(k)
+                loads[i] -= times[k][i]
+                loads[busiest] += times[k][busiest]
+                assignment[k] = busiest
+            iterations += 1
+        return iterations
+
+    def allocate(self, vessels, objective="makespan", makespan_slack=0.1):
+        """
+        Assigns each vessel to one crane.
+
+        Args:
+            vessels (list): Dicts with "vessel", "cargo_weight" (tonnes) and optional
+                "max_unit_weight" (heaviest single lift, tonnes).
+            objective (str): "makespan", or "emissions" to minimize handling emissions while
+                keeping the makespan within (1 + makespan_slack) of the makespan solution.
+            makespan_slack (float): Allowed makespan increase for the emissions objective.
+
+        Returns:
+            dict: "allocation" (vessel -> crane), "crane_hours" (crane -> busy hours),
+            "makespan", "lower_bound", "emissions_kg" and "assignments" (vessel, crane, hours).
+
+        Raises:
+            ValueError: On invalid input, or a vessel no crane can lift.
+        """
+        if objective not in ("makespan", "emissions"):
+            raise ValueError("objective must be 'makespan' or 'emissions'")
+        started = time.perf_counter()
+        times = self._times(vessels)
+        order = sorted(range(len(vessels)), key=lambda j: -min(t for t in times[j] if t is not None))
+        loads = [0.0] * len(self.cranes)
+        assignment = self._greedy(times, order, loads)
+        iterations = self._local_search(times, assignment, loads)
+
+        if objective == "emissions":
+            limit = max(loads, default=0) * (1 + makespan_slack)
+
+            def cost(i, j):
+                return times[j][i] * self.cranes[i].get("emissions_per_hour", 0)
+            greedy_loads = [0.0] * len(self.cranes)
+            greedy = self._greedy(times, order, greedy_loads, limit=limit, cost=cost)
+            # Late vessels may not fit under the allowance; rebalance, else keep the makespan solution
+            iterations += self._local_search(times, greedy, greedy_loads, target=limit)
+            if max(greedy_loads, default=0) <= limit + 1e-9:
+                assignment, loads = greedy, greedy_loads
+
+        total_rate = sum(crane["rate"] for crane in self.cranes)
+        lower_bound = max(
+            sum(v["cargo_weight"] for v in vessels) / total_rate if vessels else 0,
+            max((min(t for t in row if t is not None) for row in times), default=0),
+        )
+        assignments = [{
+            "vessel": vessel["vessel"],
+            "crane": self.cranes[i]["name"],
+            "hours": round(times[j][i], 4),
+        } for j, (vessel, i) in enumerate(zip(vessels, assignment))]
+        emissions = sum(times[j][i] * self.cranes[i].get("emissions_per_hour", 0) for j, i in enumerate(assignment))
+        makespan = max(loads, default=0)
+        self.last_stats = {
+            "objective": objective,
+            "vessels": len(vessels),
+            "cranes": len(self.cranes),
+            "local_search_iterations": iterations,
+            "gap_to_lower_bound": round(makespan / lower_bound - 1, 4) if lower_bound else 0,
+            "seconds": round(time.perf_counter() - started, 4),
+        }
+        return {
+            "allocation": {a["vessel"]: a["crane"] for a in assignments},
+            "crane_hours": {crane["name"]: round(load, 4) for crane, load in zip(self.cranes, loads)},
+            "makespan": round(makespan, 4),
+            "lower_bound": round(lower_bound, 4),
+            "emissions_kg": round(emissions, 2),
+            "assignments": assignments,
+        }
+
+
+def round_robin_makespan(vessels, cranes):
+    """Baseline: vessel i goes to crane i mod len(cranes), ignoring capacity (for the benchmark)."""
+    loads = [0.0] * len(cranes)
+    for i, vessel in enumerate(vessels):
+        loads[i % len(cranes)] += vessel["cargo_weight"] / cranes[i % len(cranes)]["rate"]
+    return max(loads)
+
+
+def benchmark_allocation(vessels=500, cranes=200, seed=7):
+    """
+    Allocates `vessels` random vessels to `cranes` random cranes and compares the makespan
+    with round-robin.
+
+    Returns:
+        dict: Makespans, lower bound, solver runtime and the emissions-objective result.
+    """
+    rng = random.Random(seed)
+    crane_list = [{
+        "name": f"Crane {i + 1}",
+        "rate": rng.uniform(20, 45) * 10,  # tonnes/hour
+        "capacity": rng.choice([40, 50, 65]),
+        "emissions_per_hour": rng.uniform(20, 120),
+    } for i in range(cranes)]
+    vessel_list = [{
+        "vessel": f"Vessel {j}",
+        "cargo_weight": rng.uniform(2000, 60000),
+        "max_unit_weight": rng.choice([30, 35, 45, 60]),
+    } for j in range(vessels)]
+    allocator = CraneAllocator(crane_list)
+    makespan = allocator.allocate(vessel_list)
+    makespan_stats = dict(allocator.last_stats)
+    emissions = allocator.allocate(vessel_list, objective="emissions")
+    return {
+        "vessels": vessels,
+        "cranes": cranes,
+        "round_robin_makespan_hours": round(round_robin_makespan(vessel_list, crane_list), 2),
+        "makespan_hours": makespan["makespan"],
+        "lower_bound_hours": makespan["lower_bound"],
+        "gap_to_lower_bound": makespan_stats["gap_to_lower_bound"],
+        "local_search_iterations": makespan_stats["local_search_iterations"],
+        "seconds": makespan_stats["seconds"],
+        "emissions_kg_makespan_objective": makespan["emissions_kg"],
+        "emissions_kg_emissions_objective": emissions["emissions_kg"],
+        "makespan_hours_emissions_objective": emissions["makespan"],
+        "emissions_objective_seconds": allocator.last_stats["seconds"],
+    }
+
+
+if __name__ == "__main__":
+    import json
+    import sys
+
+    args = [int(arg) for arg in sys.argv[1:3]]
+    print(json.dumps(benchmark_allocation(*args), indent=2))
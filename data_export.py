@@ -0,0 +1,191 @@
+"""
+Data Export
+-----------
+Streaming encoders for table exports. Rows are read from a DB-API cursor in `fetchmany`
+chunks and encoded chunk by chunk, so an export of any size runs in constant memory.
+
+Formats:
+- csv: RFC 4180 quoting via the csv module
+- ndjson: one JSON object per line
+- parquet / arrow: columnar output, one row group / record batch per chunk (requires pyarrow)
+
+Any format can be wrapped with `gzip_chunks` for compressed output.
+"""
+
+import csv
+import io
+import json
+import zlib
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrow"),
+}
+
+
+def iter_chunks(cursor, chunk_size):
+    """Yields lists of rows from an executed cursor, `chunk_size` rows at a time."""
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            return
+        yield rows
+
+
+def export_query(table, declared_types, columns=None, id_from=None, id_to=None, since=None, until=None,
+                 time_column=None):
+    """
+    Builds the SELECT for an export with column projection and inclusive range filters.
+
+    Args:
+        table (str): Table to export.
+        declared_types (dict): Column name -> declared type, in table order (from PRAGMA table_info).
+        columns (list): Columns to include; all columns if empty.
+        id_from, id_to: Inclusive bounds on `id` (or rowid when the table has no id column).
+        since, until: Inclusive bounds on `time_column`.
+        time_column (str): Column for since/until; defaults to timestamp, created_at or recorded_at.
+
+    Returns:
+        tuple: (columns, query, params).
+
+    Raises:
+        ValueError: On unknown columns, non-integer ids or no usable time column.
+    """
+    columns = list(columns or declared_types)
+    unknown = [c for c in columns if c not in declared_types]
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+
+    conditions, params = [], []
+    id_column = '"id"' if 'id' in declared_types else 'rowid'
+    for value, op in ((id_from, '>='), (id_to, '<=')):
+        if value not in (None, ''):
+            try:
+                params.append(int(value))
+            except (TypeError, ValueError):
+                raise ValueError("id_from and id_to must be integers.")
+            conditions.append(f"{id_column} {op} ?")
+    if since or until:
+        time_column = time_column or next(
+            (c for c in ('timestamp', 'created_at', 'recorded_at') if c in declared_types), None)
+        if time_column not in declared_types:
+            raise ValueError("No time column available for since/until filtering.")
+        for value, op in ((since, '>='), (until, '<=')):
+            if value:
+                conditions.append(f'"{time_column}" {op} ?')
+                params.append(value)
+
+    # Column names are validated against the table schema above, so quoting them is safe
+    selected = ", ".join(f'"{c}"' for c in columns)
+    query = f"SELECT {selected} FROM {table}"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY rowid"
+    return columns, query, params
+
+
+def csv_chunks(columns, row_chunks):
+    """Encodes row chunks as CSV text, header first."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue()
+    for rows in row_chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue()
+
+
+def ndjson_chunks(columns, row_chunks):
+    """Encodes row chunks as newline-delimited JSON objects."""
+    for rows in row_chunks:
+        yield "".join(json.dumps(dict(zip(columns, row)), default=str) + "\n" for row in rows)
+
+
+def arrow_schema(columns, declared_types):
+    """
+    Builds a pyarrow schema from SQLite declared column types.
+
+    INTEGER-like types map to int64, REAL/FLOAT/DOUBLE/NUMERIC to float64, everything else to string.
+    """
+    import pyarrow as pa
+    fields = []
+    for name, declared in zip(columns, declared_types):
+        declared = (declared or "").upper()
+        if "INT" in declared:
+            arrow_type = pa.int64()
+        elif any(token in declared for token in ("REAL", "FLOA", "DOUB", "NUMERIC", "DECIMAL")):
+            arrow_type = pa.float64()
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(name, arrow_type))
+    return pa.schema(fields)
+
+
+class _DrainableSink(io.RawIOBase):
+    # File-like sink for pyarrow writers whose contents are handed out after each chunk.
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def write(self, data):
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def columnar_chunks(columns, declared_types, row_chunks, fmt):
+    """
+    Encodes row chunks as Parquet (one row group per chunk) or an Arrow IPC stream.
+
+    Raises:
+        ImportError: If pyarrow is not installed.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = arrow_schema(columns, declared_types)
+    sink = _DrainableSink()
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(sink, schema)
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+    for rows in row_chunks:
+        arrays = [
+            pa.array([None if value is None else str(value) for value in column], type=field.type)
+            if pa.types.is_string(field.type) else pa.array(list(column), type=field.type)
+            for column, field in zip(zip(*rows), schema)
+        ]
+        batch = pa.RecordBatch.from_arrays(arrays, schema=schema)
+        if fmt == "parquet":
+            writer.write_table(pa.Table.from_batches([batch]))
+        else:
+            writer.write_batch(batch)
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def gzip_chunks(chunks):
+    """Compresses a stream of str/bytes chunks into a single gzip stream."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,64 @@
+"""
+SQLite Connection Pool
+----------------------
+One tuned, thread-safe connection pool shared by SQLAlchemy and the raw-SQL code paths.
+
+SQLAlchemy's QueuePool is given a connection factory that applies the tuned pragmas, and
+raw-SQL callers borrow DB-API connections from the same pool with `engine.raw_connection()`
+(closing them returns them to the pool). Every connection has:
+
+- WAL journaling, so readers no longer block on the writer and vice versa
+- synchronous=NORMAL (durable with WAL, far fewer fsyncs than FULL)
+- a larger page cache and memory-mapped I/O
+- a busy timeout instead of immediate "database is locked" errors
+- foreign key enforcement
+- a per-connection prepared-statement cache that stays warm because connections are reused
+"""
+
+import sqlite3
+
+from sqlalchemy.pool import QueuePool
+
+
+def default_pragmas(cache_mb=64, mmap_mb=256, busy_timeout_ms=5000):
+    """Returns the pragmas applied to every pooled connection."""
+    return {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -cache_mb * 1024,  # negative values are KiB
+        "mmap_size": mmap_mb * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": busy_timeout_ms,
+        "foreign_keys": "ON",
+    }
+
+
+def connect_sqlite(path, pragmas=None, cached_statements=256):
+    """
+    Opens a SQLite connection with the tuned pragmas applied.
+
+    Args:
+        path (str): Absolute path of the database file.
+        pragmas (dict): Pragmas to apply; defaults to `default_pragmas()`.
+        cached_statements (int): Size of the connection's prepared-statement cache.
+    """
+    conn = sqlite3.connect(path, check_same_thread=False, cached_statements=cached_statements)
+    for name, value in (pragmas or default_pragmas()).items():
+        conn.execute(f"PRAGMA {name}={value}")
+    return conn
+
+
+def engine_options(path, pool_size=10, max_overflow=10, pool_timeout=30, pragmas=None):
+    """
+    Returns SQLALCHEMY_ENGINE_OPTIONS that make SQLAlchemy use the tuned, pooled connections.
+
+    Connections are created with check_same_thread=False because the pool hands them to
+    whichever thread asks next; the pool guarantees only one thread uses a connection at a time.
+    """
+    return {
+        "creator": lambda: connect_sqlite(path, pragmas),
+        "poolclass": QueuePool,
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": pool_timeout,
+    }
@@ -0,0 +1,166 @@
+"""
+Fleet Emissions Engine
+----------------------
+Vectorized CO2, SOx and NOx calculation for a whole fleet over many time steps, plus a
+CII-style carbon intensity per vessel.
+
+Fuel consumption is passed as a (vessels, steps) array and the fuel type of each vessel as
+a (vessels,) array. Emission factors are looked up per vessel once, fuel is reduced once per
+axis, and every pollutant is a single broadcast multiply, so the cost is a couple of passes
+over the fuel array regardless of fleet size.
+
+`python emissions.py [vessels] [steps]` compares the engine with the per-vessel Python loop.
+"""
+
+import time
+
+import numpy as np
+
+# Per fuel type: density (kg/litre) and emission factors in kg of pollutant per kg of fuel.
+# CO2 factors are the IMO carbon conversion factors (Cf); SOx assumes typical sulphur content
+# (SO2 = 2 x sulphur mass); NOx factors are indicative values for slow/medium-speed engines.
+FUEL_TYPES = {
+    "HFO":      {"density": 0.991, "co2": 3.114, "sox": 0.0700, "nox": 0.0903},  # 3.5% S
+    "VLSFO":    {"density": 0.950, "co2": 3.151, "sox": 0.0100, "nox": 0.0903},  # 0.5% S
+    "MGO":      {"density": 0.890, "co2": 3.206, "sox": 0.0020, "nox": 0.0961},  # 0.1% S
+    "LNG":      {"density": 0.450, "co2": 2.750, "sox": 0.0000, "nox": 0.0140},
+    "METHANOL": {"density": 0.792, "co2": 1.375, "sox": 0.0000, "nox": 0.0280},
+}
+POLLUTANTS = ("co2", "sox", "nox")
+
+_FUEL_NAMES = list(FUEL_TYPES)
+_FACTORS = np.array([[FUEL_TYPES[name][p] for p in POLLUTANTS] for name in _FUEL_NAMES])  # (fuels, pollutants)
+_DENSITIES = np.array([FUEL_TYPES[name]["density"] for name in _FUEL_NAMES])
+
+
+def fuel_codes(fuel_types):
+    """
+    Maps fuel type names to row indices of the factor table.
+
+    Raises:
+        ValueError: If a fuel type is unknown.
+    """
+    names, inverse = np.unique(np.asarray(fuel_types, dtype=str), return_inverse=True)
+    upper = [name.upper() for name in names]
+    unknown = [name for name in upper if name not in FUEL_TYPES]
+    if unknown:
+        raise ValueError(f"Unknown fuel types: {', '.join(unknown)} (known: {', '.join(_FUEL_NAMES)})")
+    return np.array([_FUEL_NAMES.index(name) for name in upper])[inverse.reshape(-1)]
+
+
+def compute_fleet_emissions(fuel, fuel_types, unit="kg", distance_nm=None, capacity_dwt=None):
+    """
+    Computes emissions for every vessel and time step.
+
+    Args:
+        fuel: Fuel consumed, shape (vessels, steps) or (vessels,) for a single step. Missing
+            readings should be 0.
+        fuel_types: Fuel type name per vessel, shape (vessels,) (see FUEL_TYPES).
+        unit (str): "kg" or "litres" for the fuel array.
+        distance_nm: Optional distance sailed in nautical miles, shape (vessels, steps) or (vessels,).
+        capacity_dwt: Optional deadweight tonnage per vessel, shape (vessels,).
+
+    Returns:
+        dict:
+            fuel_kg, co2_kg, sox_kg, nox_kg: per-vessel totals, shape (vessels,)
+            fleet_co2_kg_by_step: fleet CO2 per time step, shape (steps,)
+            fleet: fleet totals of fuel, CO2, SOx and NOx (floats)
+            cii: attained CII-style intensity in g CO2 per dwt-nm per vessel (NaN where no
+                distance was sailed), when distance and capacity are given
+    """
+    fuel = np.asarray(fuel, dtype=np.float64)
+    if fuel.ndim == 1:
+        fuel = fuel[:, None]
+    codes = fuel_codes(fuel_types)
+    if codes.shape[0] != fuel.shape[0]:
+        raise ValueError(f"Expected {fuel.shape[0]} fuel types, got {codes.shape[0]}")
+    if unit == "litres":
+        scale = _DENSITIES[codes]
+    elif unit == "kg":
+        scale = np.ones(len(codes))
+    else:
+        raise ValueError("unit must be 'kg' or 'litres'")
+
+    factors = _FACTORS[codes] * scale[:, None]  # kg pollutant per fuel unit, (vessels, pollutants)
+    fuel_per_vessel = fuel.sum(axis=1)
+    per_vessel = fuel_per_vessel[:, None] * factors  # (vessels, pollutants)
+    result = {
+        "fuel_kg": fuel_per_vessel * scale,
+        **{f"{p}_kg": per_vessel[:, i] for i, p in enumerate(POLLUTANTS)},
+        "fleet_co2_kg_by_step": factors[:, 0] @ fuel,
+    }
+    fleet_totals = per_vessel.sum(axis=0)
+    result["fleet"] = {
+        "vessels": int(fuel.shape[0]),
+        "steps": int(fuel.shape[1]),
+        "fuel_kg": float(result["fuel_kg"].sum()),
+        **{f"{p}_kg": float(fleet_totals[i]) for i, p in enumerate(POLLUTANTS)},
+    }
+
+    if distance_nm is not None and capacity_dwt is not None:
+        distance = np.asarray(distance_nm, dtype=np.float64)
+        distance = distance.sum(axis=1) if distance.ndim == 2 else distance
+        transport_work = distance * np.asarray(capacity_dwt, dtype=np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            result["cii"] = np.where(transport_work > 0, result["co2_kg"] * 1000 / transport_work, np.nan)
+    return result
+
+
+def fleet_emissions_loop(fuel, fuel_types, unit="kg"):
+    """Reference implementation with per-vessel, per-step Python loops (used by the benchmark)."""
+    totals = {}
+    for vessel, (series, fuel_type) in enumerate(zip(fuel, fuel_types)):
+        factors = FUEL_TYPES[fuel_type.upper()]
+        scale = factors["density"] if unit == "litres" else 1.0
+        vessel_totals = {"fuel_kg": 0.0, "co2_kg": 0.0, "sox_kg": 0.0, "nox_kg": 0.0}
+        for amount in series:
+            kg = amount * scale
+            vessel_totals["fuel_kg"] += kg
+            for p in POLLUTANTS:
+                vessel_totals[f"{p}_kg"] += kg * factors[p]
+        totals[vessel] = vessel_totals
+    return totals
+
+
+def benchmark_emissions(vessels=5000, steps=720, seed=7):
+    """
+    Times the vectorized engine against the per-vessel loop on random fleet data and checks
+    that both agree.
+
+    Returns:
+        dict: Seconds for each implementation and the speedup.
+    """
+    rng = np.random.default_rng(seed)
+    fuel = rng.uniform(50, 100, size=(vessels, steps))
+    fuel_types = rng.choice(_FUEL_NAMES, size=vessels)
+
+    start = time.perf_counter()
+    result = compute_fleet_emissions(fuel, fuel_types, unit="litres")
+    vectorized = time.perf_counter() - start
+
+    # The loop gets plain Python lists, as the current per-vessel code would
+    fuel_lists = fuel.tolist()
+    type_list = fuel_types.tolist()
+    start = time.perf_counter()
+    reference = fleet_emissions_loop(fuel_lists, type_list, unit="litres")
+    loop = time.perf_counter() - start
+
+    expected = np.array([reference[v]["co2_kg"] for v in range(vessels)])
+    if not np.allclose(result["co2_kg"], expected):
+        raise AssertionError("Vectorized CO2 totals differ from the loop")
+    return {
+        "vessels": vessels,
+        "steps": steps,
+        "vectorized_seconds": round(vectorized, 4),
+        "loop_seconds": round(loop, 4),
+        "speedup": round(loop / vectorized, 1) if vectorized else None,
+        "fleet": result["fleet"],
+    }
+
+
+if __name__ == "__main__":
+    import json
+    import sys
+
+    args = [int(arg) for arg in sys.argv[1:3]]
+    print(json.dumps(benchmark_emissions(*args), indent=2))
@@ -0,0 +1,148 @@
+"""
+Delay and Fuel Forecasting
+--------------------------
+Predictions from running sufficient statistics instead of scans over the history tables.
+
+Triggers installed by migrations.py keep a count, sum and sum of squares per target
+("delay", "fuel") and bucket (all rows, per route, per weather, per route and weather) in
+the `forecast_stats` table as rows are inserted, updated or deleted. This module loads those
+few rows into memory, and reloads them only when the data has changed, so every prediction
+is a handful of dictionary lookups, independent of history size.
+
+A prediction starts from the overall mean and moves towards each more specific bucket in
+proportion to how much data it has (shrinkage with `prior_weight` pseudo-observations):
+overall -> weather -> route -> route and weather. Sparse buckets therefore fall back
+gracefully instead of producing noisy estimates.
+"""
+
+import math
+import threading
+import time
+
+TARGETS = ("delay", "fuel")
+
+
+def _key(value):
+    # Buckets are stored trimmed and lower-cased (see migrations.py)
+    return value.strip().lower() if isinstance(value, str) and value.strip() else None
+
+
+class RunningStatsForecaster:
+    """
+    Forecasts delays and fuel consumption from the forecast_stats table.
+
+    Args:
+        connect: Callable returning a DB-API SQLite connection (closed after each reload).
+        version: Optional callable returning a value that changes when the history tables
+            are written; the statistics are reloaded when it changes.
+        ttl_seconds (float): Maximum age of the loaded statistics (picks up writes made by
+            other processes).
+        prior_weight (float): Pseudo-observations pulling a bucket towards its parent estimate.
+    """
+
+    def __init__(self, connect, version=None, ttl_seconds=60, prior_weight=5):
+        self.connect = connect
+        self.version = version
+        self.ttl_seconds = ttl_seconds
+        self.prior_weight = prior_weight
+        self._stats = {}
+        self._loaded_version = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+        self.reloads = 0
+
+    def _current(self):
+        # Returns the loaded statistics, reloading them if the data changed or they expired
+        version = self.version() if self.version else None
+        with self._lock:
+            if version == self._loaded_version and time.monotonic() < self._expires_at:
+                return self._stats
+        conn = self.connect()
+        try:
+            rows = conn.execute("SELECT target, dimension, bucket, n, total, total_sq FROM forecast_stats").fetchall()
+        finally:
+            conn.close()
+        stats = {(target, dimension, bucket): (n, total, total_sq)
+                 for target, dimension, bucket, n, total, total_sq in rows if n > 0}
+        with self._lock:
+            self._stats = stats
+            self._loaded_version = version
+            self._expires_at = time.monotonic() + self.ttl_seconds
+            self.reloads += 1
+        return stats
+
+    def _shrink(self, bucket, parent_mean):
+        n, total, _ = bucket
+        return (total + self.prior_weight * parent_mean) / (n + self.prior_weight)
+
+    def predict(self, target, route=None, weather=None, stats=None):
+        """
+        Predicts the expected value of `target` for a route and weather condition.
+
+        Args:
+            target (str): "delay" (hours) or "fuel" (litres).
+            route (str): Route or location; optional.
+            weather (str): Weather condition; optional.
+
+        Returns:
+            dict: "prediction", "std" (spread of the most specific bucket with 2+ samples),
+            "samples" (rows in that bucket) and "basis" (the most specific bucket used);
+            "prediction" is None when there is no history for `target`.
+
+        Raises:
+            ValueError: On an unknown target.
+        """
+        if target not in TARGETS:
+            raise ValueError(f"target must be one of: {', '.join(TARGETS)}")
+        stats = stats if stats is not None else self._current()
+        overall = stats.get((target, "all", "*"))
+        if overall is None:
+            return {"prediction": None, "std": None, "samples": 0, "basis": None}
+        route, weather = _key(route), _key(weather)
+        estimate = overall[1] / overall[0]
+        spread_from, basis = overall, "all"
+        for dimension, bucket in (("weather", weather), ("route", route),
+                                  ("route_weather", f"{route}|{weather}" if route and weather else None)):
+            if bucket is None:
+                continue
+            found = stats.get((target, dimension, bucket))
+            if found is None:
+                continue
+            estimate = self._shrink(found, estimate)
+            basis = dimension
+            if found[0] >= 2:
+                spread_from = found
+        n, total, total_sq = spread_from
+        variance = max(0.0, (total_sq - total * total / n) / (n - 1)) if n > 1 else None
+        return {
+            "prediction": round(estimate, 3),
+            "std": round(math.sqrt(variance), 3) if variance is not None else None,
+            "samples": spread_from[0],
+            "basis": basis,
+        }
+
+    def score_batch(self, target, items):
+        """
+        Predicts `target` for many items at once, using one snapshot of the statistics.
+
+        Args:
+            target (str): "delay" or "fuel".
+            items (list): Dicts with optional "route" (or "location") and "weather"; other keys
+                (e.g. "shipment_name") are passed through.
+
+        Returns:
+            list: One dict per item: the item's keys plus the prediction fields.
+        """
+        stats = self._current()
+        return [
+            {**item, **self.predict(target, item.get("route") or item.get("location"), item.get("weather"), stats)}
+            for item in items
+        ]
+
+    def summary(self, target, dimension="all"):
+        """Returns {bucket: {"mean", "samples"}} for one dimension of a target."""
+        stats = self._current()
+        return {
+            bucket: {"mean": round(total / n, 3), "samples": n}
+            for (t, d, bucket), (n, total, _) in stats.items() if t == target and d == dimension
+        }
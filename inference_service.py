@@ -0,0 +1,262 @@
+"""
+Inference Service
+-----------------
+A separate process that holds the language models once and serves chatbot generation
+to every Flask worker over a local socket (multiprocessing.connection).
+
+Run it next to the web workers:
+
+    INFERENCE_SERVICE_ADDRESS=127.0.0.1:6001 python inference_service.py
+
+and start the web workers with the same INFERENCE_SERVICE_ADDRESS; `ai_chatbot` then calls
+the service through `InferenceClient` instead of loading GPT-Neo in each worker. Requests
+from all workers go through the service's micro-batcher and response cache. The service
+runs chat_engine.py only, not the web application and its scheduled jobs.
+
+Connections are authenticated with a shared key (multiprocessing.connection unpickles what
+it receives, so the key must stay secret). INFERENCE_SERVICE_AUTHKEY sets it and is required
+when the service listens on anything but loopback or a Unix socket; otherwise the first
+process to start writes a random key to INFERENCE_SERVICE_AUTHKEY_FILE
+(default instance/inference_service.key, readable by the owner only) and the others read it.
+
+Protocol (pickled dicts):
+    request:  {"prompt": str, "speculative": bool or None, "stream": bool}
+    response: {"response": str} | {"token": str}... {"done": True} | {"error": str, "busy": bool}
+"""
+
+import ipaddress
+import logging
+import os
+import queue
+import secrets
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+
+
+class InferenceServiceBusy(Exception):
+    """Raised when the inference service rejects a request because too many are pending."""
+
+
+def parse_address(address):
+    """
+    Parses "host:port" into a TCP address tuple; anything else is used as a Unix socket path.
+    """
+    host, sep, port = address.rpartition(':')
+    if sep and port.isdigit():
+        return (host or '127.0.0.1', int(port))
+    return address
+
+
+def is_local_address(address):
+    """True for loopback TCP addresses and Unix socket paths."""
+    if not isinstance(address, tuple):
+        return True
+    host = address[0]
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def service_authkey(address):
+    """
+    Returns the shared key for the service at `address`.
+
+    Uses INFERENCE_SERVICE_AUTHKEY when set. Otherwise, for local addresses only, reads the key
+    file, creating it with a random key if it does not exist yet.
+
+    Raises:
+        RuntimeError: If the address is not local and INFERENCE_SERVICE_AUTHKEY is not set.
+    """
+    if os.environ.get('INFERENCE_SERVICE_AUTHKEY'):
+        return os.environ['INFERENCE_SERVICE_AUTHKEY'].encode('utf-8')
+    if not is_local_address(address):
+        raise RuntimeError(f"INFERENCE_SERVICE_AUTHKEY must be set for the non-loopback address {address}")
+    path = os.environ.get('INFERENCE_SERVICE_AUTHKEY_FILE') or os.path.join(os.getcwd(), 'instance', 'inference_service.key')
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    try:
+        # O_EXCL: if several processes start together, exactly one writes the key
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        for _ in range(50):
+            with open(path) as key_file:
+                key = key_file.read().strip()
+            if key:
+                return key.encode('utf-8')
+            time.sleep(0.1)  # the creating process has not written it yet
+        raise RuntimeError(f"Inference service key file {path} is empty")
+    key = secrets.token_hex(32)
+    with os.fdopen(fd, 'w') as key_file:
+        key_file.write(key)
+    logging.info(f"Generated inference service key in {path}")
+    return key.encode('utf-8')
+
+
+class InferenceServer:
+    """
+    Accepts client connections and answers chat requests with the given functions.
+
+    Args:
+        address: TCP (host, port) tuple or Unix socket path.
+        authkey (bytes): Shared secret clients must present.
+        chat_fn (callable): chat_fn(prompt, speculative=...) -> str.
+        stream_fn (callable): stream_fn(prompt, speculative=...) -> iterator of str.
+        max_pending (int): Requests in progress before new ones are rejected as busy.
+    """
+
+    def __init__(self, address, authkey, chat_fn, stream_fn, max_pending=32):
+        self.address = address
+        self.authkey = authkey
+        self.chat_fn = chat_fn
+        self.stream_fn = stream_fn
+        self.max_pending = max_pending
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def serve_forever(self):
+        with Listener(self.address, authkey=self.authkey) as listener:
+            logging.info(f"Inference service listening on {self.address} (max {self.max_pending} pending requests)")
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    logging.warning(f"Rejected inference client connection: {e}")
+                    continue
+                threading.Thread(target=self._handle, args=(conn,), name="inference-conn", daemon=True).start()
+
+    def _handle(self, conn):
+        with conn:
+            while True:
+                try:
+                    request = conn.recv()
+                except (EOFError, OSError):
+                    return
+                if not self._slots.acquire(blocking=False):
+                    conn.send({"error": "Inference service is busy", "busy": True})
+                    continue
+                try:
+                    prompt = request.get("prompt", "")
+                    speculative = request.get("speculative")
+                    if request.get("stream"):
+                        for piece in self.stream_fn(prompt, speculative=speculative):
+                            conn.send({"token": piece})
+                        conn.send({"done": True})
+                    else:
+                        conn.send({"response": self.chat_fn(prompt, speculative=speculative)})
+                except (EOFError, OSError):
+                    return
+                except Exception as e:
+                    logging.error(f"Inference request failed: {e}")
+                    conn.send({"error": str(e)})
+                finally:
+                    self._slots.release()
+
+
+class InferenceClient:
+    """
+    Client used by web workers to call the inference service.
+
+    Connections are pooled and reused; a stale pooled connection is replaced once.
+
+    Args:
+        address: TCP (host, port) tuple or Unix socket path.
+        authkey (bytes): Shared secret of the service.
+        timeout (float): Seconds to wait for each reply (each token when streaming).
+        pool_size (int): Idle connections kept for reuse.
+    """
+
+    def __init__(self, address, authkey, timeout=120, pool_size=4):
+        self.address = address
+        self.authkey = authkey
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self._pool = queue.LifoQueue()
+
+    def _acquire(self, fresh=False):
+        if not fresh:
+            try:
+                return self._pool.get_nowait()
+            except queue.Empty:
+                pass
+        return Client(self.address, authkey=self.authkey)
+
+    def _release(self, conn):
+        if self._pool.qsize() < self.pool_size:
+            self._pool.put(conn)
+        else:
+            conn.close()
+
+    def _recv(self, conn):
+        if not conn.poll(self.timeout):
+            raise TimeoutError(f"Inference service did not reply within {self.timeout}s")
+        reply = conn.recv()
+        if "error" in reply:
+            if reply.get("busy"):
+                raise InferenceServiceBusy(reply["error"])
+            raise RuntimeError(reply["error"])
+        return reply
+
+    def _send(self, request):
+        # A pooled connection may have been closed by a service restart; retry once on a new one.
+        for fresh in (False, True):
+            conn = self._acquire(fresh=fresh)
+            try:
+                conn.send(request)
+                return conn
+            except (EOFError, OSError):
+                conn.close()
+                if fresh:
+                    raise
+
+    def chat(self, prompt, speculative=None):
+        """Returns the full chatbot response for `prompt`."""
+        conn = self._send({"prompt": prompt, "speculative": speculative, "stream": False})
+        try:
+            reply = self._recv(conn)
+        except (InferenceServiceBusy, RuntimeError):
+            self._release(conn)
+            raise
+        except Exception:
+            conn.close()
+            raise
+        self._release(conn)
+        return reply["response"]
+
+    def stream(self, prompt, speculative=None):
+        """Yields response text pieces from the service as they are generated."""
+        conn = self._send({"prompt": prompt, "speculative": speculative, "stream": True})
+        try:
+            while True:
+                reply = self._recv(conn)
+                if reply.get("done"):
+                    break
+                yield reply["token"]
+        except (InferenceServiceBusy, RuntimeError):
+            self._release(conn)
+            raise
+        except BaseException:
+            # Timeouts or an abandoned stream leave unread messages on the connection
+            conn.close()
+            raise
+        self._release(conn)
+
+
+if __name__ == "__main__":
+    # Only the chat engine is needed here: importing main.py would also start its scheduler jobs,
+    # run migrations and build the web application's stores in this process
+    import chat_engine
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if chat_engine.CONFIG['MODEL_WARMUP']:
+        chat_engine.model_registry.warm_async(chat_engine.CONFIG['MODEL_WARMUP'])
+    address = parse_address(os.environ.get('INFERENCE_SERVICE_ADDRESS', '127.0.0.1:6001'))
+    server = InferenceServer(
+        address,
+        service_authkey(address),
+        chat_fn=chat_engine.answer,
+        stream_fn=chat_engine.stream_answer,
+        max_pending=int(os.environ.get('INFERENCE_SERVICE_MAX_PENDING', 32))
+    )
+    server.serve_forever()
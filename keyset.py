@@ -0,0 +1,57 @@
+"""
+Keyset Pagination
+-----------------
+Opaque cursors and page reads for the list APIs.
+
+A page is read with `WHERE id > :last_id ORDER BY id LIMIT :limit + 1`, so every page costs
+the same index range scan however deep the client has paged, and the extra row tells
+whether a next page exists. The cursor handed to clients encodes the id of the last row
+returned.
+"""
+
+import base64
+import json
+
+
+def encode_cursor(last_id):
+    """Returns the opaque cursor token for a page ending at `last_id`."""
+    return base64.urlsafe_b64encode(json.dumps({"id": last_id}).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """
+    Returns the last id encoded in a cursor token.
+
+    Raises:
+        ValueError: If the token is not a cursor produced by `encode_cursor`.
+    """
+    padded = token + '=' * (-len(token) % 4)
+    try:
+        return int(json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))["id"])
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+def fetch_page(query, id_column, limit, cursor=None):
+    """
+    Reads one page of a SQLAlchemy query in id order, starting after the cursor.
+
+    Args:
+        query: Query whose first selected column is `id_column`.
+        id_column: The keyset column (a unique, indexed integer id).
+        limit (int): Rows per page.
+        cursor (str): Token returned with the previous page; None for the first page.
+
+    Returns:
+        tuple: (rows, next_cursor); next_cursor is None on the last page.
+
+    Raises:
+        ValueError: If the cursor is invalid.
+    """
+    if cursor:
+        query = query.filter(id_column > decode_cursor(cursor))
+    rows = query.order_by(id_column).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1][0])
@@ -0,0 +1,303 @@
+"""
+Live Vessel Feed
+----------------
+Ingestion client for an external AIS-style vessel tracking API, plus a local mock server
+that speaks the same protocol for tests and load checks.
+
+Expected API:
+    GET {base_url}/vessels?region=R&page=N&page_size=M
+    -> {"data": [{...vessel...}, ...], "page": N, "total_pages": T}
+
+The client
+- reuses pooled HTTP connections through one requests.Session,
+- fetches regions, and the remaining pages of each region, concurrently with bounded parallelism,
+- sends If-None-Match / If-Modified-Since and reuses the previous page on 304 Not Modified,
+- retries connection errors, 429 and 5xx responses with exponential backoff (honouring Retry-After),
+- applies connect/read timeouts to every request.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+def normalize_vessel(record):
+    """Maps an AIS-style record onto the {name, destination, status} shape used by the Vessel table."""
+    return {
+        "name": record.get("name") or record.get("vessel_name") or record.get("shipname"),
+        "destination": record.get("destination") or "Unknown",
+        "status": record.get("status") or record.get("nav_status") or "Unknown",
+    }
+
+
+
+def diff_vessels(current, feed):
+    """
+    Compares the stored vessels with a feed, keyed on vessel name.
+
+    Args:
+        current: Stored (id, name, destination, status) rows in id order; rows repeating an
+            earlier name are duplicates and are deleted.
+        feed (list): Vessel dicts [{name, destination, status}, ...]; later entries win on duplicate names.
+
+    Returns:
+        dict: "inserts" and "updates" (column mappings, updates keyed by id), "delete_ids" and
+        the "unchanged" count.
+    """
+    incoming = {v["name"]: v for v in feed if v.get("name")}
+    stored = {}
+    duplicate_ids = []
+    for row_id, name, destination, status in current:
+        if name in stored:
+            duplicate_ids.append(row_id)
+        else:
+            stored[name] = (row_id, destination, status)
+
+    inserts, updates = [], []
+    for name, v in incoming.items():
+        existing = stored.get(name)
+        if existing is None:
+            inserts.append({"name": name, "destination": v["destination"], "status": v["status"]})
+        elif existing[1:] != (v["destination"], v["status"]):
+            updates.append({"id": existing[0], "destination": v["destination"], "status": v["status"]})
+    return {
+        "inserts": inserts,
+        "updates": updates,
+        "delete_ids": [row[0] for name, row in stored.items() if name not in incoming] + duplicate_ids,
+        "unchanged": len(incoming) - len(inserts) - len(updates),
+    }
+
+class LiveFeedClient:
+    """
+    Fetches every page of every region of the vessel feed.
+
+    Args:
+        base_url (str): Root URL of the tracking API.
+        api_key (str): Sent as a Bearer token when given.
+        regions (list): Region codes to fetch; [None] fetches the unpartitioned feed.
+        max_workers (int): Maximum concurrent requests (and pooled connections).
+        timeout (float): Read timeout per request in seconds (connect timeout is 3.05s).
+        retries (int): Retry attempts for connection errors, 429 and 5xx responses.
+        backoff (float): Backoff factor; waits backoff * 2**(attempt - 1) seconds between retries.
+        page_size (int): Records requested per page.
+    """
+
+    def __init__(self, base_url, api_key=None, regions=None, max_workers=8, timeout=20,
+                 retries=3, backoff=0.5, page_size=1000):
+        self.base_url = base_url.rstrip('/')
+        self.regions = list(regions) if regions else [None]
+        self.max_workers = max_workers
+        self.timeout = (3.05, timeout)
+        self.page_size = page_size
+        self.session = requests.Session()
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(["GET"]),
+            respect_retry_after_header=True,
+        )
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers, max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if api_key:
+            self.session.headers['Authorization'] = f'Bearer {api_key}'
+        self._pages = {}  # (region, page) -> (etag, last_modified, payload)
+        self._lock = threading.Lock()
+        # Region and page fetches run in separate executors; this caps their combined
+        # requests at max_workers, the size of the connection pool
+        self._request_slots = threading.BoundedSemaphore(max_workers)
+        self.last_stats = {}
+
+    def _fetch_page(self, region, page):
+        # Returns (payload, changed) for one page, using conditional headers when it was seen before.
+        params = {"page": page, "page_size": self.page_size}
+        if region:
+            params["region"] = region
+        with self._lock:
+            cached = self._pages.get((region, page))
+        headers = {}
+        if cached:
+            etag, last_modified, _ = cached
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+        response = self._get(params, headers)
+        if response.status_code == 304:
+            if cached:
+                return cached[2], False
+            # Not Modified with nothing cached (e.g. after a restart, answered for an old ETag
+            # by an intermediary): ask once more without any conditional headers
+            response = self._get(params, {'If-None-Match': None, 'If-Modified-Since': None, 'Cache-Control': 'no-cache'})
+            if response.status_code == 304:
+                raise requests.HTTPError(
+                    f"304 Not Modified for uncached page {page} of region {region}", response=response)
+        response.raise_for_status()
+        payload = response.json()
+        with self._lock:
+            self._pages[(region, page)] = (response.headers.get('ETag'), response.headers.get('Last-Modified'), payload)
+        return payload, True
+
+    def _get(self, params, headers):
+        with self._request_slots:
+            return self.session.get(f"{self.base_url}/vessels", params=params, headers=headers, timeout=self.timeout)
+
+    def _fetch_region(self, executor, region):
+        first, changed = self._fetch_page(region, 1)
+        total_pages = int(first.get("total_pages") or 1)
+        pages = [first]
+        if total_pages > 1:
+            # Remaining pages are independent once the page count is known
+            futures = [executor.submit(self._fetch_page, region, page) for page in range(2, total_pages + 1)]
+            for future in futures:
+                payload, page_changed = future.result()
+                pages.append(payload)
+                changed = changed or page_changed
+        return [record for payload in pages for record in payload.get("data", [])], changed, total_pages
+
+    def fetch_all(self):
+        """
+        Fetches the full feed.
+
+        Returns:
+            tuple: (records, changed) where `changed` is False if every page was 304 Not Modified.
+        """
+        start = time.perf_counter()
+        records, changed, pages = [], False, 0
+        # Region fetches run in their own pool so their page fan-out cannot starve them of workers
+        with ThreadPoolExecutor(max_workers=self.max_workers) as page_executor, \
+                ThreadPoolExecutor(max_workers=min(self.max_workers, len(self.regions))) as region_executor:
+            futures = [region_executor.submit(self._fetch_region, page_executor, region) for region in self.regions]
+            for future in futures:
+                region_records, region_changed, region_pages = future.result()
+                records.extend(region_records)
+                changed = changed or region_changed
+                pages += region_pages
+        elapsed = time.perf_counter() - start
+        self.last_stats = {
+            "records": len(records),
+            "pages": pages,
+            "changed": changed,
+            "seconds": round(elapsed, 3),
+            "records_per_second": round(len(records) / elapsed, 1) if elapsed else 0,
+        }
+        logging.info(f"Live feed fetched: {self.last_stats}")
+        return records, changed
+
+    def close(self):
+        self.session.close()
+
+
+class _MockHTTPServer(ThreadingHTTPServer):
+    # Every request opens a new connection (HTTP/1.0); the default listen backlog of 5
+    # overflows under concurrent clients and stalls them for a second on SYN retransmits
+    request_queue_size = 128
+    daemon_threads = True
+
+
+class MockFeedServer:
+    """
+    Local HTTP server implementing the feed API, for tests and load checks.
+
+    Args:
+        records_by_region (dict): region -> list of records (use key None for an unpartitioned feed).
+        fail_first (int): Number of initial requests answered with 503, to exercise retries.
+    """
+
+    def __init__(self, records_by_region, fail_first=0):
+        self.records_by_region = records_by_region
+        self.fail_first = fail_first
+        self.requests = 0
+        self.not_modified = 0
+        self.last_modified = formatdate(usegmt=True)
+        self._server = None
+        self._thread = None
+
+    def set_records(self, records_by_region):
+        """Replaces the served data, changing ETags and Last-Modified."""
+        self.records_by_region = records_by_region
+        self.last_modified = formatdate(usegmt=True)
+
+    def start(self):
+        """Starts serving on a free local port and returns the base URL."""
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                mock.requests += 1
+                if mock.fail_first > 0:
+                    mock.fail_first -= 1
+                    self.send_response(503)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                region = query.get('region', [None])[0]
+                page = int(query.get('page', ['1'])[0])
+                page_size = int(query.get('page_size', ['1000'])[0])
+                records = mock.records_by_region.get(region, [])
+                total_pages = max(1, -(-len(records) // page_size))
+                body = json.dumps({
+                    "data": records[(page - 1) * page_size:page * page_size],
+                    "page": page,
+                    "total_pages": total_pages,
+                }).encode('utf-8')
+                etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+                if self.headers.get('If-None-Match') == etag:
+                    mock.not_modified += 1
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('ETag', etag)
+                self.send_header('Last-Modified', mock.last_modified)
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._server = _MockHTTPServer(('127.0.0.1', 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-feed", daemon=True)
+        self._thread.start()
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+if __name__ == "__main__":
+    # Load check: ingest 40k AIS-style records across 4 regions from the mock server
+    regions = ["north", "south", "east", "west"]
+    data = {
+        region: [
+            {"shipname": f"{region.title()} Vessel {i}", "destination": f"Port {i % 50}", "nav_status": "Under way"}
+            for i in range(10000)
+        ]
+        for region in regions
+    }
+    server = MockFeedServer(data, fail_first=2)
+    client = LiveFeedClient(server.start(), regions=regions, page_size=1000)
+    records, changed = client.fetch_all()
+    print("first fetch:", client.last_stats)
+    records, changed = client.fetch_all()
+    print("conditional refetch:", client.last_stats, "304 responses:", server.not_modified)
+    client.close()
+    server.stop()
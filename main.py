@@ -23,13 +23,37 @@ Author: Your Company Name
 import random
 import time
 import os
-from flask import Flask, render_template, request, jsonify, redirect, flash
-from transformers import pipeline, AutoModelForCausalLM, AutoTokenizer
+import json
+import csv
+import operator
+import threading
+from datetime import datetime
+from urllib.parse import urlencode
+from flask import Flask, render_template, request, jsonify, redirect, flash, Response, stream_with_context, g
 import logging
+import click
 from flask_sqlalchemy import SQLAlchemy
-import sqlite3
 import requests
 from apscheduler.schedulers.background import BackgroundScheduler
+from chat_engine import (CONFIG as CHAT_CONFIG, model_registry, chat_batcher, response_cache,
+                         answer, stream_answer)
+from db_pool import engine_options, default_pragmas
+from migrations import apply_migrations
+from bulk_import import IMPORT_SPECS, SAMPLE_RECORDS, detect_format, open_records, import_records
+from change_tracking import ChangeTracker, VersionedCache
+from keyset import fetch_page
+from data_export import EXPORT_FORMATS, export_query, iter_chunks, csv_chunks, ndjson_chunks, columnar_chunks, gzip_chunks
+from telemetry import TelemetryStore, acquire_process_lock
+from emissions import compute_fleet_emissions
+from berth_scheduling import BerthScheduler
+from crane_allocation import CraneAllocator
+from route_engine import RouteGraph, RouteEngine, SAMPLE_NETWORK
+from forecasting import RunningStatsForecaster
+from maintenance import refresh_scores, record_service, get_score
+from live_feed import LiveFeedClient, diff_vessels, normalize_vessel
+from inference_service import InferenceClient, InferenceServiceBusy, parse_address, service_authkey
+from metrics import (registry as metrics_registry, CONTENT_TYPE as METRICS_CONTENT_TYPE, instrument_engine,
+                     timed_connection, track_request, observe_request, timed_job)
 
 # Ensure the instance directory exists
 instance_dir = os.path.join(os.getcwd(), 'instance')
@@ -61,6 +85,76 @@ app = Flask(__name__)
 app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{absolute_db_path}'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+# SQLite tuning: pooled WAL connections shared by SQLAlchemy and raw SQL (see db_pool.py)
+app.config['SQLITE_POOL_SIZE'] = int(os.environ.get('SQLITE_POOL_SIZE', 10))
+app.config['SQLITE_MAX_OVERFLOW'] = int(os.environ.get('SQLITE_MAX_OVERFLOW', 10))
+app.config['SQLITE_CACHE_MB'] = int(os.environ.get('SQLITE_CACHE_MB', 64))
+app.config['SQLITE_MMAP_MB'] = int(os.environ.get('SQLITE_MMAP_MB', 256))
+
+# Instrumentation exported at /api/metrics: per-route request latency and the queries each request ran
+# (see metrics.py). The per-statement duration histogram times every statement, including background
+# jobs, and is off unless METRICS_DB_STATEMENTS is set.
+app.config['METRICS_ENABLED'] = os.environ.get('METRICS_ENABLED', '1') == '1'
+app.config['METRICS_DB_STATEMENTS'] = os.environ.get('METRICS_DB_STATEMENTS', '0') == '1'
+
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(
+    absolute_db_path,
+    pool_size=app.config['SQLITE_POOL_SIZE'],
+    max_overflow=app.config['SQLITE_MAX_OVERFLOW'],
+    pragmas=default_pragmas(cache_mb=app.config['SQLITE_CACHE_MB'], mmap_mb=app.config['SQLITE_MMAP_MB'])
+)
+
+# Model loading, precision, chat micro-batching, prefix reuse, assisted decoding and the chat
+# response cache, read from the environment by chat_engine.py (see CONFIG there)
+app.config.update(CHAT_CONFIG)
+
+# Shared inference service (see inference_service.py): when set, web workers send generation there instead of loading models
+app.config['INFERENCE_SERVICE_ADDRESS'] = os.environ.get('INFERENCE_SERVICE_ADDRESS', '')
+app.config['INFERENCE_SERVICE_TIMEOUT'] = float(os.environ.get('INFERENCE_SERVICE_TIMEOUT', 120))
+
+# Dashboard: seconds cached metrics may be served (writes in this process invalidate them immediately) and page size
+app.config['DASHBOARD_CACHE_TTL_SECONDS'] = float(os.environ.get('DASHBOARD_CACHE_TTL_SECONDS', 30))
+app.config['DASHBOARD_PAGE_SIZE'] = int(os.environ.get('DASHBOARD_PAGE_SIZE', 20))
+
+# List APIs: default and maximum rows per page
+app.config['API_PAGE_SIZE'] = int(os.environ.get('API_PAGE_SIZE', 100))
+app.config['API_MAX_PAGE_SIZE'] = int(os.environ.get('API_MAX_PAGE_SIZE', 1000))
+
+# Fuel type assumed for vessels when computing emissions (see emissions.FUEL_TYPES)
+app.config['DEFAULT_FUEL_TYPE'] = os.environ.get('DEFAULT_FUEL_TYPE', 'MGO')
+
+# Route engine: network JSON file (unset uses the built-in sample network), route cache size,
+# landmark trees to precompute per vessel draft, and the origin port and vessel class used when a request gives none
+app.config['ROUTE_NETWORK_FILE'] = os.environ.get('ROUTE_NETWORK_FILE', '')
+app.config['ROUTE_CACHE_SIZE'] = int(os.environ.get('ROUTE_CACHE_SIZE', 4096))
+app.config['ROUTE_LANDMARKS'] = int(os.environ.get('ROUTE_LANDMARKS', 8))
+app.config['ROUTE_HOME_PORT'] = os.environ.get('ROUTE_HOME_PORT', 'Singapore')
+app.config['ROUTE_VESSEL_CLASS'] = os.environ.get('ROUTE_VESSEL_CLASS', 'panamax')
+
+# Predictive maintenance: operating hours between services at nominal load, and minutes between fleet re-scoring
+app.config['MAINTENANCE_SERVICE_HOURS'] = float(os.environ.get('MAINTENANCE_SERVICE_HOURS', 6000))
+app.config['MAINTENANCE_SCORE_MINUTES'] = int(os.environ.get('MAINTENANCE_SCORE_MINUTES', 60))
+
+# Seconds between recorded fuel/emissions monitoring samples (0 disables the scheduled sampling)
+app.config['TELEMETRY_SAMPLE_SECONDS'] = int(os.environ.get('TELEMETRY_SAMPLE_SECONDS', 300))
+# Only the process holding this lock records samples, so extra WSGI workers and the inference
+# service do not write duplicate readings
+app.config['TELEMETRY_SAMPLER_LOCK'] = os.environ.get('TELEMETRY_SAMPLER_LOCK',
+                                                      os.path.join(instance_dir, 'telemetry_sampler.lock'))
+
+# Records written per transaction by the bulk importer
+app.config['IMPORT_BATCH_SIZE'] = int(os.environ.get('IMPORT_BATCH_SIZE', 5000))
+
+# Rows fetched per chunk when streaming /api/export
+app.config['EXPORT_CHUNK_SIZE'] = int(os.environ.get('EXPORT_CHUNK_SIZE', 5000))
+
+# Live vessel feed: tracking API base URL (unset uses demo data), key, regions fetched concurrently, parallelism and timeout
+app.config['LIVE_FEED_URL'] = os.environ.get('LIVE_FEED_URL', '')
+app.config['LIVE_FEED_API_KEY'] = os.environ.get('LIVE_FEED_API_KEY', '')
+app.config['LIVE_FEED_REGIONS'] = [r for r in os.environ.get('LIVE_FEED_REGIONS', '').split(',') if r]
+app.config['LIVE_FEED_WORKERS'] = int(os.environ.get('LIVE_FEED_WORKERS', 8))
+app.config['LIVE_FEED_TIMEOUT'] = float(os.environ.get('LIVE_FEED_TIMEOUT', 20))
+
 # Set the secret key for session management
 app.secret_key = 'your_secret_key'
 
@@ -70,23 +164,29 @@ db = SQLAlchemy(app)
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 # Define database models
+# Index names match migrations.py, which adds them to databases created before they existed
 class Vessel(db.Model):
+    __table_args__ = (db.Index('ix_vessel_status_destination', 'status', 'destination'),)
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), nullable=False)
+    name = db.Column(db.String(100), nullable=False, index=True)
     destination = db.Column(db.String(100), nullable=False)
     status = db.Column(db.String(100), nullable=False)
 
 class Logistics(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    shipment_name = db.Column(db.String(100), nullable=False)
+    shipment_name = db.Column(db.String(100), nullable=False, index=True)
     location = db.Column(db.String(100), nullable=False)
-    delay = db.Column(db.Integer, nullable=False)
+    delay = db.Column(db.Integer, nullable=False, index=True)
 
 class Sustainability(db.Model):
+    __table_args__ = (db.Index('ix_sustainability_sample', 'vessel_name', 'fuel_consumption', 'emissions'),)
     id = db.Column(db.Integer, primary_key=True)
     vessel_name = db.Column(db.String(100), nullable=False)
     fuel_consumption = db.Column(db.Float, nullable=False)
     emissions = db.Column(db.Float, nullable=False)
+    # Linked to the vessel with the same name by database triggers (see migrations.py)
+    vessel_id = db.Column(db.Integer, db.ForeignKey('vessel.id', ondelete='SET NULL'), index=True)
+    vessel = db.relationship('Vessel', backref=db.backref('sustainability_records', passive_deletes=True))
 
 # Error handling
 @app.errorhandler(404)
@@ -97,90 +197,212 @@ def page_not_found(e):
 def internal_server_error(e):
     return render_template('500.html'), 500
 
+# Request instrumentation: latency per route template and the database queries each request ran
+if app.config['METRICS_ENABLED']:
+    @app.before_request
+    def start_request_metrics():
+        g.request_started = time.perf_counter()
+        track_request()
+
+    @app.after_request
+    def record_request_metrics(response):
+        started = g.pop('request_started', None)
+        if started is not None:
+            # Streamed responses are measured up to the start of the body
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            observe_request(route, request.method, response.status_code, time.perf_counter() - started)
+        return response
+
+# Utility: Get SQLite connection (for raw SQL operations)
+def get_db_connection():
+    """
+    Borrows a tuned connection from the shared SQLAlchemy pool.
+    Calling close() returns it to the pool; uncommitted work is rolled back.
+    """
+    return pooled_connector(db.engine)()
+
+# Connection factory for long-lived stores: borrows like get_db_connection without needing an app context.
+# Raw connections bypass the engine's events, so they are timed by a wrapper while metrics are collected.
+def pooled_connector(engine):
+    def connect():
+        conn = engine.raw_connection()
+        return timed_connection(conn) if app.config['METRICS_ENABLED'] else conn
+    return connect
+
+# Apply pending schema migrations (indexes, foreign keys, raw-SQL tables) once at startup
+def run_migrations():
+    conn = get_db_connection()
+    try:
+        version = apply_migrations(conn)
+        logging.info(f"Database schema at version {version}.")
+    finally:
+        conn.close()
+
 # Initialize the database
 with app.app_context():
     db.create_all()
+    run_migrations()
+
+# Track writes per table so cached aggregates are invalidated when the underlying data changes
+change_tracker = ChangeTracker()
+with app.app_context():
+    change_tracker.attach(db.engine)
+
+# Time SQLAlchemy queries with the engine's cursor events (raw connections are wrapped in pooled_connector)
+if app.config['METRICS_ENABLED']:
+    with app.app_context():
+        instrument_engine(db.engine, statements=app.config['METRICS_DB_STATEMENTS'])
+
+# Append-only fuel/emissions telemetry with hourly and daily rollups (see telemetry.py)
+with app.app_context():
+    telemetry_store = TelemetryStore(pooled_connector(db.engine))
+
+# Store telemetry samples; raw-SQL writes bypass the engine hook, so dependent caches are invalidated here
+def record_telemetry(samples):
+    stored = telemetry_store.append(samples)
+    if stored:
+        change_tracker.bump('telemetry')
+    return stored
+
+# Delay and fuel forecasts from running statistics kept current by database triggers (see forecasting.py)
+with app.app_context():
+    forecaster = RunningStatsForecaster(
+        pooled_connector(db.engine),
+        version=lambda: change_tracker.version('operations', 'voyages', 'logistics'),
+        ttl_seconds=app.config['DASHBOARD_CACHE_TTL_SECONDS']
+    )
 
 # Function to automate vessel scheduling
 def automate_scheduling():
     print("Automating vessel scheduling...")
-    # Example: Randomly assign berths to vessels
-    vessels = ["Vessel A", "Vessel B", "Vessel C"]
-    berths = ["Berth 1", "Berth 2", "Berth 3"]
-    schedule = {vessel: random.choice(berths) for vessel in vessels}
-    print("Schedule:", schedule)
+    # Example: Assign berths from ETAs (hours from now), service times and vessel/berth lengths (m)
+    berths = [
+        {"name": "Berth 1", "length": 300},
+        {"name": "Berth 2", "length": 250},
+        {"name": "Berth 3", "length": 200}
+    ]
+    calls = [
+        {"vessel": "Vessel A", "eta": 2, "duration": 12, "length": 280},
+        {"vessel": "Vessel B", "eta": 3, "duration": 8, "length": 190},
+        {"vessel": "Vessel C", "eta": 5, "duration": 10, "length": 240}
+    ]
+    schedule = BerthScheduler(berths).plan(calls)
+    print("Schedule:", {a["vessel"]: f'{a["berth"]} at +{a["start"]:.1f}h' for a in schedule["assignments"]})
+    return schedule
+
+# Sample quay cranes: handling rate (tonnes/hour), lift capacity (tonnes) and CO2 per working hour (kg)
+SAMPLE_CRANES = [
+    {"name": "Crane 1", "rate": 40, "capacity": 50, "emissions_per_hour": 95},
+    {"name": "Crane 2", "rate": 30, "capacity": 65, "emissions_per_hour": 40},
+    {"name": "Crane 3", "rate": 25, "capacity": 40, "emissions_per_hour": 30}
+]
 
 # Function to optimize resource allocation
 def optimize_resources():
     print("Optimizing resource allocation...")
-    # Example: Allocate cranes based on cargo weight
+    # Example: Allocate cranes based on cargo weight (tonnes), minimizing the time until all cargo is handled
     cargo_weights = {"Vessel A": 100, "Vessel B": 200, "Vessel C": 150}
-    cranes = ["Crane 1", "Crane 2", "Crane 3"]
-    allocation = {vessel: cranes[i % len(cranes)] for i, vessel in enumerate(cargo_weights)}
-    print("Resource Allocation:", allocation)
+    vessels = [{"vessel": vessel, "cargo_weight": weight} for vessel, weight in cargo_weights.items()]
+    result = CraneAllocator(SAMPLE_CRANES).allocate(vessels)
+    allocation = result["allocation"]
+    print("Resource Allocation:", allocation, f"(all cargo handled in {result['makespan']:.2f} h)")
+    return allocation
 
 # Function for intelligent operations
 def intelligent_operations():
     print("Running intelligent operations...")
     # Example: Predict delays based on weather conditions
     weather_conditions = ["Clear", "Rainy", "Stormy"]
-    delays = {condition: random.randint(0, 5) for condition in weather_conditions}
+    delays = {condition: forecaster.predict("delay", weather=condition)["prediction"] for condition in weather_conditions}
     print("Predicted Delays (hours):", delays)
+    return delays
 
-# Initialize the Hugging Face text generation pipeline
-generator = pipeline("text-generation", model="gpt2")
-
-# Load GPT-2 model and tokenizer
-gpt2_model_name = "gpt2"
-gpt2_tokenizer = AutoTokenizer.from_pretrained(gpt2_model_name)
-gpt2_model = AutoModelForCausalLM.from_pretrained(gpt2_model_name)
-
-# Switch to GPT-Neo model and tokenizer
-gpt_neo_model_name = "EleutherAI/gpt-neo-1.3B"
-gpt_neo_tokenizer = AutoTokenizer.from_pretrained(gpt_neo_model_name)
-gpt_neo_model = AutoModelForCausalLM.from_pretrained(gpt_neo_model_name)
+# Client for the shared inference service; None when this process runs the models itself
+inference_client = None
+if app.config['INFERENCE_SERVICE_ADDRESS']:
+    inference_address = parse_address(app.config['INFERENCE_SERVICE_ADDRESS'])
+    inference_client = InferenceClient(
+        inference_address,
+        service_authkey(inference_address),
+        timeout=app.config['INFERENCE_SERVICE_TIMEOUT']
+    )
 
 # Function for AI-powered communication
-def ai_chatbot(prompt):
+def ai_chatbot(prompt, speculative=None):
     try:
-        # Add detailed context and examples to the prompt
-        contextual_prompt = (
-            "You are a helpful assistant specializing in shipping and logistics. "
-            "Answer the following query with detailed and accurate information. "
-            "Examples: \n"
-            "1. Query: What is shipping?\n"
-            "   Answer: Shipping is the process of transporting goods from one location to another, typically using ships, trucks, or planes.\n"
-            "2. Query: What is a shipping label?\n"
-            "   Answer: A shipping label is a document attached to a package that contains information about the sender, recipient, and delivery details.\n"
-            f"Query: {prompt}\n"
-        )
-        inputs = gpt_neo_tokenizer(contextual_prompt, return_tensors="pt")
-        outputs = gpt_neo_model.generate(inputs.input_ids, max_length=150, num_return_sequences=1)
-        response = gpt_neo_tokenizer.decode(outputs[0], skip_special_tokens=True)
-        return response
+        return answer(prompt, speculative=speculative, client=inference_client)
+    except InferenceServiceBusy:
+        # Surfaced to the routes so they can answer 503 instead of an error string
+        raise
     except Exception as e:
         logging.error(f"GPT-Neo Model Error: {e}")
         return f"Error: {str(e)}"
 
-# Function for intelligent monitoring
-def intelligent_monitoring():
+# Stream a chatbot answer piece by piece as tokens are generated (see chat_engine.stream_answer)
+def stream_chatbot(prompt, speculative=None):
+    return stream_answer(prompt, speculative=speculative, client=inference_client)
+
+# Whether the client asked for a streamed (Server-Sent Events) chatbot response
+def wants_stream():
+    payload = request.get_json(silent=True) or {}
+    if payload.get('stream') is True or request.args.get('stream') == '1':
+        return True
+    return request.accept_mimetypes.best_match(['application/json', 'text/event-stream']) == 'text/event-stream'
+
+# Server-Sent Events response: one "data" event per text piece, then a "done" event
+def sse_chat_response(user_message, speculative=None):
+    def events():
+        try:
+            for piece in stream_chatbot(user_message, speculative=speculative):
+                yield f"data: {json.dumps({'token': piece})}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except Exception as e:
+            logging.error(f"GPT-Neo Model Error: {e}")
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+# Function for intelligent monitoring (only the scheduled sampler passes record=True, so report views don't add samples)
+def intelligent_monitoring(record=False):
     print("Monitoring vessel operations for sustainability...")
     # Example: Monitor fuel consumption and emissions
     vessels = ["Vessel A", "Vessel B", "Vessel C"]
     fuel_consumption = {vessel: random.uniform(50, 100) for vessel in vessels}  # in liters/hour
-    emissions = {vessel: fuel * 2.68 for vessel, fuel in fuel_consumption.items()}  # CO2 emissions in kg
+    # CO2, SOx and NOx for the whole fleet in one vectorized call
+    result = compute_fleet_emissions(
+        [fuel_consumption[vessel] for vessel in vessels],
+        [app.config['DEFAULT_FUEL_TYPE']] * len(vessels),
+        unit="litres"
+    )
+    emissions = dict(zip(vessels, result["co2_kg"].tolist()))  # CO2 emissions in kg
+    sox_emissions = dict(zip(vessels, result["sox_kg"].tolist()))
+    nox_emissions = dict(zip(vessels, result["nox_kg"].tolist()))
     print("Fuel Consumption (liters/hour):", fuel_consumption)
     print("Emissions (kg CO2):", emissions)
-    return {"fuel_consumption": fuel_consumption, "emissions": emissions}
+    # Keep the readings as telemetry samples instead of discarding them
+    if record:
+        now = time.time()
+        record_telemetry((vessel, now, fuel_consumption[vessel], emissions[vessel]) for vessel in vessels)
+    return {
+        "fuel_consumption": fuel_consumption,
+        "emissions": emissions,
+        "sox_emissions": sox_emissions,
+        "nox_emissions": nox_emissions,
+        "fleet_totals": result["fleet"]
+    }
 
 # Function for optimized resource management
 def optimized_resource_management():
     print("Optimizing resources for sustainability...")
-    # Example: Allocate resources to minimize emissions
-    vessels = ["Vessel A", "Vessel B", "Vessel C"]
-    cranes = ["Crane 1", "Crane 2", "Crane 3"]
-    allocation = {vessel: cranes[i % len(cranes)] for i, vessel in enumerate(vessels)}
-    print("Optimized Resource Allocation:", allocation)
+    # Example: Allocate resources to minimize emissions, allowing the handling time to grow by up to 10%
+    cargo_weights = {"Vessel A": 100, "Vessel B": 200, "Vessel C": 150}
+    vessels = [{"vessel": vessel, "cargo_weight": weight} for vessel, weight in cargo_weights.items()]
+    result = CraneAllocator(SAMPLE_CRANES).allocate(vessels, objective="emissions", makespan_slack=0.1)
+    allocation = result["allocation"]
+    print("Optimized Resource Allocation:", allocation, f"({result['emissions_kg']:.1f} kg CO2)")
     return allocation
 
 # Function for data-driven reporting
@@ -208,9 +430,13 @@ def real_time_tracking():
 # Function for predictive forecasting
 def predictive_forecasting():
     print("Performing predictive forecasting...")
-    # Example: Predict delays based on historical data
+    # Example: Predict delays based on historical data for each shipment's location
     shipments = ["Shipment A", "Shipment B", "Shipment C"]
-    delays = {shipment: random.randint(0, 5) for shipment in shipments}  # Delays in hours
+    with app.app_context():
+        locations = dict(db.session.query(Logistics.shipment_name, Logistics.location)
+                         .filter(Logistics.shipment_name.in_(shipments)))
+    scores = forecaster.score_batch("delay", [{"shipment_name": s, "location": locations.get(s)} for s in shipments])
+    delays = {score["shipment_name"]: score["prediction"] for score in scores}  # Delays in hours
     print("Predicted Delays (hours):", delays)
     return delays
 
@@ -223,27 +449,74 @@ def automated_processing():
     print("Automated Schedules:", schedules)
     return schedules
 
+# Port/waypoint graph and route engine with landmark precomputation and an LRU route cache
+def load_route_network():
+    if app.config['ROUTE_NETWORK_FILE']:
+        with open(app.config['ROUTE_NETWORK_FILE'], 'r', encoding='utf-8') as file:
+            return RouteGraph.from_dict(json.load(file))
+    return RouteGraph.from_dict(SAMPLE_NETWORK)
+
+route_engine = RouteEngine(load_route_network(), cache_size=app.config['ROUTE_CACHE_SIZE'],
+                           landmarks=app.config['ROUTE_LANDMARKS'])
+
+# Plan a route and describe it, or explain why there is none
+def describe_route(vessel_name, destination, origin, vessel_class, metric):
+    origin = origin or app.config['ROUTE_HOME_PORT']
+    vessel_class = vessel_class or app.config['ROUTE_VESSEL_CLASS']
+    try:
+        route = route_engine.route(origin, destination, vessel_class, metric)
+    except ValueError as e:
+        return f"No route for {vessel_name}: {e}."
+    if route is None:
+        return f"No route for {vessel_name} from {origin} to {destination} deep enough for a {vessel_class} vessel."
+    return (f"Route for {vessel_name} from {origin} to {destination} via {' -> '.join(route['path'][1:-1]) or 'direct lane'}: "
+            f"{route['distance_nm']:.0f} nm, about {route['hours']:.0f} h, {route['fuel_t']:.0f} t fuel.")
+
 # Function for intelligent navigation
-def intelligent_navigation(vessel_name, destination):
+def intelligent_navigation(vessel_name, destination, origin=None, vessel_class=None):
     print(f"Calculating navigation for {vessel_name} to {destination}...")
-    # Example: Simulate route suggestions
-    route = f"Route for {vessel_name} to {destination} via optimal path."
-    return route
+    # Fastest route given current weather and the vessel's draft
+    return describe_route(vessel_name, destination, origin, vessel_class, "time")
 
 # Function for optimized routing
-def optimized_routing(vessel_name):
+def optimized_routing(vessel_name, destination=None, origin=None, vessel_class=None):
     print(f"Optimizing route for {vessel_name}...")
-    # Example: Simulate optimized route based on fuel efficiency
-    optimized_route = f"Optimized route for {vessel_name} with minimal fuel consumption."
-    return optimized_route
+    # Route with minimal fuel consumption
+    if not destination:
+        return f"No destination given for {vessel_name}."
+    return describe_route(vessel_name, destination, origin, vessel_class, "fuel")
 
 # Function for predictive maintenance
 def predictive_maintenance(vessel_name):
     print(f"Predicting maintenance schedule for {vessel_name}...")
-    # Example: Simulate maintenance prediction
-    maintenance_schedule = f"Maintenance for {vessel_name} is due in 30 days."
+    # Read the precomputed fleet score (see refresh_maintenance_scores)
+    conn = get_db_connection()
+    try:
+        score = get_score(conn, vessel_name)
+    finally:
+        conn.close()
+    if score is None:
+        return f"No maintenance score yet for {vessel_name}; scores are computed from recorded telemetry."
+    computed_at = time.strftime('%Y-%m-%d %H:%M', time.localtime(score['computed_at']))
+    maintenance_schedule = (f"Maintenance for {vessel_name} is due in {score['due_in_days']:.0f} days "
+                            f"(risk: {score['risk']}, {score['operating_hours']:.0f} operating hours; scored {computed_at}).")
     return maintenance_schedule
 
+# Score the whole fleet in one vectorized pass and store the results (run by the scheduler)
+def refresh_maintenance_scores():
+    with app.app_context():
+        conn = get_db_connection()
+        try:
+            stats = refresh_scores(
+                conn,
+                service_interval_hours=app.config['MAINTENANCE_SERVICE_HOURS'],
+                sample_seconds=app.config['TELEMETRY_SAMPLE_SECONDS'] or 300
+            )
+        finally:
+            conn.close()
+    logging.info(f"Maintenance scores refreshed: {stats}")
+    return stats
+
 @app.route('/')
 def home():
     return render_template('index.html')
@@ -262,8 +535,11 @@ def vessel_operations():
         vessel_name = request.form.get('vessel_name')
         destination = request.form.get('destination')
 
-        navigation = intelligent_navigation(vessel_name, destination)
-        routing = optimized_routing(vessel_name)
+        origin = request.form.get('origin')
+        vessel_class = request.form.get('vessel_class')
+
+        navigation = intelligent_navigation(vessel_name, destination, origin, vessel_class)
+        routing = optimized_routing(vessel_name, destination, origin, vessel_class)
         maintenance = predictive_maintenance(vessel_name)
 
         return render_template('vessel_operations.html', 
@@ -282,12 +558,19 @@ def chatbot():
     """
     Renders the AI Assistant page and handles chat requests.
     Passes navigation context for integration with navigation bar.
+    POST requests with "stream": true (or Accept: text/event-stream) are answered as Server-Sent Events.
     """
     if request.method == 'POST':
         user_message = request.json.get('message', '')
         if not user_message:
             return jsonify({"response": "Please enter a message."}), 400
-        bot_response = ai_chatbot(user_message)
+        speculative = request.json.get('speculative')
+        if wants_stream():
+            return sse_chat_response(user_message, speculative=speculative)
+        try:
+            bot_response = ai_chatbot(user_message, speculative=speculative)
+        except InferenceServiceBusy:
+            return jsonify({"response": "The assistant is busy, please try again shortly."}), 503, {'Retry-After': '5'}
         return jsonify({"response": bot_response})
     # Pass navigation context for integration with navigation bar
     return render_template('chat.html', active_page='chatbot')
@@ -302,17 +585,15 @@ def process():
     result = f"Processed input: {user_input}"
     return render_template('index.html', result=result)
 
-# Utility: Get SQLite connection (for raw SQL operations)
-def get_db_connection():
-    return sqlite3.connect('instance/vessel_operations.db')
-
 # Health check endpoint for monitoring
 @app.route('/api/health', methods=['GET'])
 def health_check():
     try:
         conn = get_db_connection()
-        conn.execute("SELECT 1")
-        conn.close()
+        try:
+            conn.execute("SELECT 1")
+        finally:
+            conn.close()
         return jsonify({"status": "ok"}), 200
     except Exception as e:
         logging.error(f"Health check failed: {e}")
@@ -330,16 +611,12 @@ def submit_feedback():
 
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('''CREATE TABLE IF NOT EXISTS feedback (
-                            id INTEGER PRIMARY KEY AUTOINCREMENT,
-                            feedback TEXT NOT NULL,
-                            comments TEXT,
-                            submitted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                        )''')
-        cursor.execute('INSERT INTO feedback (feedback, comments) VALUES (?, ?)', (feedback, comments))
-        conn.commit()
-        conn.close()
+        try:
+            conn.execute('INSERT INTO feedback (feedback, comments) VALUES (?, ?)', (feedback, comments))
+            conn.commit()
+        finally:
+            # Returns the connection to the pool even if the insert fails
+            conn.close()
         flash('Thank you for your feedback!', 'success')
         logging.info("Feedback submitted successfully.")
     except Exception as e:
@@ -353,17 +630,61 @@ def submit_feedback():
 def chat():
     """
     AI-powered chatbot endpoint.
-    Expects JSON: { "message": "your question" }
+    Expects JSON: { "message": "your question", "stream": false, "speculative": null }
+    "speculative": true/false overrides CHAT_SPECULATIVE (gpt2-assisted decoding) for this request.
     Returns: { "response": "AI answer" }
+    With "stream": true, ?stream=1 or Accept: text/event-stream, returns Server-Sent Events:
+    "data: {"token": "..."}" per generated piece, then "event: done".
     """
     user_message = request.json.get('message', '')
     if not user_message:
         logging.warning("No message provided to chatbot endpoint.")
         return jsonify({'error': 'No message provided'}), 400
-    response = ai_chatbot(user_message)
+    speculative = request.json.get('speculative')
+    if wants_stream():
+        return sse_chat_response(user_message, speculative=speculative)
+    try:
+        response = ai_chatbot(user_message, speculative=speculative)
+    except InferenceServiceBusy:
+        logging.warning("Inference service busy; chatbot request rejected.")
+        return jsonify({'error': 'Inference service busy'}), 503, {'Retry-After': '5'}
     logging.info("Chatbot response generated.")
     return jsonify({'response': response})
 
+# Model registry status endpoint
+@app.route('/api/models', methods=['GET'])
+def api_models():
+    """
+    Returns load state, cold-start time and estimated size of each model, plus worker memory and precision.
+    """
+    return jsonify({**model_registry.stats(), "precision": app.config['MODEL_PRECISION']})
+
+# Chat inference statistics endpoint
+@app.route('/api/chat/stats', methods=['GET'])
+def chat_stats():
+    """
+    Returns micro-batching (batch sizes, queue wait) and response cache statistics for chatbot inference.
+    """
+    return jsonify({"batching": chat_batcher.stats(), "cache": response_cache.stats()})
+
+# Connections currently borrowed from the shared SQLite pool, refreshed at every scrape
+db_pool_in_use = metrics_registry.gauge("db_pool_connections_in_use", "Connections checked out of the shared SQLite pool.")
+
+def collect_pool_metrics():
+    with app.app_context():
+        db_pool_in_use.set(db.engine.pool.checkedout())
+
+metrics_registry.add_collector(collect_pool_metrics)
+
+# Prometheus metrics endpoint
+@app.route('/api/metrics', methods=['GET'])
+def api_metrics():
+    """
+    Returns request latency per route, database query counts and durations, inference time and
+    tokens/sec, scheduler job durations and process memory in the Prometheus text format.
+    """
+    return Response(metrics_registry.render(), content_type=METRICS_CONTENT_TYPE)
+
 # API documentation endpoint
 @app.route('/api/docs', methods=['GET'])
 def api_docs():
@@ -372,114 +693,281 @@ def api_docs():
     """
     docs = {
         "endpoints": [
-            {"path": "/api/chat", "method": "POST", "description": "AI-powered chatbot"},
-            {"path": "/api/export", "method": "GET", "description": "Export vessel operation data as CSV"},
+            {"path": "/api/chat", "method": "POST", "description": "AI-powered chatbot (set \"stream\": true for Server-Sent Events)"},
+            {"path": "/api/export", "method": "GET", "description": "Stream vessel operation data as CSV, NDJSON, Parquet or Arrow (format, gzip, columns, id_from/id_to, since/until)"},
             {"path": "/dashboard", "method": "GET", "description": "Dashboard with key metrics"},
             {"path": "/api/health", "method": "GET", "description": "Health check for API"},
+            {"path": "/api/chat/stats", "method": "GET", "description": "Chatbot batching and response cache statistics"},
+            {"path": "/api/vessels", "method": "GET", "description": "Vessels (filters: status, destination, name; limit, cursor, fields)"},
+            {"path": "/api/sustainability", "method": "GET", "description": "Sustainability records (filters: vessel_name, min_emissions, max_emissions; limit, cursor, fields), or a fuel/emissions telemetry series with since, until and resolution (raw, hour, day, auto)"},
+            {"path": "/api/telemetry", "method": "POST", "description": "Append fuel/emissions telemetry samples (vessel_name, ts, fuel_consumption, emissions)"},
+            {"path": "/api/logistics", "method": "GET", "description": "Shipments (filters: shipment_name, location, min_delay, max_delay; limit, cursor, fields)"},
+            {"path": "/api/import", "method": "POST", "description": "Bulk import vessels, logistics or emissions from CSV/NDJSON (kind, format, gzip)"},
+            {"path": "/api/berth_schedule", "method": "GET, POST, PATCH", "description": "Plan berth allocation from ETAs, service times and berth constraints; PATCH re-plans one changed ETA"},
+            {"path": "/api/crane_allocation", "method": "POST", "description": "Assign cranes to vessels by cargo weight, lift capacity and rate (objective: makespan or emissions)"},
+            {"path": "/api/route", "method": "GET", "description": "Best sea route by distance, time or fuel (origin, destination, vessel_class, metric)"},
+            {"path": "/api/forecast", "method": "GET, POST", "description": "Delay/fuel forecast for a route and weather (GET), or batch scoring of a shipment list (POST)"},
+            {"path": "/api/maintenance", "method": "GET, POST", "description": "Precomputed maintenance scores (vessel_name, or top vessels by risk/limit); POST records a service (vessel_name, performed_at, notes) and re-scores the fleet"},
+            {"path": "/api/models", "method": "GET", "description": "Model load state, cold-start times and worker memory"},
+            {"path": "/api/metrics", "method": "GET", "description": "Prometheus metrics: request latency per route, DB queries per request, inference time and tokens/sec, scheduler job durations, process memory"},
             # ...add more as needed...
         ]
     }
     return jsonify(docs)
 
+# Headline dashboard metrics, cached until the vessel, logistics, sustainability or telemetry tables change
+dashboard_metrics_cache = VersionedCache(ttl_seconds=app.config['DASHBOARD_CACHE_TTL_SECONDS'])
+
+def fetch_dashboard_metrics():
+    """
+    Returns vessel/shipment counts and average fuel/emissions, computed in one aggregate query,
+    plus fleet fuel and emissions totals for the last 24 hours from the telemetry rollups.
+    """
+    version = change_tracker.version('vessel', 'logistics', 'sustainability', 'telemetry')
+    metrics = dashboard_metrics_cache.get(version)
+    if metrics is not None:
+        return metrics
+    vessel_count, shipment_count, avg_fuel, avg_emissions = db.session.query(
+        db.select(db.func.count(Vessel.id)).scalar_subquery(),
+        db.select(db.func.count(Logistics.id)).scalar_subquery(),
+        db.select(db.func.avg(Sustainability.fuel_consumption)).scalar_subquery(),
+        db.select(db.func.avg(Sustainability.emissions)).scalar_subquery()
+    ).one()
+    metrics = {
+        "vessel_count": vessel_count or 0,
+        "shipment_count": shipment_count or 0,
+        "avg_fuel": round(avg_fuel or 0, 2),
+        "avg_emissions": round(avg_emissions or 0, 2),
+    }
+    last_day = telemetry_store.totals(start=time.time() - 86400)
+    metrics.update({
+        "telemetry_samples_24h": last_day["samples"],
+        "fuel_24h": last_day["fuel_consumption"],
+        "emissions_24h": last_day["emissions"],
+    })
+    dashboard_metrics_cache.set(version, metrics)
+    return metrics
+
 # Dashboard route to showcase dynamic metrics
 @app.route('/dashboard')
 def dashboard():
     """
     Dashboard displaying dynamic vessel, logistics, and sustainability metrics.
+    Row listings are paginated with ?page=N&per_page=M (max 100 rows per table).
     """
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', app.config['DASHBOARD_PAGE_SIZE'], type=int), 1), 100)
     try:
-        vessels = Vessel.query.all()
-        logistics = Logistics.query.all()
-        sustainability = Sustainability.query.all()
-        vessel_count = Vessel.query.count()
-        shipment_count = Logistics.query.count()
-        avg_fuel = db.session.query(db.func.avg(Sustainability.fuel_consumption)).scalar() or 0
-        avg_emissions = db.session.query(db.func.avg(Sustainability.emissions)).scalar() or 0
+        metrics = fetch_dashboard_metrics()
+        offset = (page - 1) * per_page
+        vessels = Vessel.query.order_by(Vessel.id).limit(per_page).offset(offset).all()
+        logistics = Logistics.query.order_by(Logistics.id).limit(per_page).offset(offset).all()
+        sustainability = Sustainability.query.order_by(Sustainability.id).limit(per_page).offset(offset).all()
+        has_next = len(vessels) == per_page or len(logistics) == per_page or len(sustainability) == per_page
         return render_template(
             'dashboard.html',
             vessels=vessels or [],
             logistics=logistics or [],
             sustainability=sustainability or [],
-            vessel_count=vessel_count,
-            shipment_count=shipment_count,
-            avg_fuel=round(avg_fuel, 2),
-            avg_emissions=round(avg_emissions, 2),
-            active_page='dashboard'
+            page=page,
+            per_page=per_page,
+            has_next=has_next,
+            active_page='dashboard',
+            **metrics
         )
     except Exception as e:
         logging.error(f"Dashboard data fetch failed: {e}")
-        return render_template('dashboard.html', vessels=[], logistics=[], sustainability=[], vessel_count=0, shipment_count=0, avg_fuel=0, avg_emissions=0, error=str(e), active_page='dashboard')
+        return render_template('dashboard.html', vessels=[], logistics=[], sustainability=[], vessel_count=0, shipment_count=0, avg_fuel=0, avg_emissions=0, telemetry_samples_24h=0, fuel_24h=0, emissions_24h=0, page=page, per_page=per_page, has_next=False, error=str(e), active_page='dashboard')
 
-# API endpoint to export vessel operation data as CSV (robust and dynamic)
+# API endpoint to export vessel operation data, streamed in chunks (robust and dynamic)
 @app.route('/api/export', methods=['GET'])
 def export_data():
     """
-    Export vessel operation data as CSV.
-    Returns CSV or JSON error.
+    Export vessel operation data in constant memory.
+    Query parameters:
+      format: csv (default), ndjson, parquet or arrow
+      gzip: 1 to gzip-compress the response
+      columns: comma-separated columns to include (default: all)
+      id_from / id_to: inclusive id range
+      since / until: inclusive range on time_column (default: timestamp, created_at or recorded_at)
+    Returns the export stream or JSON error.
     """
+    fmt = request.args.get('format', 'csv').lower()
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"error": f"Unsupported format '{fmt}'. Use one of: {', '.join(EXPORT_FORMATS)}"}), 400
+    if fmt in ('parquet', 'arrow'):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            return jsonify({"error": f"{fmt} export requires pyarrow to be installed."}), 501
+    use_gzip = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
-        # Check if table exists
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='operations'")
-        if not cursor.fetchone():
+    except Exception as e:
+        logging.error(f"Export failed: {e}")
+        return jsonify({"error": str(e)}), 500
+    try:
+        # Check if table exists and read its columns
+        table_info = conn.execute("PRAGMA table_info(operations)").fetchall()
+        if not table_info:
+            conn.close()
             logging.warning("No operations data found for export.")
             return jsonify({"error": "No operations data found."}), 404
-        cursor.execute("SELECT * FROM operations")
-        rows = cursor.fetchall()
-        col_names = [description[0] for description in cursor.description]
-        csv_data = ",".join(col_names) + "\n"
-        for row in rows:
-            csv_data += ",".join(map(str, row)) + "\n"
+        declared_types = {row[1]: row[2] for row in table_info}
+        columns, query, params = export_query(
+            'operations', declared_types,
+            columns=[c.strip() for c in request.args.get('columns', '').split(',') if c.strip()],
+            id_from=request.args.get('id_from'), id_to=request.args.get('id_to'),
+            since=request.args.get('since'), until=request.args.get('until'),
+            time_column=request.args.get('time_column')
+        )
+    except ValueError as e:
         conn.close()
-        logging.info("Operations data exported as CSV.")
-        return csv_data, 200, {'Content-Type': 'text/csv'}
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
+        conn.close()
         logging.error(f"Export failed: {e}")
         return jsonify({"error": str(e)}), 500
 
+    def generate():
+        try:
+            row_chunks = iter_chunks(conn.execute(query, params), app.config['EXPORT_CHUNK_SIZE'])
+            if fmt == 'csv':
+                chunks = csv_chunks(columns, row_chunks)
+            elif fmt == 'ndjson':
+                chunks = ndjson_chunks(columns, row_chunks)
+            else:
+                chunks = columnar_chunks(columns, [declared_types[c] for c in columns], row_chunks, fmt)
+            if use_gzip:
+                chunks = gzip_chunks(chunks)
+            yield from chunks
+            logging.info(f"Operations data exported as {fmt}{' (gzip)' if use_gzip else ''}.")
+        except Exception as e:
+            logging.error(f"Export failed: {e}")
+            raise
+        finally:
+            conn.close()
+
+    content_type, extension = EXPORT_FORMATS[fmt]
+    headers = {'Content-Disposition': f'attachment; filename=operations.{extension}'}
+    if use_gzip:
+        headers['Content-Encoding'] = 'gzip'
+    return Response(stream_with_context(generate()), mimetype=content_type, headers=headers)
+
 # Function to populate the database with sample data
 def populate_database():
-    # Add sample vessels
-    vessels = [
-        Vessel(name="Vessel A", destination="Port X", status="In Transit"),
-        Vessel(name="Vessel B", destination="Port Y", status="Docked"),
-        Vessel(name="Vessel C", destination="Port Z", status="Maintenance")
-    ]
-    db.session.bulk_save_objects(vessels)
-
-    # Add sample logistics data
-    logistics = [
-        Logistics(shipment_name="Shipment A", location="Location 45", delay=2),
-        Logistics(shipment_name="Shipment B", location="Location 78", delay=4),
-        Logistics(shipment_name="Shipment C", location="Location 12", delay=1)
-    ]
-    db.session.bulk_save_objects(logistics)
-
-    # Add sample sustainability data
-    sustainability = [
-        Sustainability(vessel_name="Vessel A", fuel_consumption=54.56, emissions=146.23),
-        Sustainability(vessel_name="Vessel B", fuel_consumption=67.46, emissions=180.80),
-        Sustainability(vessel_name="Vessel C", fuel_consumption=77.18, emissions=206.84)
-    ]
-    db.session.bulk_save_objects(sustainability)
-
+    """
+    Adds the sample vessels, shipments and sustainability rows that are not already present.
+    Safe to run on every start: records are matched on vessel name, shipment name and
+    (for sustainability) the vessel they belong to.
+    """
+    sample_vessels = [Vessel(**record) for record in SAMPLE_RECORDS['vessels']]
+    sample_logistics = [Logistics(**record) for record in SAMPLE_RECORDS['logistics']]
+    sample_sustainability = [Sustainability(**record) for record in SAMPLE_RECORDS['emissions']]
+
+    existing_vessels = {name for (name,) in db.session.query(Vessel.name).filter(
+        Vessel.name.in_([v.name for v in sample_vessels]))}
+    existing_shipments = {name for (name,) in db.session.query(Logistics.shipment_name).filter(
+        Logistics.shipment_name.in_([l.shipment_name for l in sample_logistics]))}
+    existing_records = {name for (name,) in db.session.query(Sustainability.vessel_name).filter(
+        Sustainability.vessel_name.in_([s.vessel_name for s in sample_sustainability]))}
+
+    new_rows = (
+        [v for v in sample_vessels if v.name not in existing_vessels]
+        + [l for l in sample_logistics if l.shipment_name not in existing_shipments]
+        + [s for s in sample_sustainability if s.vessel_name not in existing_records]
+    )
+    if not new_rows:
+        return 0
+    db.session.bulk_save_objects(new_rows)
     db.session.commit()
-    print("Sample data added to the database.")
+    print(f"Sample data added to the database ({len(new_rows)} rows).")
+    return len(new_rows)
 
 # Wrap database population in an application context
 with app.app_context():
     populate_database()
 
+# Stream a CSV/NDJSON file into the vessel, logistics or sustainability table
+def run_bulk_import(kind, binary_stream, fmt, compressed=False):
+    conn = get_db_connection()
+    try:
+        stats = import_records(conn, kind, open_records(binary_stream, fmt, compressed),
+                               batch_size=app.config['IMPORT_BATCH_SIZE'])
+    finally:
+        conn.close()
+        # Raw-SQL writes bypass the engine hook, so invalidate dependent caches explicitly
+        change_tracker.bump(IMPORT_SPECS[kind]['table'])
+    logging.info(f"Bulk import finished: {stats}")
+    return stats
+
+# CLI: flask --app main import-data vessels fleet.csv
+@app.cli.command('import-data')
+@click.argument('kind', type=click.Choice(list(IMPORT_SPECS)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']), default=None,
+              help="File format (default: from the file extension).")
+def import_data_command(kind, path, fmt):
+    """Bulk import fleet (vessels), logistics or emissions records from a CSV/NDJSON file (optionally .gz)."""
+    with open(path, 'rb') as file:
+        stats = run_bulk_import(kind, file, fmt or detect_format(path), compressed=path.lower().endswith('.gz'))
+    click.echo(json.dumps(stats))
+
+# API endpoint for bulk imports
+@app.route('/api/import', methods=['POST'])
+def api_import():
+    """
+    Bulk import of fleet, logistics or emissions records.
+    Query parameters:
+      kind: vessels, logistics or emissions
+      format: csv or ndjson (default: from the uploaded file name, else csv)
+      gzip: 1 if the body is gzip-compressed (implied by a .gz file name)
+    Body: a multipart "file" upload or the raw file contents.
+    Returns import statistics including rows per second.
+    """
+    kind = request.args.get('kind')
+    if kind not in IMPORT_SPECS:
+        return jsonify({"error": f"kind must be one of: {', '.join(IMPORT_SPECS)}"}), 400
+    upload = request.files.get('file')
+    filename = upload.filename if upload else ''
+    fmt = request.args.get('format') or detect_format(filename)
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({"error": "format must be csv or ndjson"}), 400
+    compressed = request.args.get('gzip', '').lower() in ('1', 'true', 'yes') or filename.lower().endswith('.gz')
+    try:
+        stats = run_bulk_import(kind, upload.stream if upload else request.stream, fmt, compressed)
+    except (ValueError, UnicodeDecodeError, OSError, csv.Error) as e:
+        logging.error(f"Bulk import failed: {e}")
+        return jsonify({"error": f"Could not read import file: {e}"}), 400
+    except Exception as e:
+        logging.error(f"Bulk import failed: {e}")
+        return jsonify({"error": str(e)}), 500
+    return jsonify(stats)
+
+# Pooled, concurrent client for the vessel tracking API (see live_feed.py)
+live_feed_client = None
+if app.config['LIVE_FEED_URL']:
+    live_feed_client = LiveFeedClient(
+        app.config['LIVE_FEED_URL'],
+        api_key=app.config['LIVE_FEED_API_KEY'] or None,
+        regions=app.config['LIVE_FEED_REGIONS'],
+        max_workers=app.config['LIVE_FEED_WORKERS'],
+        timeout=app.config['LIVE_FEED_TIMEOUT']
+    )
+
 def fetch_live_vessel_data():
     """
-    Fetch live vessel data from a public API (replace with a real API endpoint and key).
-    Returns a list of vessel dicts: [{name, destination, status}, ...]
+    Fetch live vessel data from the tracking API configured in LIVE_FEED_URL.
+    Returns a list of vessel dicts: [{name, destination, status}, ...],
+    or None when the API reports that nothing changed since the last fetch.
     """
     try:
-        # Example: Replace with a real vessel tracking API
-        # response = requests.get('https://api.example.com/vessels?apikey=YOUR_KEY')
-        # data = response.json()
+        if live_feed_client is not None:
+            records, changed = live_feed_client.fetch_all()
+            if not changed:
+                return None
+            return [normalize_vessel(record) for record in records]
         # For demo, return mock data
         data = [
             {"name": "Vessel A", "destination": "Port X", "status": "In Transit"},
@@ -491,61 +979,345 @@ def fetch_live_vessel_data():
         logging.error(f"Failed to fetch vessel data: {e}")
         return []
 
+def sync_vessels(feed):
+    """
+    Applies a vessel feed to the Vessel table as a differential upsert keyed on vessel name.
+
+    Only new vessels are inserted, changed ones updated and vanished ones deleted (along with
+    duplicate rows for the same name), in one short transaction, so ids stay stable and readers
+    never see an empty table.
+
+    Args:
+        feed (list): Vessel dicts [{name, destination, status}, ...]; later entries win on duplicate names.
+
+    Returns:
+        dict: Counts of inserted, updated, deleted and unchanged vessels.
+    """
+    changes = diff_vessels(
+        db.session.query(Vessel.id, Vessel.name, Vessel.destination, Vessel.status).order_by(Vessel.id), feed)
+    inserts, updates, delete_ids = changes["inserts"], changes["updates"], changes["delete_ids"]
+
+    try:
+        if inserts:
+            db.session.bulk_insert_mappings(Vessel, inserts)
+        if updates:
+            db.session.bulk_update_mappings(Vessel, updates)
+        # Delete in chunks to stay under SQLite's bound-parameter limit
+        for start in range(0, len(delete_ids), 500):
+            Vessel.query.filter(Vessel.id.in_(delete_ids[start:start + 500])).delete(synchronize_session=False)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return {
+        "inserted": len(inserts),
+        "updated": len(updates),
+        "deleted": len(delete_ids),
+        "unchanged": changes["unchanged"],
+    }
+
 def update_vessel_table():
     """
-    Fetch live vessel data and update the Vessel table in the database.
+    Fetch live vessel data and apply only the changes to the Vessel table in the database.
     """
     with app.app_context():
         vessels = fetch_live_vessel_data()
-        if vessels:
-            Vessel.query.delete()  # Clear old data
-            for v in vessels:
-                vessel = Vessel(name=v["name"], destination=v["destination"], status=v["status"])
-                db.session.add(vessel)
-            db.session.commit()
-            logging.info("Vessel table updated with live data.")
+        if vessels is None:
+            logging.info("Vessel feed unchanged since last refresh; nothing to update.")
+        elif vessels:
+            counts = sync_vessels(vessels)
+            logging.info(
+                "Vessel table updated with live data: "
+                f"{counts['inserted']} inserted, {counts['updated']} updated, "
+                f"{counts['deleted']} deleted, {counts['unchanged']} unchanged."
+            )
         else:
             logging.warning("No vessel data to update.")
 
 # Set up APScheduler to update vessel data every 10 minutes
 scheduler = BackgroundScheduler()
-scheduler.add_job(update_vessel_table, 'interval', minutes=10)
+# Jobs are wrapped by timed_job so their run times appear in /api/metrics
+scheduler.add_job(timed_job(update_vessel_table), 'interval', minutes=10)
+# Telemetry is sampled by whichever process takes the sampler lock first; the lock is kept for the process lifetime
+telemetry_sampler_lock = None
+if app.config['TELEMETRY_SAMPLE_SECONDS'] > 0:
+    telemetry_sampler_lock = acquire_process_lock(app.config['TELEMETRY_SAMPLER_LOCK'])
+    if telemetry_sampler_lock is not None:
+        scheduler.add_job(timed_job(intelligent_monitoring), 'interval', seconds=app.config['TELEMETRY_SAMPLE_SECONDS'],
+                          kwargs={'record': True})
+    else:
+        logging.info("Telemetry sampling is running in another process; not scheduling it here.")
+# Maintenance scores are computed once at startup and then periodically
+scheduler.add_job(timed_job(refresh_maintenance_scores), 'interval', minutes=app.config['MAINTENANCE_SCORE_MINUTES'],
+                  next_run_time=datetime.now())
 scheduler.start()
 
+# Warm the configured models in the background so the server can accept requests immediately
+# (not needed in web workers that use the shared inference service)
+if app.config['MODEL_WARMUP'] and inference_client is None:
+    model_registry.warm_async(app.config['MODEL_WARMUP'])
+
+# Shared implementation of the list APIs: keyset pagination, filters and field projection
+def keyset_page(model, default_fields, filters):
+    """
+    Returns one page of `model` rows as a JSON array, ordered by id.
+
+    Query parameters:
+      limit: rows per page (default API_PAGE_SIZE, capped at API_MAX_PAGE_SIZE)
+      cursor: the X-Next-Cursor token of the previous page
+      fields: comma-separated columns to return (default: `default_fields`)
+    The next page's cursor is returned in the X-Next-Cursor header (and a Link rel="next"
+    header); it is absent on the last page.
+
+    Args:
+        model: The SQLAlchemy model to list.
+        default_fields (list): Columns returned when `fields` is not given.
+        filters (list): SQLAlchemy filter expressions built from the request's filter parameters.
+    """
+    columns = {column.name: column for column in model.__table__.columns}
+    fields = [f.strip() for f in request.args.get('fields', '').split(',') if f.strip()] or default_fields
+    unknown = [f for f in fields if f not in columns]
+    if unknown:
+        return jsonify({'error': f"Unknown fields: {', '.join(unknown)}", 'available': list(columns)}), 400
+    limit = min(max(request.args.get('limit', app.config['API_PAGE_SIZE'], type=int), 1), app.config['API_MAX_PAGE_SIZE'])
+
+    # Only the projected columns (plus the id used as the keyset) are read
+    query = db.session.query(model.id, *[columns[f] for f in fields]).filter(*filters)
+    try:
+        rows, next_cursor = fetch_page(query, model.id, limit, request.args.get('cursor'))
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+
+    headers = {}
+    if next_cursor:
+        headers['X-Next-Cursor'] = next_cursor
+        next_args = {**request.args.to_dict(), 'cursor': next_cursor}
+        headers['Link'] = f'<{request.base_url}?{urlencode(next_args)}>; rel="next"'
+    data = [dict(zip(fields, row[1:])) for row in rows]
+    return jsonify(data), 200, headers
+
+# Min/max filters on a numeric column from request arguments; raises ValueError on bad numbers
+def range_filters(column, min_arg, max_arg, cast):
+    filters = []
+    for arg, compare in ((min_arg, operator.ge), (max_arg, operator.le)):
+        if request.args.get(arg):
+            filters.append(compare(column, cast(request.args[arg])))
+    return filters
+
 @app.route('/api/vessels')
 def api_vessels():
-    vessels = Vessel.query.all()
-    data = [{"name": v.name, "destination": v.destination, "status": v.status} for v in vessels]
-    return jsonify(data)
+    """
+    Lists vessels. Filters: status, destination, name. Supports limit, cursor and fields.
+    """
+    filters = [getattr(Vessel, arg) == request.args[arg] for arg in ('status', 'destination', 'name') if request.args.get(arg)]
+    return keyset_page(Vessel, ['name', 'destination', 'status'], filters)
 
 @app.route('/api/sustainability')
 def api_sustainability():
-    data = Sustainability.query.all()
-    return jsonify([
-        {
-            'vessel_name': s.vessel_name,
-            'fuel_consumption': s.fuel_consumption,
-            'emissions': s.emissions
-        } for s in data
-    ])
+    """
+    Lists sustainability records. Filters: vessel_name, min_emissions, max_emissions.
+    Supports limit, cursor and fields.
+
+    With since, until or resolution, returns the fuel/emissions telemetry series instead, as columns:
+      vessel_name: one vessel (default: fleet totals per bucket; raw samples need a vessel)
+      since/until: epoch seconds or ISO 8601 (default: open-ended)
+      resolution: raw, hour, day or auto (default; picked from the range)
+    """
+    if any(request.args.get(arg) for arg in ('since', 'until', 'resolution')):
+        try:
+            series = telemetry_store.series(
+                vessel_name=request.args.get('vessel_name') or None,
+                start=request.args.get('since') or None,
+                end=request.args.get('until') or None,
+                resolution=request.args.get('resolution', 'auto')
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify(series)
+    filters = [Sustainability.vessel_name == request.args['vessel_name']] if request.args.get('vessel_name') else []
+    try:
+        filters += range_filters(Sustainability.emissions, 'min_emissions', 'max_emissions', float)
+    except ValueError:
+        return jsonify({'error': 'min_emissions and max_emissions must be numbers'}), 400
+    return keyset_page(Sustainability, ['vessel_name', 'fuel_consumption', 'emissions'], filters)
+
+@app.route('/api/telemetry', methods=['POST'])
+def api_telemetry():
+    """
+    Appends fuel/emissions telemetry samples.
+    Body: a JSON sample or array of samples with vessel_name, ts (epoch seconds or ISO 8601; default now),
+    fuel_consumption and emissions. Samples repeating a vessel's timestamp are ignored.
+    """
+    payload = request.get_json(silent=True)
+    samples = payload if isinstance(payload, list) else [payload] if isinstance(payload, dict) else None
+    if not samples or not all(isinstance(sample, dict) for sample in samples):
+        return jsonify({'error': 'Expected a JSON sample or array of samples'}), 400
+    now = time.time()
+    try:
+        stored = record_telemetry({**sample, 'ts': sample.get('ts') or now} for sample in samples)
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': f'Invalid sample: {e}'}), 400
+    return jsonify({'received': len(samples), 'stored': stored}), 201
+
+# Current berth plan; replaced by POST /api/berth_schedule and updated in place by PATCH
+berth_plan = {"scheduler": None, "calls": {}, "schedule": None}
+berth_plan_lock = threading.Lock()
+
+@app.route('/api/berth_schedule', methods=['GET', 'POST', 'PATCH'])
+def api_berth_schedule():
+    """
+    Berth allocation that minimizes total waiting time (see berth_scheduling.py).
+    POST: {"berths": [{name, length, max_draft?, available_from?}], "calls": [{vessel, eta, duration, length?, draft?}]}
+          plans a new schedule.
+    PATCH: {"vessel", "eta", "duration"?, "now"?} re-plans incrementally after one ETA change (or adds a call).
+    GET: returns the current schedule.
+    """
+    with berth_plan_lock:
+        if request.method == 'GET':
+            if berth_plan["schedule"] is None:
+                return jsonify({'error': 'No berth schedule has been planned'}), 404
+            return jsonify(berth_plan["schedule"])
+        payload = request.get_json(silent=True) or {}
+        try:
+            if request.method == 'POST':
+                scheduler = BerthScheduler(payload.get('berths') or [])
+                calls = payload.get('calls') or []
+                schedule = scheduler.plan(calls)
+                berth_plan.update(scheduler=scheduler, calls={c['vessel']: c for c in calls}, schedule=schedule)
+            else:
+                if berth_plan["schedule"] is None:
+                    return jsonify({'error': 'No berth schedule has been planned'}), 404
+                if not payload.get('vessel'):
+                    return jsonify({'error': 'vessel is required'}), 400
+                now = payload.pop('now', None)
+                call = {**berth_plan["calls"].get(payload['vessel'], {}), **payload}
+                schedule = berth_plan["scheduler"].replan(berth_plan["schedule"], call, now=now)
+                berth_plan["calls"][call['vessel']] = call
+                berth_plan["schedule"] = schedule
+        except (ValueError, TypeError, KeyError) as e:
+            return jsonify({'error': f'Invalid berth schedule request: {e}'}), 400
+        return jsonify({**schedule, "stats": berth_plan["scheduler"].last_stats})
+
+@app.route('/api/crane_allocation', methods=['POST'])
+def api_crane_allocation():
+    """
+    Assigns cranes to vessels (see crane_allocation.py).
+    Body: {"cranes": [{name, rate, capacity?, emissions_per_hour?}] (default: the sample cranes),
+           "vessels": [{vessel, cargo_weight, max_unit_weight?}],
+           "objective": "makespan" (default) or "emissions", "makespan_slack": 0.1}
+    """
+    payload = request.get_json(silent=True) or {}
+    try:
+        allocator = CraneAllocator(payload.get('cranes') or SAMPLE_CRANES)
+        result = allocator.allocate(
+            payload.get('vessels') or [],
+            objective=payload.get('objective', 'makespan'),
+            makespan_slack=float(payload.get('makespan_slack', 0.1))
+        )
+    except (ValueError, TypeError, KeyError, ZeroDivisionError) as e:
+        return jsonify({'error': f'Invalid crane allocation request: {e}'}), 400
+    return jsonify({**result, "stats": allocator.last_stats})
+
+@app.route('/api/route')
+def api_route():
+    """
+    Best sea route between two ports or waypoints.
+    Query parameters: origin (default ROUTE_HOME_PORT), destination, vessel_class
+    (feeder, panamax, post_panamax, vlcc), metric (distance, time or fuel; default time).
+    """
+    destination = request.args.get('destination')
+    if not destination:
+        return jsonify({'error': 'destination is required'}), 400
+    try:
+        route = route_engine.route(
+            request.args.get('origin') or app.config['ROUTE_HOME_PORT'],
+            destination,
+            request.args.get('vessel_class') or app.config['ROUTE_VESSEL_CLASS'],
+            request.args.get('metric', 'time')
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if route is None:
+        return jsonify({'error': 'No route with sufficient depth for this vessel class'}), 404
+    return jsonify(route)
+
+@app.route('/api/forecast', methods=['GET', 'POST'])
+def api_forecast():
+    """
+    Delay (hours) and fuel consumption forecasts from running statistics.
+    GET: target (delay or fuel; default delay), route, weather -> one prediction.
+    POST: {"target": "delay", "items": [{"shipment_name", "route" or "location", "weather"}, ...]}
+          -> one prediction per item, for scoring a whole shipment list.
+    """
+    try:
+        if request.method == 'GET':
+            return jsonify(forecaster.predict(
+                request.args.get('target', 'delay'), request.args.get('route'), request.args.get('weather')))
+        payload = request.get_json(silent=True) or {}
+        items = payload.get('items')
+        if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+            return jsonify({'error': 'items must be a list of objects'}), 400
+        return jsonify(forecaster.score_batch(payload.get('target', 'delay'), items))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/maintenance', methods=['GET', 'POST'])
+def api_maintenance():
+    """
+    Precomputed predictive-maintenance scores.
+    GET: vessel_name for one vessel, otherwise the highest-scoring vessels (risk filter, limit).
+    POST: {"vessel_name", "performed_at"? (epoch seconds or ISO 8601; default now), "notes"?} records a
+          completed service; then (or with no body) re-scores the whole fleet and returns the refresh statistics.
+    """
+    if request.method == 'POST':
+        payload = request.get_json(silent=True) or {}
+        service = None
+        if payload.get('vessel_name'):
+            conn = get_db_connection()
+            try:
+                service = record_service(conn, payload['vessel_name'], payload.get('performed_at'), payload.get('notes'))
+            except (ValueError, TypeError) as e:
+                return jsonify({'error': f'Invalid service record: {e}'}), 400
+            finally:
+                conn.close()
+        stats = refresh_maintenance_scores()
+        if service:
+            return jsonify({'service': service, **stats}), 201
+        return jsonify(stats)
+    conn = get_db_connection()
+    try:
+        if request.args.get('vessel_name'):
+            score = get_score(conn, request.args['vessel_name'])
+            if score is None:
+                return jsonify({'error': 'No maintenance score for this vessel'}), 404
+            return jsonify(score)
+        limit = min(max(request.args.get('limit', app.config['API_PAGE_SIZE'], type=int), 1), app.config['API_MAX_PAGE_SIZE'])
+        sql = "SELECT * FROM maintenance_scores"
+        params = []
+        if request.args.get('risk'):
+            sql += " WHERE risk = ?"
+            params.append(request.args['risk'])
+        cursor = conn.execute(sql + " ORDER BY score DESC LIMIT ?", params + [limit])
+        columns = [column[0] for column in cursor.description]
+        return jsonify([dict(zip(columns, row)) for row in cursor.fetchall()])
+    finally:
+        conn.close()
 
 @app.route('/api/logistics')
 def api_logistics():
-    data = Logistics.query.all()
-    return jsonify([
-        {
-            'shipment_name': l.shipment_name,
-            'delay': l.delay
-        } for l in data
-    ])
+    """
+    Lists shipments. Filters: shipment_name, location, min_delay, max_delay (hours).
+    Supports limit, cursor and fields.
+    """
+    filters = [getattr(Logistics, arg) == request.args[arg] for arg in ('shipment_name', 'location') if request.args.get(arg)]
+    try:
+        filters += range_filters(Logistics.delay, 'min_delay', 'max_delay', int)
+    except ValueError:
+        return jsonify({'error': 'min_delay and max_delay must be integers'}), 400
+    return keyset_page(Logistics, ['shipment_name', 'delay'], filters)
 
 if __name__ == '__main__':
-    # Ensure database tables exist and sample data is loaded
-    with app.app_context():
-        db.create_all()
-        # Only populate if tables are empty to avoid duplicate data
-        if Vessel.query.count() == 0 and Logistics.query.count() == 0 and Sustainability.query.count() == 0:
-            populate_database()
+    # Database tables, migrations and sample data are set up when the module is imported
     # Run the Flask development server
     app.run(host='0.0.0.0', port=5000, debug=True)
     print("Welcome to the Vessel Operations Application!")
@@ -0,0 +1,243 @@
+"""
+Predictive Maintenance
+----------------------
+Fleet-wide maintenance scoring in one vectorized pass, with results stored for lookup.
+
+Per-vessel features come from one grouped query over the daily telemetry rollups, counted
+from each vessel's last service in `maintenance_log`:
+
+- operating hours (samples x sampling interval)
+- mean fuel load over the service period and over the recent window
+- load variability (coefficient of variation of daily mean load)
+- peak ratio (highest single reading over the mean load)
+
+`score_fleet` turns these arrays into a wear score (1.0 = service due now), a risk band and
+the days until service. `refresh_scores` runs load, score and store, replacing the contents
+of `maintenance_scores` with every vessel's row and the time it was computed, so request
+handlers read a precomputed score instead of recomputing it. Vessels with no telemetry since
+their last service drop out of the table until new readings arrive.
+
+`record_service` adds a completed service to `maintenance_log`. Hours are then counted from
+it at the next refresh.
+
+`python maintenance.py [vessels]` times the pipeline on a scratch database.
+"""
+
+import os
+import sqlite3
+import tempfile
+import time
+
+import numpy as np
+
+from telemetry import to_timestamp
+
+RISK_BANDS = ("low", "medium", "high", "overdue")
+
+_FEATURE_QUERY = '''
+    SELECT r.vessel_name,
+           SUM(r.samples),
+           SUM(r.fuel_sum),
+           SUM(CASE WHEN r.bucket >= ? THEN r.samples ELSE 0 END),
+           SUM(CASE WHEN r.bucket >= ? THEN r.fuel_sum ELSE 0 END),
+           COUNT(*),
+           SUM(r.fuel_sum / r.samples),
+           SUM((r.fuel_sum / r.samples) * (r.fuel_sum / r.samples)),
+           MAX(r.fuel_max)
+    FROM telemetry_rollup r
+    LEFT JOIN (SELECT vessel_name, MAX(performed_at) AS serviced_at
+               FROM maintenance_log GROUP BY vessel_name) m ON m.vessel_name = r.vessel_name
+    WHERE r.resolution = 86400 AND r.bucket >= COALESCE(CAST(m.serviced_at / 86400 AS INTEGER) * 86400, 0)
+    GROUP BY r.vessel_name
+'''
+
+
+def load_fleet_features(conn, now=None, recent_days=30, sample_seconds=300):
+    """
+    Reads per-vessel maintenance features from the daily telemetry rollups.
+
+    Args:
+        conn: A DB-API SQLite connection.
+        now (float): Epoch seconds the recent window ends at (default: now).
+        recent_days (int): Length of the recent load window.
+        sample_seconds (float): Telemetry sampling interval, to convert samples to hours.
+
+    Returns:
+        tuple: (vessel names, dict of feature name -> float64 array).
+    """
+    now = time.time() if now is None else now
+    recent = int((now - recent_days * 86400) // 86400) * 86400
+    rows = conn.execute(_FEATURE_QUERY, (recent, recent)).fetchall()
+    names = [row[0] for row in rows]
+    data = np.array([row[1:] for row in rows], dtype=np.float64).reshape(len(rows), 8)
+    samples, fuel, recent_samples, recent_fuel, days, daily_sum, daily_sq, peak = data.T
+    mean_load = np.divide(fuel, samples, out=np.zeros_like(fuel), where=samples > 0)
+    daily_mean = np.divide(daily_sum, days, out=np.zeros_like(days), where=days > 0)
+    daily_var = np.maximum(np.divide(daily_sq, days, out=np.zeros_like(days), where=days > 0) - daily_mean ** 2, 0)
+    return names, {
+        "operating_hours": samples * sample_seconds / 3600,
+        "active_days": days,
+        "mean_load": mean_load,
+        "recent_load": np.divide(recent_fuel, recent_samples, out=mean_load.copy(), where=recent_samples > 0),
+        "load_variability": np.divide(np.sqrt(daily_var), daily_mean, out=np.zeros_like(days), where=daily_mean > 0),
+        "peak_ratio": np.divide(peak, mean_load, out=np.ones_like(peak), where=mean_load > 0),
+    }
+
+
+def score_fleet(features, service_interval_hours=6000):
+    """
+    Scores every vessel at once.
+
+    Wear is the share of the service interval already used, scaled up for vessels running
+    harder recently than on average, with an uneven load, or with high peaks. The days left
+    follow from the remaining interval at the vessel's current daily usage and load.
+
+    Args:
+        features (dict): Arrays from `load_fleet_features`.
+        service_interval_hours (float): Operating hours between services at nominal load.
+
+    Returns:
+        dict: "score", "risk" (array of RISK_BANDS labels) and "due_in_days" arrays.
+    """
+    hours = features["operating_hours"]
+    stress = np.clip(np.divide(features["recent_load"], features["mean_load"],
+                               out=np.ones_like(hours), where=features["mean_load"] > 0), 0.5, 2.0)
+    variability = 1 + np.clip(features["load_variability"], 0, 1)
+    peaks = 1 + 0.5 * np.clip(features["peak_ratio"] - 1.5, 0, 2)
+    wear_rate = stress * variability * peaks
+    score = hours / service_interval_hours * wear_rate
+
+    hours_per_day = np.divide(hours, features["active_days"], out=np.full_like(hours, 24.0),
+                              where=features["active_days"] > 0)
+    remaining_hours = np.maximum(service_interval_hours - hours * wear_rate, 0)
+    due_in_days = np.divide(remaining_hours, np.maximum(hours_per_day, 1e-9) * wear_rate)
+    risk = np.array(RISK_BANDS)[np.digitize(score, [0.5, 0.8, 1.0])]
+    return {"score": score, "risk": risk, "due_in_days": due_in_days}
+
+
+def store_scores(conn, names, features, scores, computed_at=None):
+    """
+    Replaces the stored scores with those for `names` in one transaction. Rows for vessels not
+    in `names` (serviced since and without new telemetry) are deleted.
+    """
+    computed_at = time.time() if computed_at is None else computed_at
+    rows = zip(
+        names,
+        np.round(scores["score"], 4).tolist(),
+        scores["risk"].tolist(),
+        np.round(scores["due_in_days"], 1).tolist(),
+        np.round(features["operating_hours"], 1).tolist(),
+        np.round(features["mean_load"], 3).tolist(),
+        np.round(features["recent_load"], 3).tolist(),
+        np.round(features["load_variability"], 4).tolist(),
+        np.round(features["peak_ratio"], 3).tolist(),
+        [computed_at] * len(names),
+    )
+    try:
+        conn.executemany('''INSERT OR REPLACE INTO maintenance_scores
+                            (vessel_name, score, risk, due_in_days, operating_hours, mean_load, recent_load,
+                             load_variability, peak_ratio, computed_at)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''', rows)
+        conn.execute("DELETE FROM maintenance_scores WHERE computed_at <> ?", (computed_at,))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def refresh_scores(conn, service_interval_hours=6000, sample_seconds=300, now=None):
+    """
+    Loads features, scores the fleet and stores the results.
+
+    Returns:
+        dict: Vessels scored, vessels per risk band and seconds per stage.
+    """
+    started = time.perf_counter()
+    names, features = load_fleet_features(conn, now=now, sample_seconds=sample_seconds)
+    loaded = time.perf_counter()
+    scores = score_fleet(features, service_interval_hours)
+    scored = time.perf_counter()
+    store_scores(conn, names, features, scores)
+    stored = time.perf_counter()
+    bands, counts = np.unique(scores["risk"], return_counts=True)
+    return {
+        "vessels": len(names),
+        "risk": dict(zip(bands.tolist(), counts.tolist())),
+        "load_seconds": round(loaded - started, 3),
+        "score_seconds": round(scored - loaded, 4),
+        "store_seconds": round(stored - scored, 3),
+    }
+
+
+def record_service(conn, vessel_name, performed_at=None, notes=None):
+    """
+    Records a completed service for a vessel.
+
+    Args:
+        conn: A DB-API SQLite connection.
+        vessel_name (str): The vessel serviced.
+        performed_at: When the service was completed: epoch seconds, ISO 8601 or a datetime
+            (default: now).
+        notes (str): Optional free text.
+
+    Returns:
+        dict: The stored maintenance_log row.
+
+    Raises:
+        ValueError: On a missing vessel name or an unparseable or future performed_at.
+    """
+    if not vessel_name or not isinstance(vessel_name, str):
+        raise ValueError("vessel_name is required")
+    now = time.time()
+    performed_at = now if performed_at is None else to_timestamp(performed_at)
+    if performed_at > now:
+        raise ValueError("performed_at is in the future")
+    try:
+        cursor = conn.execute("INSERT INTO maintenance_log (vessel_name, performed_at, notes) VALUES (?, ?, ?)",
+                              (vessel_name, performed_at, notes))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return {"id": cursor.lastrowid, "vessel_name": vessel_name, "performed_at": performed_at, "notes": notes}
+
+
+def get_score(conn, vessel_name):
+    """Returns the stored score row for a vessel as a dict, or None."""
+    cursor = conn.execute("SELECT * FROM maintenance_scores WHERE vessel_name = ?", (vessel_name,))
+    row = cursor.fetchone()
+    return dict(zip([column[0] for column in cursor.description], row)) if row else None
+
+
+def benchmark_maintenance(vessels=50_000, days=30, seed=7):
+    """
+    Builds `days` of daily rollups for `vessels` vessels in a scratch database and times a
+    full refresh.
+    """
+    from migrations import apply_migrations
+
+    path = os.path.join(tempfile.mkdtemp(), "maintenance.db")
+    conn = sqlite3.connect(path)
+    apply_migrations(conn)
+    rng = np.random.default_rng(seed)
+    today = int(time.time() // 86400) * 86400
+    base = rng.uniform(40, 120, size=vessels)
+    for day in range(days):
+        samples = rng.integers(100, 289, size=vessels)
+        mean = base * rng.uniform(0.8, 1.3, size=vessels)
+        conn.executemany(
+            "INSERT INTO telemetry_rollup VALUES (86400, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            ((f"Vessel {i}", today - day * 86400, int(samples[i]), float(mean[i] * samples[i]), float(mean[i] * 0.7),
+              float(mean[i] * 1.6), float(mean[i] * samples[i] * 2.68), 0.0, 0.0) for i in range(vessels)))
+    conn.commit()
+    stats = refresh_scores(conn, now=today + 86400)
+    conn.close()
+    os.remove(path)
+    return stats
+
+
+if __name__ == "__main__":
+    import json
+    import sys
+
+    print(json.dumps(benchmark_maintenance(*[int(arg) for arg in sys.argv[1:2]]), indent=2))
@@ -0,0 +1,502 @@
+"""
+Metrics
+-------
+In-process counters and histograms exported in the Prometheus text format.
+
+- `Counter` and `Histogram` keep one small record per label combination; an observation is
+  a dictionary lookup, a bisect over the bucket bounds and a few additions under a lock.
+- `instrument_engine` times SQLAlchemy queries with the engine's cursor events, and
+  `timed_connection` wraps raw connections from `engine.raw_connection()` (which the events
+  do not see), so both paths are measured without counting anything twice. Statements are
+  only timed while a request is tracked, unless the full per-statement histogram
+  (`statements=True`) is on. Timings cover executing the statement up to its first row;
+  rows read afterwards while streaming a large result are not included.
+- `track_request()` / `finish_request()` collect the queries run by the current thread,
+  so each HTTP request can report how many queries it ran and how long they took.
+- `timed_job` wraps a scheduler job to record its duration and failures.
+- `process_collector` reports resident memory, threads and uptime at scrape time.
+
+No client library is needed; `Registry.render()` writes text format 0.0.4 directly.
+`python metrics.py` measures the per-observation and per-query overhead.
+"""
+
+import bisect
+import functools
+import logging
+import sqlite3
+import threading
+import time
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; wide enough for millisecond API calls and multi-second generation
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+QUERY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """A monotonically increasing value per label combination."""
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, *labels):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name, _format_labels(self.labelnames, labels), value) for labels, value in items]
+
+
+class Gauge:
+    """A value that can go up and down per label combination."""
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name, _format_labels(self.labelnames, labels), value) for labels, value in items]
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count of observations per label combination."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.bounds = tuple(sorted(buckets))
+        self._series = {}  # labels -> [per-bucket counts (last is +Inf), sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.bounds) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        with self._lock:
+            items = [(labels, list(series[0]), series[1], series[2]) for labels, series in self._series.items()]
+        samples = []
+        for labels, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.bounds + (float("inf"),), counts):
+                cumulative += bucket_count
+                samples.append((f"{self.name}_bucket",
+                                _format_labels(self.labelnames, labels, f'le="{_format_value(bound)}"'), cumulative))
+            samples.append((f"{self.name}_sum", _format_labels(self.labelnames, labels), total))
+            samples.append((f"{self.name}_count", _format_labels(self.labelnames, labels), count))
+        return samples
+
+
+class Registry:
+    """
+    Holds metrics and collector callbacks, and renders them for a Prometheus scrape.
+
+    Args:
+        prefix (str): Prepended to every metric name.
+    """
+
+    def __init__(self, prefix=""):
+        self.prefix = prefix
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._add(Counter(self.prefix + name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._add(Gauge(self.prefix + name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(self.prefix + name, documentation, labelnames, buckets))
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        """Registers a callable run at every scrape, e.g. to refresh gauges."""
+        self._collectors.append(collector)
+
+    def render(self):
+        """Returns all metrics in the Prometheus text exposition format."""
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception as e:
+                logging.error(f"Metrics collector failed: {e}")
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# Application metrics, shared by every module that records them
+registry = Registry(prefix="vessel_ops_")
+
+http_request_seconds = registry.histogram(
+    "http_request_duration_seconds", "Time to produce a response, by route template, method and status.",
+    ("route", "method", "status"))
+http_request_queries = registry.histogram(
+    "http_request_db_queries", "Database queries run while handling one request.", ("route",), COUNT_BUCKETS)
+http_request_query_seconds = registry.histogram(
+    "http_request_db_seconds", "Time spent in database queries while handling one request.", ("route",), QUERY_BUCKETS)
+db_query_seconds = registry.histogram(
+    "db_query_duration_seconds", "SQLite statement execution time, by statement type.", ("statement",), QUERY_BUCKETS)
+db_query_errors = registry.counter(
+    "db_query_errors_total", "SQLite statements that raised an error, by statement type.", ("statement",))
+inference_seconds = registry.histogram(
+    "inference_duration_seconds", "Time spent in model.generate, by generation mode.", ("mode",))
+inference_tokens = registry.counter(
+    "inference_generated_tokens_total", "Tokens generated, by generation mode.", ("mode",))
+inference_tokens_per_second = registry.gauge(
+    "inference_tokens_per_second", "Generation speed of the most recent generate call, by mode.", ("mode",))
+job_seconds = registry.histogram(
+    "scheduler_job_duration_seconds", "Scheduled job run time, by job.", ("job",))
+job_failures = registry.counter(
+    "scheduler_job_failures_total", "Scheduled job runs that raised an error, by job.", ("job",))
+process_resident_memory = registry.gauge(
+    "process_resident_memory_bytes", "Resident memory of this process.")
+process_threads = registry.gauge("process_threads", "Live Python threads in this process.")
+process_uptime = registry.gauge("process_uptime_seconds", "Seconds since the metrics module was loaded.")
+
+_started_at = time.monotonic()
+
+
+def process_collector():
+    """Refreshes the process gauges (registered as a scrape-time collector)."""
+    from model_registry import current_rss_mb
+
+    process_resident_memory.set(int(current_rss_mb() * 1024 * 1024))
+    process_threads.set(threading.active_count())
+    process_uptime.set(round(time.monotonic() - _started_at, 3))
+
+
+registry.add_collector(process_collector)
+
+
+# Per-thread query totals for the request being handled (None outside a tracked request)
+_request_state = threading.local()
+
+
+def track_request():
+    """Starts counting the database queries run by the current thread."""
+    _request_state.queries = [0, 0.0]
+
+
+def finish_request():
+    """Stops counting and returns (queries, seconds) since `track_request`, or (0, 0.0)."""
+    totals = getattr(_request_state, "queries", None)
+    _request_state.queries = None
+    return tuple(totals) if totals else (0, 0.0)
+
+
+def observe_request(route, method, status, seconds):
+    """Records a finished HTTP request and the queries it ran (see `track_request`)."""
+    queries, query_seconds = finish_request()
+    http_request_seconds.observe(seconds, route, method, str(status))
+    http_request_queries.observe(queries, route)
+    http_request_query_seconds.observe(query_seconds, route)
+
+
+_STATEMENT_TYPES = frozenset(("select", "insert", "update", "delete", "replace", "with", "pragma",
+                              "begin", "commit", "rollback", "create"))
+_statement_type_cache = {}
+
+
+def _statement_type(sql):
+    # First keyword, lower-cased, from a fixed set to keep label cardinality bounded.
+    # Statements are mostly constant strings, so the result is memoized per string.
+    statement = _statement_type_cache.get(sql)
+    if statement is None:
+        words = sql.split(None, 1) if isinstance(sql, str) else None
+        keyword = words[0].lower() if words else ""
+        statement = keyword if keyword in _STATEMENT_TYPES else "other"
+        if len(_statement_type_cache) < 4096:
+            _statement_type_cache[sql] = statement
+    return statement
+
+
+# Whether every statement goes into db_query_duration_seconds (see instrument_engine)
+_record_statements = False
+
+
+def _timing_wanted():
+    # Statements are only timed when someone reads the result: the statement histogram or a tracked request
+    return _record_statements or getattr(_request_state, "queries", None) is not None
+
+
+def _record_query(sql, elapsed):
+    if _record_statements:
+        db_query_seconds.observe(elapsed, _statement_type(sql))
+    totals = getattr(_request_state, "queries", None)
+    if totals is not None:
+        totals[0] += 1
+        totals[1] += elapsed
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # The start time rides on the execution context, which is per statement
+    if context is not None and _timing_wanted():
+        context.metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "metrics_started", None)
+    if started is not None:
+        _record_query(statement, time.perf_counter() - started)
+
+
+def _handle_error(exception_context):
+    db_query_errors.inc(1, _statement_type(exception_context.statement or ""))
+
+
+def instrument_engine(engine, statements=False):
+    """
+    Times the queries run through a SQLAlchemy engine with its cursor events.
+
+    Args:
+        engine: The SQLAlchemy engine.
+        statements (bool): Also record every statement, from the engine and from
+            `TimedConnection`s, in the db_query_duration_seconds histogram. Otherwise
+            statements are only timed while a request is tracked (see `track_request`).
+    """
+    from sqlalchemy import event
+
+    global _record_statements
+    _record_statements = statements
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def _timed_call(method, sql, *args):
+    # Runs one statement on a raw connection or cursor, timing it only when the result is used
+    # (inlined rather than calling _record_query: this sits on every raw query)
+    totals = getattr(_request_state, "queries", None)
+    if totals is None and not _record_statements:
+        return method(sql, *args)
+    started = time.perf_counter()
+    try:
+        return method(sql, *args)
+    except Exception:
+        db_query_errors.inc(1, _statement_type(sql))
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        if totals is not None:
+            totals[0] += 1
+            totals[1] += elapsed
+        if _record_statements:
+            db_query_seconds.observe(elapsed, _statement_type(sql))
+
+
+class TimedCursor:
+    """DB-API cursor wrapper that times `execute`, `executemany` and `executescript`."""
+
+    __slots__ = ("_cursor",)
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def execute(self, sql, parameters=()):
+        _timed_call(self._cursor.execute, sql, parameters)
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        _timed_call(self._cursor.executemany, sql, seq_of_parameters)
+        return self
+
+    def executescript(self, sql_script):
+        _timed_call(self._cursor.executescript, sql_script)
+        return self
+
+
+def timed_connection(conn):
+    """
+    Returns `conn` wrapped in a `TimedConnection` when its statements will be timed (the
+    statement histogram is on, or the current thread is handling a tracked request), and
+    `conn` itself otherwise, so background work pays nothing.
+    """
+    return TimedConnection(conn) if _timing_wanted() else conn
+
+
+class TimedConnection:
+    """
+    Wraps a raw DB-API connection (e.g. from `engine.raw_connection()`) so the statements run
+    on it are timed like engine queries; everything else is delegated to the connection.
+
+    Only raw connections need it: queries through the engine are timed by its events (see
+    `instrument_engine`), so nothing is counted twice.
+    """
+
+    __slots__ = ("_conn",)
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args):
+        return TimedCursor(self._conn.cursor(*args))
+
+    # The shortcuts return the connection's own cursor: the statement has already been timed
+    def execute(self, sql, parameters=()):
+        return _timed_call(self._conn.execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return _timed_call(self._conn.executemany, sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return _timed_call(self._conn.executescript, sql_script)
+
+
+def record_inference(mode, seconds, tokens):
+    """Records one generate call: its duration and the number of tokens it produced."""
+    inference_seconds.observe(seconds, mode)
+    inference_tokens.inc(tokens, mode)
+    if seconds > 0:
+        inference_tokens_per_second.set(round(tokens / seconds, 2), mode)
+
+
+def timed_job(fn, name=None):
+    """Wraps a scheduler job so each run records its duration, and failures are counted."""
+    name = name or fn.__name__
+
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            job_failures.inc(1, name)
+            raise
+        finally:
+            job_seconds.observe(time.perf_counter() - started, name)
+    return run
+
+
+def benchmark_overhead(observations=200_000, queries=50_000):
+    """
+    Measures the cost of one histogram observation, and of a primary-key lookup on a raw
+    connection and through a SQLAlchemy engine (if installed): plain, instrumented but idle,
+    inside a tracked request, and with the statement histogram on.
+
+    Returns:
+        dict: Nanoseconds per observation and microseconds per query for each setup.
+    """
+    histogram = Histogram("bench_seconds", "Benchmark.", ("route",))
+    started = time.perf_counter()
+    for i in range(observations):
+        histogram.observe(0.001 * (i % 50), "/api/route")
+    report = {"observe_ns": round((time.perf_counter() - started) / observations * 1e9, 1)}
+
+    def connect():
+        conn = sqlite3.connect(":memory:", check_same_thread=False)
+        conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, value REAL)")
+        conn.executemany("INSERT INTO t (value) VALUES (?)", ((i * 0.5,) for i in range(1000)))
+        return conn
+
+    def per_query(lookup):
+        started = time.perf_counter()
+        for i in range(queries):
+            lookup(i % 1000 + 1)
+        return round((time.perf_counter() - started) / queries * 1e6, 2)
+
+    def modes(prefix, lookup):
+        # Idle, inside a tracked request, and with the statement histogram on
+        global _record_statements
+        report[f"{prefix}_idle"] = per_query(lookup)
+        track_request()
+        report[f"{prefix}_tracked"] = per_query(lookup)
+        finish_request()
+        _record_statements = True
+        report[f"{prefix}_statements"] = per_query(lookup)
+        _record_statements = False
+
+    raw = connect()
+    report["raw_us_plain"] = per_query(lambda i: raw.execute("SELECT value FROM t WHERE id = ?", (i,)).fetchone())
+    timed = TimedConnection(raw)
+    modes("raw_us_timed", lambda i: timed.execute("SELECT value FROM t WHERE id = ?", (i,)).fetchone())
+
+    try:
+        from sqlalchemy import create_engine, event, text
+        from sqlalchemy.pool import StaticPool
+    except ImportError:
+        return report
+    query = text("SELECT value FROM t WHERE id = :id")
+    for instrumented in (False, True):
+        engine = create_engine("sqlite://", creator=connect, poolclass=StaticPool)
+        # The application's engine already has a write-tracking listener (see change_tracking.py)
+        event.listen(engine, "after_cursor_execute", lambda *args: None)
+        with engine.connect() as conn:
+            lookup = lambda i: conn.execute(query, {"id": i}).fetchone()
+            if instrumented:
+                instrument_engine(engine)
+                modes("engine_us_events", lookup)
+            else:
+                report["engine_us_plain"] = per_query(lookup)
+        engine.dispose()
+    return report
+
+
+if __name__ == "__main__":
+    import json
+
+    print(json.dumps(benchmark_overhead(), indent=2))
@@ -0,0 +1,370 @@
+"""
+Schema Migrations
+-----------------
+Versioned, forward-only schema migrations for the SQLite database.
+
+The applied version is stored in SQLite's `PRAGMA user_version`. Each migration runs in
+its own IMMEDIATE transaction, so concurrent workers starting at the same time apply it
+exactly once. Index names match the ones declared on the ORM models, so databases created
+by `db.create_all()` and databases upgraded here end up identical.
+
+`check_query_plans` verifies with EXPLAIN QUERY PLAN that the API lookups use these
+indexes; `python migrations.py [rows]` builds a scratch database with that many rows per
+table and times the API queries.
+"""
+
+import logging
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from bulk_import import IMPORT_SPECS, SAMPLE_RECORDS
+
+
+def _table_columns(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _base_schema(conn):
+    # Tables as created by the ORM models and the raw-SQL paths, for databases not created by create_all()
+    conn.execute('''CREATE TABLE IF NOT EXISTS vessel (
+                        id INTEGER PRIMARY KEY,
+                        name VARCHAR(100) NOT NULL,
+                        destination VARCHAR(100) NOT NULL,
+                        status VARCHAR(100) NOT NULL
+                    )''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS logistics (
+                        id INTEGER PRIMARY KEY,
+                        shipment_name VARCHAR(100) NOT NULL,
+                        location VARCHAR(100) NOT NULL,
+                        delay INTEGER NOT NULL
+                    )''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS sustainability (
+                        id INTEGER PRIMARY KEY,
+                        vessel_name VARCHAR(100) NOT NULL,
+                        fuel_consumption FLOAT NOT NULL,
+                        emissions FLOAT NOT NULL
+                    )''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS feedback (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        feedback TEXT NOT NULL,
+                        comments TEXT,
+                        submitted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )''')
+
+
+def _lookup_indexes(conn):
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_vessel_name ON vessel (name)")
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_vessel_status_destination ON vessel (status, destination)")
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_logistics_shipment_name ON logistics (shipment_name)")
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_logistics_delay ON logistics (delay)")
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_sustainability_vessel_name ON sustainability (vessel_name)")
+
+
+def _link_sustainability_to_vessels(conn):
+    # sustainability.vessel_id -> vessel.id, backfilled from vessel_name and kept in sync by triggers
+    if 'vessel_id' not in _table_columns(conn, 'sustainability'):
+        conn.execute("ALTER TABLE sustainability ADD COLUMN vessel_id INTEGER REFERENCES vessel (id) ON DELETE SET NULL")
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_sustainability_vessel_id ON sustainability (vessel_id)")
+    conn.execute('''UPDATE sustainability
+                    SET vessel_id = (SELECT MIN(id) FROM vessel WHERE vessel.name = sustainability.vessel_name)
+                    WHERE vessel_id IS NULL''')
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS trg_sustainability_link_vessel
+                    AFTER INSERT ON sustainability WHEN NEW.vessel_id IS NULL
+                    BEGIN
+                        UPDATE sustainability
+                        SET vessel_id = (SELECT MIN(id) FROM vessel WHERE name = NEW.vessel_name)
+                        WHERE id = NEW.id;
+                    END''')
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS trg_vessel_link_sustainability
+                    AFTER INSERT ON vessel
+                    BEGIN
+                        UPDATE sustainability SET vessel_id = NEW.id
+                        WHERE vessel_name = NEW.name AND vessel_id IS NULL;
+                    END''')
+
+
+def _remove_duplicate_seed_rows(conn):
+    # Sample data used to be re-inserted on every start. Only extra copies of those exact sample
+    # rows are removed (the first copy is kept); identical rows that are not sample data stay.
+    for kind, records in SAMPLE_RECORDS.items():
+        table, columns = IMPORT_SPECS[kind]["table"], list(IMPORT_SPECS[kind]["columns"])
+        condition = " AND ".join(f"{column} = ?" for column in columns)
+        for record in records:
+            values = tuple(record[column] for column in columns)
+            conn.execute(f'''DELETE FROM {table} WHERE {condition}
+                             AND id > (SELECT MIN(id) FROM {table} WHERE {condition})''', values + values)
+    # Removing a vessel copy cleared the links to it (ON DELETE SET NULL); point them at the kept row
+    conn.execute('''UPDATE sustainability
+                    SET vessel_id = (SELECT MIN(id) FROM vessel WHERE vessel.name = sustainability.vessel_name)
+                    WHERE vessel_id IS NULL''')
+
+
+def _telemetry_tables(conn):
+    # Raw samples clustered by (vessel, time) and hourly/daily rollups clustered by (resolution, vessel, bucket);
+    # WITHOUT ROWID keeps each table a single B-tree, so range reads are contiguous
+    conn.execute('''CREATE TABLE IF NOT EXISTS telemetry (
+                        vessel_name VARCHAR(100) NOT NULL,
+                        ts REAL NOT NULL,
+                        fuel_consumption REAL NOT NULL,
+                        emissions REAL NOT NULL,
+                        PRIMARY KEY (vessel_name, ts)
+                    ) WITHOUT ROWID''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS telemetry_rollup (
+                        resolution INTEGER NOT NULL,
+                        vessel_name VARCHAR(100) NOT NULL,
+                        bucket INTEGER NOT NULL,
+                        samples INTEGER NOT NULL,
+                        fuel_sum REAL NOT NULL,
+                        fuel_min REAL NOT NULL,
+                        fuel_max REAL NOT NULL,
+                        emissions_sum REAL NOT NULL,
+                        emissions_min REAL NOT NULL,
+                        emissions_max REAL NOT NULL,
+                        PRIMARY KEY (resolution, vessel_name, bucket)
+                    ) WITHOUT ROWID''')
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_telemetry_rollup_bucket ON telemetry_rollup (resolution, bucket)")
+
+
+def _forecast_stats_sql(table, target, value, route, weather=None):
+    # (dimension, bucket expression, condition) for each running-statistics bucket a row contributes to
+    buckets = [("all", "'*'", "1"), ("route", f"lower(trim({{row}}.{route}))", f"{{row}}.{route} IS NOT NULL")]
+    if weather:
+        buckets += [
+            ("weather", f"lower(trim({{row}}.{weather}))", f"{{row}}.{weather} IS NOT NULL"),
+            ("route_weather", f"lower(trim({{row}}.{route})) || '|' || lower(trim({{row}}.{weather}))",
+             f"{{row}}.{route} IS NOT NULL AND {{row}}.{weather} IS NOT NULL"),
+        ]
+
+    def statements(row, sign):
+        return "\n".join(f'''
+                        INSERT INTO forecast_stats (target, dimension, bucket, n, total, total_sq)
+                        SELECT '{target}', '{dimension}', {bucket.format(row=row)}, {sign},
+                               {sign} * {row}.{value}, {sign} * {row}.{value} * {row}.{value}
+                        WHERE {row}.{value} IS NOT NULL AND {condition.format(row=row)}
+                        ON CONFLICT (target, dimension, bucket) DO UPDATE SET
+                            n = n + excluded.n, total = total + excluded.total, total_sq = total_sq + excluded.total_sq;'''
+                         for dimension, bucket, condition in buckets)
+
+    backfill = [f'''INSERT INTO forecast_stats (target, dimension, bucket, n, total, total_sq)
+                     SELECT '{target}', '{dimension}', {bucket.format(row=table)}, COUNT(*), SUM({value}), SUM({value} * {value})
+                     FROM {table} WHERE {value} IS NOT NULL AND {condition.format(row=table)}
+                     GROUP BY 3
+                     ON CONFLICT (target, dimension, bucket) DO UPDATE SET
+                         n = n + excluded.n, total = total + excluded.total, total_sq = total_sq + excluded.total_sq'''
+                for dimension, bucket, condition in buckets]
+    triggers = [
+        f"CREATE TRIGGER IF NOT EXISTS trg_{table}_forecast_insert AFTER INSERT ON {table} BEGIN {statements('NEW', 1)} END",
+        f"CREATE TRIGGER IF NOT EXISTS trg_{table}_forecast_delete AFTER DELETE ON {table} BEGIN {statements('OLD', -1)} END",
+        f"CREATE TRIGGER IF NOT EXISTS trg_{table}_forecast_update AFTER UPDATE ON {table} "
+        f"BEGIN {statements('OLD', -1)} {statements('NEW', 1)} END",
+    ]
+    return backfill + triggers
+
+
+def _forecast_statistics(conn):
+    # Operations and voyage history (queried by prompt_engineering.predictive_analytics) and the running
+    # count/sum/sum-of-squares per target and bucket that triggers keep current on every write
+    conn.execute('''CREATE TABLE IF NOT EXISTS operations (
+                        id INTEGER PRIMARY KEY,
+                        shipment_name VARCHAR(100),
+                        route VARCHAR(100),
+                        weather VARCHAR(50),
+                        delay_hours REAL NOT NULL,
+                        recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS voyages (
+                        id INTEGER PRIMARY KEY,
+                        vessel_name VARCHAR(100),
+                        route VARCHAR(100),
+                        weather VARCHAR(50),
+                        fuel_consumption REAL NOT NULL,
+                        recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS forecast_stats (
+                        target VARCHAR(20) NOT NULL,
+                        dimension VARCHAR(20) NOT NULL,
+                        bucket VARCHAR(200) NOT NULL,
+                        n INTEGER NOT NULL,
+                        total REAL NOT NULL,
+                        total_sq REAL NOT NULL,
+                        PRIMARY KEY (target, dimension, bucket)
+                    ) WITHOUT ROWID''')
+    # Shipment delays in the logistics table count as delay observations on their location
+    for sql in (_forecast_stats_sql("operations", "delay", "delay_hours", "route", "weather")
+                + _forecast_stats_sql("voyages", "fuel", "fuel_consumption", "route", "weather")
+                + _forecast_stats_sql("logistics", "delay", "delay", "location")):
+        conn.execute(sql)
+
+
+def _maintenance_tables(conn):
+    # Completed services (operating hours are counted from the last one) and the latest fleet scores
+    conn.execute('''CREATE TABLE IF NOT EXISTS maintenance_log (
+                        id INTEGER PRIMARY KEY,
+                        vessel_name VARCHAR(100) NOT NULL,
+                        performed_at REAL NOT NULL,
+                        notes TEXT
+                    )''')
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_maintenance_log_vessel ON maintenance_log (vessel_name, performed_at)")
+    conn.execute('''CREATE TABLE IF NOT EXISTS maintenance_scores (
+                        vessel_name VARCHAR(100) PRIMARY KEY,
+                        score REAL NOT NULL,
+                        risk VARCHAR(20) NOT NULL,
+                        due_in_days REAL NOT NULL,
+                        operating_hours REAL NOT NULL,
+                        mean_load REAL NOT NULL,
+                        recent_load REAL NOT NULL,
+                        load_variability REAL NOT NULL,
+                        peak_ratio REAL NOT NULL,
+                        computed_at REAL NOT NULL
+                    ) WITHOUT ROWID''')
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_maintenance_scores_score ON maintenance_scores (score)")
+
+
+def _sustainability_sample_index(conn):
+    # Emission samples are matched on all three columns when importing (see bulk_import.py). The
+    # new index also covers per-vessel lookups, so it replaces the single-column vessel_name index.
+    conn.execute('''CREATE INDEX IF NOT EXISTS ix_sustainability_sample
+                    ON sustainability (vessel_name, fuel_consumption, emissions)''')
+    conn.execute("DROP INDEX IF EXISTS ix_sustainability_vessel_name")
+
+
+# (version, description, function) in application order; never edit or reorder applied entries
+MIGRATIONS = [
+    (1, "Base tables", _base_schema),
+    (2, "Secondary and composite lookup indexes", _lookup_indexes),
+    (3, "Foreign key from sustainability rows to vessels", _link_sustainability_to_vessels),
+    (4, "Remove duplicated sample rows", _remove_duplicate_seed_rows),
+    (5, "Telemetry samples and hourly/daily rollups", _telemetry_tables),
+    (6, "Delay and fuel history with incrementally maintained forecast statistics", _forecast_statistics),
+    (7, "Maintenance log and precomputed fleet maintenance scores", _maintenance_tables),
+    (8, "Full-key index for matching imported emission samples", _sustainability_sample_index),
+]
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def apply_migrations(conn):
+    """
+    Applies all pending migrations to a DB-API SQLite connection.
+
+    Returns:
+        int: The schema version after migrating.
+    """
+    for version, description, migrate in MIGRATIONS:
+        if schema_version(conn) >= version:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Re-check under the write lock in case another worker just applied it
+            if schema_version(conn) < version:
+                migrate(conn)
+                conn.execute(f"PRAGMA user_version = {version}")
+                logging.info(f"Applied schema migration {version}: {description}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return schema_version(conn)
+
+
+# Representative API lookups and the index each must use
+API_QUERIES = {
+    "vessel_by_name": ("SELECT id, name, destination, status FROM vessel WHERE name = ?", ("Vessel 42",), "ix_vessel_name"),
+    "vessel_by_status_destination": (
+        "SELECT id, name FROM vessel WHERE status = ? AND destination = ? ORDER BY id LIMIT 100",
+        ("Docked", "Port 7"), "ix_vessel_status_destination"),
+    "logistics_by_shipment": (
+        "SELECT id, shipment_name, delay FROM logistics WHERE shipment_name = ?", ("Shipment 42",), "ix_logistics_shipment_name"),
+    # Delay thresholds are served from the covering delay index. Keyset pages ordered by id with
+    # a wide delay range are cheaper as an early-terminating rowid scan, which SQLite picks itself.
+    "logistics_delay_threshold": (
+        "SELECT COUNT(*), AVG(delay) FROM logistics WHERE delay >= ?", (24,), "ix_logistics_delay"),
+    "sustainability_by_vessel": (
+        "SELECT id, fuel_consumption, emissions FROM sustainability WHERE vessel_name = ?", ("Vessel 42",),
+        "ix_sustainability_sample"),
+    "sustainability_join_vessel": (
+        "SELECT v.name, v.status, s.emissions FROM vessel v JOIN sustainability s ON s.vessel_id = v.id WHERE v.name = ?",
+        ("Vessel 42",), "ix_sustainability_vessel_id"),
+}
+
+
+def explain_query_plan(conn, sql, params=()):
+    """Returns the EXPLAIN QUERY PLAN detail lines for a query."""
+    return [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+def check_query_plans(conn, queries=None):
+    """
+    Checks that each API query uses its expected index.
+
+    Returns:
+        dict: name -> plan detail lines.
+
+    Raises:
+        AssertionError: If a query does not use its index.
+    """
+    plans = {}
+    for name, (sql, params, index) in (queries or API_QUERIES).items():
+        plan = explain_query_plan(conn, sql, params)
+        if not any(index in line for line in plan):
+            raise AssertionError(f"{name} does not use {index}: {plan}")
+        plans[name] = plan
+    return plans
+
+
+def benchmark_api_queries(rows=1_000_000, repeats=20):
+    """
+    Builds a scratch database with `rows` rows per table, migrates it and times the API queries.
+
+    Returns:
+        dict: name -> mean milliseconds per query.
+    """
+    path = os.path.join(tempfile.mkdtemp(), "benchmark.db")
+    conn = sqlite3.connect(path)
+    _base_schema(conn)
+    statuses = ["In Transit", "Docked", "Maintenance", "Anchored"]
+    rng = random.Random(7)
+    conn.executemany(
+        "INSERT INTO vessel (name, destination, status) VALUES (?, ?, ?)",
+        ((f"Vessel {i}", f"Port {rng.randrange(200)}", rng.choice(statuses)) for i in range(rows)))
+    conn.executemany(
+        "INSERT INTO logistics (shipment_name, location, delay) VALUES (?, ?, ?)",
+        ((f"Shipment {i}", f"Location {rng.randrange(100)}", rng.randrange(48)) for i in range(rows)))
+    conn.executemany(
+        "INSERT INTO sustainability (vessel_name, fuel_consumption, emissions) VALUES (?, ?, ?)",
+        ((f"Vessel {rng.randrange(rows)}", fuel, fuel * 2.68) for fuel in (rng.uniform(50, 100) for _ in range(rows))))
+    conn.commit()
+    conn.isolation_level = None  # migrations manage their own transactions
+
+    def time_queries():
+        timings = {}
+        for name, (sql, params, _) in API_QUERIES.items():
+            if "vessel_id" in sql and 'vessel_id' not in _table_columns(conn, 'sustainability'):
+                continue
+            start = time.perf_counter()
+            for _ in range(repeats):
+                conn.execute(sql, params).fetchall()
+            timings[name] = round((time.perf_counter() - start) / repeats * 1000, 3)
+        return timings
+
+    before = time_queries()
+    start = time.perf_counter()
+    apply_migrations(conn)
+    migrate_seconds = round(time.perf_counter() - start, 2)
+    check_query_plans(conn)
+    after = time_queries()
+    conn.close()
+    os.remove(path)
+    return {"rows_per_table": rows, "migrate_seconds": migrate_seconds, "before_ms": before, "after_ms": after}
+
+
+if __name__ == "__main__":
+    import json
+    import sys
+
+    print(json.dumps(benchmark_api_queries(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000), indent=2))
@@ -0,0 +1,246 @@
+"""
+Model Registry
+--------------
+Lazy, on-demand loading of the language models used by the Vessel Operations application.
+
+Models are registered with a loader function and only built the first time they are
+requested. They can be warmed in a background thread once the server is up, and the
+least recently used models are dropped when the configured memory budget is exceeded.
+Objects derived from another model (e.g. a prefix cache) are registered with `depends_on`
+and are dropped together with it, so evicting a model really releases it.
+Cold-start time, estimated model size and process resident memory are tracked per worker.
+"""
+
+import gc
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def current_rss_mb():
+    """
+    Returns the resident memory of the current process in MB.
+
+    Falls back to the peak resident size reported by `resource` when /proc is not available.
+    """
+    try:
+        with open('/proc/self/statm') as statm:
+            resident_pages = int(statm.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is reported in bytes on macOS and in KB on Linux
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    except (ImportError, OSError):
+        return 0.0
+
+
+def estimate_size_mb(obj):
+    """
+    Estimates the memory held by a loaded model from its parameters and buffers.
+
+    Args:
+        obj: A model, a pipeline (with a `.model` attribute) or a tuple containing models.
+
+    Returns:
+        float: Estimated size in MB, or 0.0 if nothing tensor-like was found.
+    """
+    if isinstance(obj, (tuple, list)):
+        return sum(estimate_size_mb(item) for item in obj)
+    model = getattr(obj, 'model', obj)
+    if not hasattr(model, 'parameters'):
+        return 0.0
+    total = 0
+    for tensor in list(model.parameters()) + list(getattr(model, 'buffers', lambda: [])()):
+        total += tensor.numel() * tensor.element_size()
+    return total / (1024 * 1024)
+
+
+class ModelRegistry:
+    """
+    Loads models on first use and keeps them under a memory budget with LRU eviction.
+
+    Args:
+        memory_budget_mb (float): Maximum estimated size of all loaded models. None disables eviction.
+    """
+
+    def __init__(self, memory_budget_mb=None):
+        self.memory_budget_mb = memory_budget_mb
+        self._loaders = {}
+        self._load_locks = {}
+        self._models = OrderedDict()  # name -> loaded object, least recently used first
+        self._dependents = {}  # name -> names registered with depends_on=name
+        self._stats = {}
+        self._lock = threading.RLock()
+
+    def register(self, name, loader, depends_on=()):
+        """
+        Registers a model loader without loading the model.
+
+        Args:
+            name (str): Registry key used by callers.
+            loader (callable): Zero-argument function returning the loaded model object.
+            depends_on (tuple): Registry keys this object is built from; it is unloaded
+                whenever one of them is unloaded or evicted.
+        """
+        with self._lock:
+            self._loaders[name] = loader
+            for dependency in depends_on:
+                self._dependents.setdefault(dependency, set()).add(name)
+            self._load_locks[name] = threading.Lock()
+            self._stats[name] = {
+                "loaded": False,
+                "loads": 0,
+                "hits": 0,
+                "evictions": 0,
+                "cold_start_seconds": None,
+                "size_mb": None,
+            }
+
+    def is_loaded(self, name):
+        with self._lock:
+            return name in self._models
+
+    def get(self, name):
+        """
+        Returns a loaded model, loading it first if needed.
+
+        Concurrent callers asking for the same model wait for a single load; other
+        models stay available while it runs.
+
+        Raises:
+            KeyError: If no loader is registered under `name`.
+        """
+        with self._lock:
+            if name not in self._loaders:
+                raise KeyError(f"Unknown model: {name}")
+            if name in self._models:
+                self._models.move_to_end(name)
+                self._stats[name]["hits"] += 1
+                return self._models[name]
+            load_lock = self._load_locks[name]
+
+        with load_lock:
+            with self._lock:
+                if name in self._models:
+                    self._models.move_to_end(name)
+                    self._stats[name]["hits"] += 1
+                    return self._models[name]
+                loader = self._loaders[name]
+
+            logging.info(f"Loading model '{name}'...")
+            rss_before = current_rss_mb()
+            start = time.perf_counter()
+            model = loader()
+            cold_start = time.perf_counter() - start
+            size_mb = estimate_size_mb(model) or max(current_rss_mb() - rss_before, 0.0)
+
+            with self._lock:
+                self._models[name] = model
+                stats = self._stats[name]
+                stats.update(loaded=True, cold_start_seconds=round(cold_start, 3), size_mb=round(size_mb, 1))
+                stats["loads"] += 1
+                self._evict(keep=name)
+            logging.info(
+                f"Model '{name}' loaded in {cold_start:.2f}s "
+                f"(~{size_mb:.0f} MB, process RSS {current_rss_mb():.0f} MB)"
+            )
+            return model
+
+    def unload(self, name):
+        """
+        Drops a loaded model, and anything depending on it, so its memory can be reclaimed.
+        Returns True if it was loaded.
+        """
+        with self._lock:
+            dropped = self._drop(name)
+        if not dropped:
+            return False
+        gc.collect()
+        logging.info(f"Models {dropped} unloaded.")
+        return True
+
+    def _drop(self, name):
+        # Caller holds self._lock. Removes `name` and its loaded dependents; returns the names removed.
+        if self._models.pop(name, None) is None:
+            return []
+        self._stats[name]["loaded"] = False
+        dropped = [name]
+        for dependent in sorted(self._dependents.get(name, ())):
+            dropped.extend(self._drop(dependent))
+        return dropped
+
+    def _dependencies(self, name):
+        # Every registry key `name` is (transitively) built from
+        found = set()
+        pending = [name]
+        while pending:
+            current = pending.pop()
+            for dependency, dependents in self._dependents.items():
+                if current in dependents and dependency not in found:
+                    found.add(dependency)
+                    pending.append(dependency)
+        return found
+
+    def resident_mb(self):
+        """Returns the estimated size of all currently loaded models in MB."""
+        with self._lock:
+            return sum(self._stats[name]["size_mb"] or 0.0 for name in self._models)
+
+    def _evict(self, keep):
+        # Caller holds self._lock. Drop least recently used models until under budget.
+        if not self.memory_budget_mb:
+            return
+        # The model just loaded and whatever it was built from stay resident
+        protected = {keep} | self._dependencies(keep)
+        evicted = []
+        while self.resident_mb() > self.memory_budget_mb:
+            oldest = next((name for name in self._models if name not in protected), None)
+            if oldest is None:
+                break
+            for name in self._drop(oldest):
+                self._stats[name]["evictions"] += 1
+                evicted.append(name)
+        if evicted:
+            gc.collect()
+            logging.info(f"Evicted models {evicted} to stay within {self.memory_budget_mb} MB budget.")
+
+    def warm_async(self, names):
+        """
+        Loads the given models in a background daemon thread.
+
+        Args:
+            names (list): Registry keys to load, in order.
+
+        Returns:
+            threading.Thread: The started warm-up thread.
+        """
+        def _warm():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    logging.error(f"Model warm-up failed for '{name}': {e}")
+
+        thread = threading.Thread(target=_warm, name="model-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self):
+        """Returns per-model load statistics plus process memory figures."""
+        with self._lock:
+            models = {name: dict(stats) for name, stats in self._stats.items()}
+            resident = self.resident_mb()
+        return {
+            "models": models,
+            "memory_budget_mb": self.memory_budget_mb,
+            "models_resident_mb": round(resident, 1),
+            "process_rss_mb": round(current_rss_mb(), 1),
+            "pid": os.getpid(),
+        }
@@ -0,0 +1,148 @@
+"""
+Prefix KV-Cache
+---------------
+Encodes a fixed prompt preamble once and reuses its past-key-values for every request,
+so each generation only computes the user's query and the new tokens.
+
+Batched requests are laid out as [preamble | padding | query], with the padding masked
+out. Position ids are derived from the attention mask, so every query continues the
+preamble at the same positions it would have had without padding.
+"""
+
+import logging
+import time
+
+import torch
+
+
+def _to_legacy(past_key_values):
+    # Normalize the cache returned by the model into a tuple of (key, value) per layer.
+    if hasattr(past_key_values, 'to_legacy_cache'):
+        return past_key_values.to_legacy_cache()
+    if hasattr(past_key_values, 'layers'):
+        return tuple((layer.keys, layer.values) for layer in past_key_values.layers)
+    return tuple(past_key_values)
+
+
+def _build_cache(legacy, batch_size):
+    # Copy the stored prefix for each row of the batch; generation appends to these tensors.
+    layers = [(key.repeat(batch_size, 1, 1, 1), value.repeat(batch_size, 1, 1, 1)) for key, value in legacy]
+    try:
+        from transformers import DynamicCache
+    except ImportError:
+        return tuple(layers)
+    cache = DynamicCache()
+    for layer_idx, (key, value) in enumerate(layers):
+        cache.update(key, value, layer_idx)
+    return cache
+
+
+class PrefixKVCache:
+    """
+    Holds the encoded past-key-values of a fixed prompt prefix.
+
+    Args:
+        model: The causal language model used for generation.
+        tokenizer: Its tokenizer (must define a pad token).
+        prefix_text (str): The preamble shared by every request.
+    """
+
+    def __init__(self, model, tokenizer, prefix_text):
+        self.prefix_text = prefix_text
+        self.prefix_ids = tokenizer(prefix_text, return_tensors="pt").input_ids
+        start = time.perf_counter()
+        with torch.no_grad():
+            outputs = model(self.prefix_ids, use_cache=True)
+        self._legacy = _to_legacy(outputs.past_key_values)
+        self.encode_seconds = time.perf_counter() - start
+        logging.info(f"Encoded {self.prefix_length}-token prompt prefix in {self.encode_seconds:.2f}s")
+
+        # Separate tokenization must agree with tokenizing the full prompt, or outputs would drift
+        probe = tokenizer(prefix_text + "Query: probe\n").input_ids
+        if probe[:self.prefix_length] != self.prefix_ids[0].tolist():
+            logging.warning("Prompt prefix does not end on a token boundary; cached outputs may differ slightly.")
+
+    @property
+    def prefix_length(self):
+        return self.prefix_ids.shape[1]
+
+    def build_inputs(self, tokenizer, suffixes):
+        """
+        Builds generate() keyword arguments for a batch of suffixes following the prefix.
+
+        Args:
+            tokenizer: The tokenizer matching the cached model.
+            suffixes (list): The per-request text that follows the prefix.
+
+        Returns:
+            dict: `input_ids`, `attention_mask` and `past_key_values` for `model.generate`.
+        """
+        encoded = [tokenizer(suffix).input_ids for suffix in suffixes]
+        longest = max(len(ids) for ids in encoded)
+        prefix = self.prefix_ids[0].tolist()
+        input_ids, attention_mask = [], []
+        for ids in encoded:
+            padding = longest - len(ids)
+            input_ids.append(prefix + [tokenizer.pad_token_id] * padding + ids)
+            attention_mask.append([1] * len(prefix) + [0] * padding + [1] * len(ids))
+        return {
+            "input_ids": torch.tensor(input_ids),
+            "attention_mask": torch.tensor(attention_mask),
+            "past_key_values": _build_cache(self._legacy, len(suffixes)),
+        }
+
+
+def benchmark_prefix_reuse(model, tokenizer, prefix_text, suffixes, max_new_tokens=32):
+    """
+    Measures time-to-first-token and tokens-per-second with and without prefix reuse.
+
+    Args:
+        model: The causal language model.
+        tokenizer: Its tokenizer.
+        prefix_text (str): The shared preamble.
+        suffixes (list): Per-request texts, generated one at a time.
+        max_new_tokens (int): Tokens generated per request for the throughput figure.
+
+    Returns:
+        dict: {"baseline": {...}, "prefix_cache": {...}} with mean TTFT (ms) and tokens/sec.
+    """
+    prefix_cache = PrefixKVCache(model, tokenizer, prefix_text)
+
+    def full_inputs(suffix):
+        encoded = tokenizer(prefix_text + suffix, return_tensors="pt")
+        return {"input_ids": encoded.input_ids, "attention_mask": encoded.attention_mask}
+
+    def cached_inputs(suffix):
+        return prefix_cache.build_inputs(tokenizer, [suffix])
+
+    results = {}
+    for mode, build in (("baseline", full_inputs), ("prefix_cache", cached_inputs)):
+        ttft, generated, elapsed = [], 0, 0.0
+        for suffix in suffixes:
+            start = time.perf_counter()
+            model.generate(**build(suffix), max_new_tokens=1, pad_token_id=tokenizer.pad_token_id)
+            ttft.append(time.perf_counter() - start)
+
+            inputs = build(suffix)
+            start = time.perf_counter()
+            outputs = model.generate(**inputs, max_new_tokens=max_new_tokens, pad_token_id=tokenizer.pad_token_id)
+            elapsed += time.perf_counter() - start
+            generated += outputs.shape[1] - inputs["input_ids"].shape[1]
+        results[mode] = {
+            "requests": len(suffixes),
+            "mean_ttft_ms": round(sum(ttft) / len(ttft) * 1000, 1),
+            "tokens_per_second": round(generated / elapsed, 2) if elapsed else 0,
+        }
+    return results
+
+
+if __name__ == "__main__":
+    from chat_engine import CHAT_PREAMBLE, model_registry
+
+    gpt_neo_model, gpt_neo_tokenizer = model_registry.get("gpt-neo")
+    queries = [
+        "Query: What steps can be taken to mitigate delays?\n",
+        "Query: What are the safety protocols for docking?\n",
+        "Query: How can we improve fuel efficiency?\n",
+    ]
+    print(benchmark_prefix_reuse(gpt_neo_model, gpt_neo_tokenizer, CHAT_PREAMBLE, queries))
@@ -1,8 +1,12 @@
 import openai
 import logging
 import csv
+import io
 from datetime import datetime
+import os
 import sqlite3
+from forecasting import RunningStatsForecaster
+from prompt_runner import run_batch, http_completion
 
 # Configure logging to store prompt logs
 logging.basicConfig(
@@ -39,6 +43,26 @@ def generate_prompt(context, question, template="Context: {context}\nQuestion: {
     """
     return template.format(context=context, question=question)
 
+def request_completion(prompt):
+    """
+    Sends the prompt to the OpenAI API and returns the completion text.
+
+    Args:
+        prompt (str): The input prompt to send to the AI model.
+
+    Returns:
+        str: The response from the AI model.
+
+    Raises:
+        Exception: Any API error, so callers can retry.
+    """
+    response = openai.Completion.create(
+        engine="text-davinci-003",
+        prompt=prompt,
+        max_tokens=150
+    )
+    return response.choices[0].text.strip()
+
 def get_model_response(prompt):
     """
     Sends the prompt to the OpenAI API and retrieves the model's response.
@@ -50,42 +74,83 @@ def get_model_response(prompt):
         str: The response from the AI model.
     """
     try:
-        response = openai.Completion.create(
-            engine="text-davinci-003",
-            prompt=prompt,
-            max_tokens=150
-        )
-        return response.choices[0].text.strip()
+        return request_completion(prompt)
     except Exception as e:
         logging.error("Error while fetching model response: %s", e)
         return "An error occurred while fetching the response."
 
-def batch_test_prompts(csv_file_path):
+def read_prompt_rows(csv_file_path):
     """
-    Reads prompts and contexts from a CSV file, generates responses, and logs the results.
+    Reads 'context'/'question' rows from a prompts CSV file.
+
+    Handles UTF-16 files with a byte-order mark and files where rows were written with
+    literal "\\n" separators on a single line (as the bundled prompts.csv is).
 
     Args:
-        csv_file_path (str): Path to the CSV file containing 'context' and 'question' columns.
-    """
-    try:
-        with open(csv_file_path, mode='r', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                context = row.get('context', '').strip()
-                question = row.get('question', '').strip()
+        csv_file_path (str): Path to the CSV file.
 
-                if not context or not question:
-                    logging.warning("Skipping row with missing context or question: %s", row)
-                    continue
+    Returns:
+        list: One dict per row, keyed by the header columns.
+    """
+    with open(csv_file_path, mode='rb') as file:
+        raw = file.read()
+    encoding = 'utf-16' if raw[:2] in (b'\xff\xfe', b'\xfe\xff') else 'utf-8-sig'
+    text = raw.decode(encoding)
+    if text.strip().count('\n') == 0 and '\\n' in text:
+        text = text.replace('\\n', '\n')
+    return list(csv.DictReader(io.StringIO(text)))
+
+def batch_test_prompts(csv_file_path, output_path=None, checkpoint_path=None, concurrency=8,
+                       rate_per_second=None, max_retries=3, complete=None):
+    """
+    Reads prompts and contexts from a CSV file, generates responses concurrently, and logs the results.
 
-                prompt = generate_prompt(context, question)
-                model_response = get_model_response(prompt)
+    Rows finished in an earlier run (listed in the checkpoint file) are skipped, so rerunning
+    after a crash resumes where it stopped. See prompt_runner.run_batch.
 
-                # Log the prompt and response
-                test_prompt(prompt, model_response)
+    Args:
+        csv_file_path (str): Path to the CSV file containing 'context' and 'question' columns.
+        output_path (str): JSONL results file (default: next to the CSV, "<name>.results.jsonl").
+        checkpoint_path (str): Checkpoint file (default: output_path + ".checkpoint").
+        concurrency (int): Maximum requests in flight.
+        rate_per_second (float): Maximum requests per second (None for no limit).
+        max_retries (int): Retries per row, with exponential backoff.
+        complete (callable): Completion function (default: the OpenAI API via request_completion).
 
-                print(f"Processed Prompt: {prompt}")
-                print(f"Model Response: {model_response}\n")
+    Returns:
+        dict: The run report (row counts, throughput, latency percentiles), or None on error.
+    """
+    try:
+        prompts = []
+        for row in read_prompt_rows(csv_file_path):
+            context = (row.get('context') or '').strip()
+            question = (row.get('question') or '').strip()
+
+            if not context or not question:
+                logging.warning("Skipping row with missing context or question: %s", row)
+                continue
+
+            prompts.append({'prompt': generate_prompt(context, question), 'context': context, 'question': question})
+
+        def log_result(result):
+            # Log the prompt and response
+            test_prompt(result['prompt'], result['response'] if result['status'] == 'ok' else f"Error: {result['error']}")
+
+        report = run_batch(
+            prompts,
+            complete or request_completion,
+            output_path or f"{os.path.splitext(csv_file_path)[0]}.results.jsonl",
+            checkpoint_path=checkpoint_path,
+            concurrency=concurrency,
+            rate_per_second=rate_per_second,
+            max_retries=max_retries,
+            on_result=log_result
+        )
+        logging.info("Batch test report: %s", report)
+        print(f"Processed {report['succeeded']} prompts ({report['skipped']} already done, {report['failed']} failed) "
+              f"at {report['rows_per_second']} prompts/s; latency ms {report['latency_ms']}")
+        print(f"Results written to {report['output_path']}")
+        return report
     except FileNotFoundError:
         logging.error("CSV file not found: %s", csv_file_path)
     except Exception as e:
@@ -94,24 +159,22 @@ def batch_test_prompts(csv_file_path):
 def predictive_analytics():
     """
     Predict delays, fuel consumption, or maintenance needs based on historical data.
+
+    Reads the running statistics maintained as operations and voyages are recorded
+    (see forecasting.py) instead of averaging the whole history tables.
     """
     try:
-        conn = sqlite3.connect('instance/vessel_operations.db')
-        cursor = conn.cursor()
+        forecaster = RunningStatsForecaster(lambda: sqlite3.connect('instance/vessel_operations.db'))
 
-        # Example query: Predict delays based on historical data
-        cursor.execute("SELECT AVG(delay_hours) FROM operations WHERE weather = 'bad'")
-        avg_delay = cursor.fetchone()[0]
+        # Example: Predict delays based on historical data
+        avg_delay = forecaster.predict("delay", weather="bad")["prediction"]
 
         print(f"Predicted average delay during bad weather: {avg_delay} hours")
 
-        # Example query: Predict fuel consumption
-        cursor.execute("SELECT AVG(fuel_consumption) FROM voyages")
-        avg_fuel = cursor.fetchone()[0]
+        # Example: Predict fuel consumption
+        avg_fuel = forecaster.predict("fuel")["prediction"]
 
         print(f"Predicted average fuel consumption: {avg_fuel} liters")
-
-        conn.close()
     except sqlite3.Error as e:
         logging.error("Database error: %s", e)
     except Exception as e:
@@ -135,7 +198,15 @@ if __name__ == "__main__":
 
     # Example usage for batch testing
     csv_file_path = "prompts.csv"  # Replace with the actual path to your CSV file
-    batch_test_prompts(csv_file_path)
+    # PROMPT_COMPLETION_URL points the batch at an OpenAI-style completions endpoint instead
+    # (e.g. a local prompt_runner.StubCompletionServer); PROMPT_RATE_LIMIT caps requests/second
+    completion_url = os.environ.get('PROMPT_COMPLETION_URL')
+    batch_test_prompts(
+        csv_file_path,
+        concurrency=int(os.environ.get('PROMPT_CONCURRENCY', 8)),
+        rate_per_second=float(os.environ.get('PROMPT_RATE_LIMIT', 0)) or None,
+        complete=http_completion(completion_url) if completion_url else None
+    )
 
     # Predictive analytics
     predictive_analytics()
\ No newline at end of file
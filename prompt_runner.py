@@ -0,0 +1,344 @@
+"""
+Batch Prompt Runner
+-------------------
+Runs a list of prompts through a completion function concurrently, with a rate limit,
+retries with exponential backoff and a checkpoint so an interrupted run can resume.
+
+- Prompts are submitted to a thread pool, at most `concurrency` in flight at a time.
+- A token-bucket `RateLimiter` caps requests per second across all workers.
+- Failed calls are retried with exponential backoff and jitter; client errors (HTTP 4xx
+  other than 429) are not retried.
+- Every finished row is appended to a JSONL results file, and its key (row index plus a
+  hash of the prompt) to the checkpoint file. Rows already in the checkpoint are skipped,
+  so rerunning the same command resumes where it stopped. Rows that still fail after all
+  retries are written with status "error" but not checkpointed, so a rerun tries them again.
+
+`StubCompletionServer` is a local OpenAI-style completions endpoint with configurable latency
+and failure rate, and `http_completion` is a client for such an endpoint; together they allow
+testing without an API key. `python prompt_runner.py [rows] [concurrency]` compares a
+sequential run with a concurrent one against the stub.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+import random
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket.
+
+    Args:
+        rate_per_second (float): Sustained requests per second; None or 0 disables the limit.
+        burst (int): Requests that may be made back to back after an idle period.
+    """
+
+    def __init__(self, rate_per_second=None, burst=1):
+        self.rate = rate_per_second or 0
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a request may be made; returns the seconds spent waiting."""
+        if not self.rate:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+def is_retryable(error):
+    """True unless the error is an HTTP client error other than 429 (Too Many Requests)."""
+    status = getattr(error, "code", None) or getattr(error, "http_status", None)
+    return not (isinstance(status, int) and 400 <= status < 500 and status != 429)
+
+
+def row_key(index, prompt):
+    """Checkpoint key of a row: its index plus a hash of the prompt, so an edited file is not skipped."""
+    return f"{index}:{hashlib.sha1(prompt.encode('utf-8')).hexdigest()[:12]}"
+
+
+def load_checkpoint(checkpoint_path):
+    """Returns the set of row keys recorded in a checkpoint file (empty if it does not exist)."""
+    if not checkpoint_path or not os.path.exists(checkpoint_path):
+        return set()
+    with open(checkpoint_path, encoding="utf-8") as file:
+        return {line.strip() for line in file if line.strip()}
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of `values` (q in 0-100); None for an empty list."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))]
+
+
+def _call_with_retries(complete, prompt, limiter, max_retries, backoff_seconds, max_backoff_seconds):
+    # Returns (response, error, attempts, latency of the last attempt)
+    attempt = 0
+    while True:
+        attempt += 1
+        limiter.acquire()
+        started = time.perf_counter()
+        try:
+            return complete(prompt), None, attempt, time.perf_counter() - started
+        except Exception as e:
+            latency = time.perf_counter() - started
+            if attempt > max_retries or not is_retryable(e):
+                return None, e, attempt, latency
+            delay = min(max_backoff_seconds, backoff_seconds * 2 ** (attempt - 1))
+            logging.warning(f"Completion failed ({e}); retry {attempt}/{max_retries} in {delay:.2f}s")
+            time.sleep(delay * random.uniform(0.5, 1.0))
+
+
+def run_batch(prompts, complete, output_path, checkpoint_path=None, concurrency=8, rate_per_second=None,
+              max_retries=3, backoff_seconds=0.5, max_backoff_seconds=30.0, on_result=None):
+    """
+    Completes a batch of prompts concurrently, appending results to a JSONL file.
+
+    Args:
+        prompts (list): Prompt strings, or dicts with a "prompt" key plus fields copied to the result.
+        complete (callable): Takes a prompt and returns the completion text; raises on failure.
+        output_path (str): JSONL file results are appended to.
+        checkpoint_path (str): File of finished row keys; rows listed there are skipped.
+            Defaults to `output_path` + ".checkpoint".
+        concurrency (int): Maximum requests in flight.
+        rate_per_second (float): Maximum requests started per second (None for no limit).
+        max_retries (int): Retries per row after the first attempt.
+        backoff_seconds (float): Delay before the first retry; doubles on every retry.
+        max_backoff_seconds (float): Upper bound on a single retry delay.
+        on_result (callable): Called with each result dict as it is written.
+
+    Returns:
+        dict: Row counts, retries, elapsed seconds, throughput and latency percentiles (ms).
+    """
+    checkpoint_path = checkpoint_path or f"{output_path}.checkpoint"
+    done = load_checkpoint(checkpoint_path)
+    limiter = RateLimiter(rate_per_second, burst=concurrency)
+    concurrency = max(1, int(concurrency))
+    rows = [item if isinstance(item, dict) else {"prompt": item} for item in prompts]
+    pending = [(index, row) for index, row in enumerate(rows) if row_key(index, row["prompt"]) not in done]
+    write_lock = threading.Lock()
+    latencies = []
+    counts = {"succeeded": 0, "failed": 0, "retries": 0}
+
+    def process(index, row):
+        response, error, attempts, latency = _call_with_retries(
+            complete, row["prompt"], limiter, max_retries, backoff_seconds, max_backoff_seconds)
+        result = {
+            **row,
+            "row": index,
+            "key": row_key(index, row["prompt"]),
+            "status": "ok" if error is None else "error",
+            "response": response,
+            "error": None if error is None else str(error),
+            "attempts": attempts,
+            "latency_ms": round(latency * 1000, 2),
+            "completed_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        with write_lock:
+            # Output first, then checkpoint: a crash in between repeats the row rather than losing it
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+            if error is None:
+                checkpoint.write(result["key"] + "\n")
+                checkpoint.flush()
+                counts["succeeded"] += 1
+                latencies.append(latency * 1000)
+            else:
+                counts["failed"] += 1
+                logging.error(f"Row {index} failed after {attempts} attempts: {error}")
+            counts["retries"] += attempts - 1
+        if on_result:
+            on_result(result)
+
+    started = time.perf_counter()
+    with open(output_path, "a", encoding="utf-8") as output, \
+            open(checkpoint_path, "a", encoding="utf-8") as checkpoint, \
+            ThreadPoolExecutor(max_workers=concurrency) as executor:
+        in_flight = set()
+        for index, row in pending:
+            # Keep a bounded window of submitted rows so large files are not queued up front
+            if len(in_flight) >= concurrency * 2:
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    future.result()
+            in_flight.add(executor.submit(process, index, row))
+        for future in in_flight:
+            future.result()
+    elapsed = time.perf_counter() - started
+
+    return {
+        "rows": len(rows),
+        "skipped": len(rows) - len(pending),
+        "succeeded": counts["succeeded"],
+        "failed": counts["failed"],
+        "retries": counts["retries"],
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_second": round(len(pending) / elapsed, 2) if elapsed > 0 else 0,
+        "latency_ms": {
+            name: round(value, 2) if value is not None else None
+            for name, value in (("p50", percentile(latencies, 50)), ("p90", percentile(latencies, 90)),
+                                ("p99", percentile(latencies, 99)), ("max", max(latencies, default=None)))
+        },
+        "output_path": output_path,
+        "checkpoint_path": checkpoint_path,
+    }
+
+
+def http_completion(url, model="text-davinci-003", max_tokens=150, timeout=60):
+    """
+    Returns a `complete(prompt)` function for an OpenAI-style completions endpoint.
+
+    Args:
+        url (str): Full URL of the completions endpoint (e.g. StubCompletionServer.url).
+        model (str): Model name sent with each request.
+        max_tokens (int): Completion length limit.
+        timeout (float): Per-request timeout in seconds.
+    """
+    def complete(prompt):
+        body = json.dumps({"model": model, "prompt": prompt, "max_tokens": max_tokens}).encode("utf-8")
+        request = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.loads(response.read())["choices"][0]["text"].strip()
+    return complete
+
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    # urllib opens a new connection per request; the default listen backlog of 5 overflows
+    # with more than a few workers and stalls them for a second on SYN retransmits
+    request_queue_size = 128
+    daemon_threads = True
+
+
+class StubCompletionServer:
+    """
+    Local OpenAI-style completions server for testing the runner.
+
+    Answers POST requests to any path ending in "/completions" after `latency_seconds`
+    (+/- `jitter` of it), failing a `failure_rate` share of them with HTTP 503.
+
+    Usage:
+        with StubCompletionServer(latency_seconds=0.05) as server:
+            run_batch(prompts, http_completion(server.url), "results.jsonl")
+    """
+
+    def __init__(self, latency_seconds=0.05, failure_rate=0.0, jitter=0.5, port=0, seed=None):
+        self.latency_seconds = latency_seconds
+        self.failure_rate = failure_rate
+        self.jitter = jitter
+        self.requests = 0
+        self.failures = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                with stub._lock:
+                    stub.requests += 1
+                    fail = stub._rng.random() < stub.failure_rate
+                    delay = stub.latency_seconds * stub._rng.uniform(1 - stub.jitter, 1 + stub.jitter)
+                    stub.failures += fail
+                time.sleep(max(0.0, delay))
+                if not self.path.rstrip("/").endswith("/completions"):
+                    self._reply(404, {"error": {"message": "Not found"}})
+                elif fail:
+                    self._reply(503, {"error": {"message": "Stub overloaded"}})
+                else:
+                    prompt = payload.get("prompt", "")
+                    self._reply(200, {
+                        "object": "text_completion",
+                        "model": payload.get("model"),
+                        "choices": [{"index": 0, "text": f" Stub answer to: {prompt[-60:]}", "finish_reason": "stop"}],
+                        "usage": {"prompt_tokens": len(prompt.split()), "completion_tokens": 8},
+                    })
+
+            def _reply(self, status, body):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = _StubHTTPServer(("127.0.0.1", port), Handler)
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1/completions"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-completions", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def benchmark_runner(rows=200, concurrency=16, latency_seconds=0.02, failure_rate=0.05):
+    """
+    Runs `rows` prompts against the stub server sequentially and concurrently, then interrupts
+    and resumes a concurrent run to check that the checkpoint skips finished rows.
+
+    Returns:
+        dict: The run reports and the stub's request counts.
+    """
+    import tempfile
+
+    prompts = [f"Context: Vessel {i} is waiting for a berth.\nQuestion: What should it do?\nAnswer:" for i in range(rows)]
+    directory = tempfile.mkdtemp()
+    report = {}
+    with StubCompletionServer(latency_seconds=latency_seconds, failure_rate=failure_rate, seed=7) as server:
+        complete = http_completion(server.url)
+        for name, workers in (("sequential", 1), ("concurrent", concurrency)):
+            report[name] = run_batch(prompts, complete, os.path.join(directory, f"{name}.jsonl"),
+                                     concurrency=workers, backoff_seconds=0.01)
+
+        # Stop after half the rows, then rerun the same call
+        resumed = os.path.join(directory, "resumed.jsonl")
+        run_batch(prompts[:rows // 2], complete, resumed, concurrency=concurrency, backoff_seconds=0.01)
+        report["resumed"] = run_batch(prompts, complete, resumed, concurrency=concurrency, backoff_seconds=0.01)
+        report["stub"] = {"requests": server.requests, "failures": server.failures}
+    return report
+
+
+if __name__ == "__main__":
+    import sys
+
+    print(json.dumps(benchmark_runner(*[int(arg) for arg in sys.argv[1:3]]), indent=2))
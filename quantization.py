@@ -0,0 +1,150 @@
+"""
+Inference Precision
+-------------------
+Configurable CPU inference precision for the causal language models:
+
+- fp32: full precision (default)
+- bf16: bfloat16 weights and activations, where the CPU supports bfloat16 matmuls
+- int8: dynamic int8 quantization of nn.Linear layers (weights stored as int8,
+        activations quantized on the fly)
+
+GPT-Neo is built from nn.Linear layers and benefits fully from int8. gpt2 uses
+transformers' Conv1D layers, so only its output head is quantized.
+
+`compare_precisions` checks output quality against fp32 on the prompts in prompts.csv
+and reports model size, process memory and latency for each mode.
+"""
+
+import io
+import logging
+import time
+
+import torch
+
+from model_registry import current_rss_mb
+
+SUPPORTED_PRECISIONS = ("fp32", "bf16", "int8")
+
+
+def bf16_supported():
+    """Returns True if a bfloat16 matmul runs on this CPU."""
+    try:
+        a = torch.ones(4, 4, dtype=torch.bfloat16)
+        torch.matmul(a, a)
+        return True
+    except RuntimeError:
+        return False
+
+
+def apply_precision(model, precision):
+    """
+    Converts a loaded model to the requested inference precision.
+
+    Args:
+        model: A causal language model in fp32.
+        precision (str): One of SUPPORTED_PRECISIONS.
+
+    Returns:
+        The converted model (a new module for int8, the same module otherwise).
+
+    Raises:
+        ValueError: If the precision is not supported.
+    """
+    if precision not in SUPPORTED_PRECISIONS:
+        raise ValueError(f"Unsupported model precision: {precision} (expected one of {SUPPORTED_PRECISIONS})")
+    if precision == "bf16":
+        if not bf16_supported():
+            logging.warning("bfloat16 is not supported on this CPU; keeping fp32.")
+            return model
+        return model.to(torch.bfloat16)
+    if precision == "int8":
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model
+
+
+def serialized_size_mb(model):
+    """Returns the size of the model's state dict when saved, which includes packed int8 weights."""
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.getbuffer().nbytes / (1024 * 1024)
+
+
+def _common_prefix(a, b):
+    length = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        length += 1
+    return length
+
+
+def compare_precisions(load_fn, prompts, precisions=SUPPORTED_PRECISIONS, max_new_tokens=40):
+    """
+    Generates greedily with each precision and compares the outputs with fp32.
+
+    Args:
+        load_fn (callable): load_fn(precision) -> (model, tokenizer); loads a fresh model.
+        prompts (list): Prompts to generate from.
+        precisions (tuple): Precisions to evaluate; fp32 is always included as the reference.
+        max_new_tokens (int): Tokens generated per prompt.
+
+    Returns:
+        dict: Per precision: model size, RSS after load, mean latency, tokens/sec,
+        exact-match rate and mean agreement (shared token prefix / generated length) versus fp32.
+    """
+    precisions = ["fp32"] + [p for p in precisions if p != "fp32"]
+    reference = None
+    report = {}
+    for precision in precisions:
+        load_start = time.perf_counter()
+        model, tokenizer = load_fn(precision)
+        load_seconds = time.perf_counter() - load_start
+        outputs, latencies, generated = [], [], 0
+        for prompt in prompts:
+            encoded = tokenizer(prompt, return_tensors="pt")
+            start = time.perf_counter()
+            with torch.no_grad():
+                output = model.generate(
+                    encoded.input_ids,
+                    attention_mask=encoded.attention_mask,
+                    max_new_tokens=max_new_tokens,
+                    do_sample=False,
+                    pad_token_id=tokenizer.pad_token_id
+                )
+            latencies.append(time.perf_counter() - start)
+            new_tokens = output[0, encoded.input_ids.shape[1]:].tolist()
+            generated += len(new_tokens)
+            outputs.append(new_tokens)
+        if reference is None:
+            reference = outputs
+        agreement = [
+            _common_prefix(ref, out) / max(len(ref), 1) for ref, out in zip(reference, outputs)
+        ]
+        report[precision] = {
+            "load_seconds": round(load_seconds, 2),
+            "model_mb": round(serialized_size_mb(model), 1),
+            "process_rss_mb": round(current_rss_mb(), 1),
+            "mean_latency_ms": round(sum(latencies) / len(latencies) * 1000, 1),
+            "tokens_per_second": round(generated / sum(latencies), 2) if sum(latencies) else 0,
+            "exact_match_rate": round(sum(ref == out for ref, out in zip(reference, outputs)) / len(outputs), 3),
+            "mean_agreement": round(sum(agreement) / len(agreement), 3),
+        }
+        del model
+    return report
+
+
+if __name__ == "__main__":
+    import json
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+    from prompt_engineering import generate_prompt, read_prompt_rows
+
+    model_name = "EleutherAI/gpt-neo-1.3B"
+
+    def load(precision):
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        tokenizer.pad_token = tokenizer.pad_token or tokenizer.eos_token
+        model = AutoModelForCausalLM.from_pretrained(model_name)
+        return apply_precision(model, precision), tokenizer
+
+    prompts = [generate_prompt(row['context'], row['question']) for row in read_prompt_rows("prompts.csv")]
+    print(json.dumps(compare_precisions(load, prompts), indent=2))
@@ -0,0 +1,154 @@
+"""
+Response Cache
+--------------
+Bounded cache for chatbot answers, keyed on the normalized user prompt plus the model
+and generation settings that produced the answer.
+
+Entries expire after a TTL and the least recently used entries are evicted when the
+cache is full. An optional SQLite tier keeps answers across restarts.
+"""
+
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_prompt(prompt):
+    """
+    Normalizes a prompt so trivially different phrasings share a cache entry.
+
+    Lowercases, collapses whitespace and drops trailing punctuation, so
+    "What is a shipping label?" and "what is a  shipping label" map to the same key.
+    """
+    text = re.sub(r'\s+', ' ', (prompt or '').strip().lower())
+    return text.rstrip(' ?!.')
+
+
+class ResponseCache:
+    """
+    In-memory LRU cache with TTL and an optional persistent SQLite tier.
+
+    Args:
+        max_entries (int): Maximum number of in-memory entries.
+        ttl_seconds (float): Lifetime of an entry. 0 or None keeps entries until evicted.
+        sqlite_path (str): Path of the SQLite file for the persistent tier. None disables it.
+    """
+
+    def __init__(self, max_entries=1024, ttl_seconds=3600, sqlite_path=None):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = ttl_seconds or None
+        self.sqlite_path = sqlite_path
+        self._entries = OrderedDict()  # key -> (created_at, response)
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "persistent_hits": 0, "misses": 0, "expired": 0, "evictions": 0, "sets": 0}
+        self._conn = None
+        if sqlite_path:
+            self._conn = sqlite3.connect(sqlite_path, check_same_thread=False)
+            self._conn.execute('''CREATE TABLE IF NOT EXISTS response_cache (
+                                    key TEXT PRIMARY KEY,
+                                    response TEXT NOT NULL,
+                                    created_at REAL NOT NULL
+                                )''')
+            self._conn.commit()
+
+    @staticmethod
+    def make_key(prompt, model_name, settings):
+        """
+        Builds the cache key for a prompt.
+
+        Args:
+            prompt (str): The raw user prompt.
+            model_name (str): Name of the model generating the answer.
+            settings (dict): Generation settings that affect the answer.
+
+        Returns:
+            str: A hex digest identifying the (prompt, model, settings) combination.
+        """
+        payload = json.dumps([normalize_prompt(prompt), model_name, settings], sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _is_expired(self, created_at, now):
+        return self.ttl_seconds is not None and now - created_at > self.ttl_seconds
+
+    def get(self, key):
+        """Returns the cached response for `key`, or None on a miss or expired entry."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created_at, response = entry
+                if not self._is_expired(created_at, now):
+                    self._entries.move_to_end(key)
+                    self._counters["hits"] += 1
+                    return response
+                del self._entries[key]
+                self._counters["expired"] += 1
+
+            if self._conn is not None:
+                row = self._conn.execute(
+                    'SELECT response, created_at FROM response_cache WHERE key = ?', (key,)
+                ).fetchone()
+                if row is not None:
+                    response, created_at = row
+                    if not self._is_expired(created_at, now):
+                        self._store(key, created_at, response)
+                        self._counters["persistent_hits"] += 1
+                        return response
+                    self._conn.execute('DELETE FROM response_cache WHERE key = ?', (key,))
+                    self._conn.commit()
+                    self._counters["expired"] += 1
+
+            self._counters["misses"] += 1
+            return None
+
+    def set(self, key, response):
+        """Stores a response in memory and, if enabled, in the SQLite tier."""
+        now = time.time()
+        with self._lock:
+            self._store(key, now, response)
+            self._counters["sets"] += 1
+            if self._conn is not None:
+                try:
+                    self._conn.execute(
+                        'INSERT OR REPLACE INTO response_cache (key, response, created_at) VALUES (?, ?, ?)',
+                        (key, response, now)
+                    )
+                    self._conn.commit()
+                except sqlite3.Error as e:
+                    logging.error(f"Response cache write failed: {e}")
+
+    def _store(self, key, created_at, response):
+        # Caller holds self._lock.
+        self._entries[key] = (created_at, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def clear(self):
+        """Removes all entries from both tiers."""
+        with self._lock:
+            self._entries.clear()
+            if self._conn is not None:
+                self._conn.execute('DELETE FROM response_cache')
+                self._conn.commit()
+
+    def stats(self):
+        """Returns hit/miss counters, hit rate and current size."""
+        with self._lock:
+            counters = dict(self._counters)
+            size = len(self._entries)
+        lookups = counters["hits"] + counters["persistent_hits"] + counters["misses"]
+        counters.update(
+            size=size,
+            max_entries=self.max_entries,
+            ttl_seconds=self.ttl_seconds,
+            persistent=self._conn is not None,
+            hit_rate=round((counters["hits"] + counters["persistent_hits"]) / lookups, 3) if lookups else 0,
+        )
+        return counters
@@ -0,0 +1,81 @@
+"""
+Assisted (Speculative) Decoding
+-------------------------------
+Uses the small gpt2 model as a draft model for GPT-Neo through the `assistant_model`
+option of `generate`. The draft proposes several tokens and GPT-Neo verifies them in a
+single forward pass; with greedy decoding the output is identical to plain generation.
+
+Both models share the GPT-2 byte-level BPE vocabulary, so the draft's tokens can be
+verified directly without re-tokenization.
+"""
+
+import time
+
+
+def assisted_generate_kwargs(draft_model, num_draft_tokens=None):
+    """
+    Returns the extra generate() arguments that enable assisted decoding.
+
+    Args:
+        draft_model: The small model proposing tokens.
+        num_draft_tokens (int): Tokens proposed per verification step. None keeps the model's default.
+    """
+    if num_draft_tokens:
+        draft_model.generation_config.num_assistant_tokens = int(num_draft_tokens)
+    return {"assistant_model": draft_model, "do_sample": False}
+
+
+def benchmark_assisted_decoding(model, draft_model, tokenizer, prompts, max_new_tokens=64, num_draft_tokens=None):
+    """
+    Compares greedy decoding with and without the draft model.
+
+    Args:
+        model: The target model (GPT-Neo).
+        draft_model: The draft model (gpt2).
+        tokenizer: Tokenizer shared by both models.
+        prompts (list): Full prompts, generated one at a time (assisted decoding is single-sequence).
+        max_new_tokens (int): Tokens generated per prompt.
+        num_draft_tokens (int): Tokens proposed per verification step.
+
+    Returns:
+        dict: Tokens/sec for each mode, the speedup, and whether every output matched greedy decoding.
+    """
+    results = {}
+    outputs_by_mode = {}
+    for mode in ("greedy", "assisted"):
+        extra = assisted_generate_kwargs(draft_model, num_draft_tokens) if mode == "assisted" else {"do_sample": False}
+        generated, elapsed, outputs = 0, 0.0, []
+        for prompt in prompts:
+            encoded = tokenizer(prompt, return_tensors="pt")
+            start = time.perf_counter()
+            output = model.generate(
+                encoded.input_ids,
+                attention_mask=encoded.attention_mask,
+                max_new_tokens=max_new_tokens,
+                pad_token_id=tokenizer.pad_token_id,
+                **extra
+            )
+            elapsed += time.perf_counter() - start
+            generated += output.shape[1] - encoded.input_ids.shape[1]
+            outputs.append(output[0].tolist())
+        outputs_by_mode[mode] = outputs
+        results[mode] = {"tokens_per_second": round(generated / elapsed, 2) if elapsed else 0}
+    results["speedup"] = round(
+        results["assisted"]["tokens_per_second"] / results["greedy"]["tokens_per_second"], 2
+    ) if results["greedy"]["tokens_per_second"] else 0
+    results["identical_outputs"] = outputs_by_mode["greedy"] == outputs_by_mode["assisted"]
+    return results
+
+
+if __name__ == "__main__":
+    from chat_engine import CHAT_PREAMBLE, model_registry
+
+    gpt_neo_model, gpt_neo_tokenizer = model_registry.get("gpt-neo")
+    gpt2_model, _ = model_registry.get("gpt2")
+    queries = [
+        "What steps can be taken to mitigate delays?",
+        "What are the safety protocols for docking?",
+        "How can we improve fuel efficiency?",
+    ]
+    prompts = [CHAT_PREAMBLE + f"Query: {query}\n" for query in queries]
+    print(benchmark_assisted_decoding(gpt_neo_model, gpt2_model, gpt_neo_tokenizer, prompts))
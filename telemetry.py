@@ -0,0 +1,378 @@
+"""
+Telemetry Store
+---------------
+Append-only store for per-vessel fuel consumption and emissions samples, with hourly and
+daily rollups maintained incrementally as samples arrive.
+
+Samples live in the `telemetry` table and rollups in `telemetry_rollup` (see migrations.py).
+Both are WITHOUT ROWID tables clustered on their lookup key, so a vessel's samples (or a
+resolution's buckets) for a time range are one contiguous B-tree range. Each append batch is
+aggregated per bucket in memory and merged into the rollups with one upsert per bucket, in
+the same transaction as the samples, so rollups never drift from the raw data.
+
+Range queries return columnar results (one list per field), read from the coarsest table
+that answers them: months of data are served from a few hundred daily buckets instead of
+millions of raw samples.
+
+`python telemetry.py [vessels] [days]` loads one-minute samples into a scratch database and
+times appends and range queries.
+"""
+
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timezone
+
+RESOLUTIONS = {"hour": 3600, "day": 86400}
+
+_UPSERT_ROLLUP = '''
+    INSERT INTO telemetry_rollup (resolution, vessel_name, bucket, samples, fuel_sum, fuel_min, fuel_max,
+                                  emissions_sum, emissions_min, emissions_max)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (resolution, vessel_name, bucket) DO UPDATE SET
+        samples = samples + excluded.samples,
+        fuel_sum = fuel_sum + excluded.fuel_sum,
+        fuel_min = MIN(fuel_min, excluded.fuel_min),
+        fuel_max = MAX(fuel_max, excluded.fuel_max),
+        emissions_sum = emissions_sum + excluded.emissions_sum,
+        emissions_min = MIN(emissions_min, excluded.emissions_min),
+        emissions_max = MAX(emissions_max, excluded.emissions_max)
+'''
+
+
+def to_timestamp(value):
+    """
+    Converts epoch seconds, an ISO 8601 string or a datetime to epoch seconds.
+    Naive datetimes and strings without an offset are taken as UTC.
+
+    Raises:
+        ValueError: If the value cannot be parsed.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    raise ValueError(f"Unsupported timestamp: {value!r}")
+
+
+def pick_resolution(start, end, max_raw_seconds=6 * 3600, max_hourly_seconds=31 * 86400):
+    """Returns "raw", "hour" or "day" for a time span, keeping responses to a few hundred points per vessel."""
+    span = (end or time.time()) - (start or 0)
+    if span <= max_raw_seconds:
+        return "raw"
+    if span <= max_hourly_seconds:
+        return "hour"
+    return "day"
+
+
+class TelemetryStore:
+    """
+    Appends telemetry samples and answers range queries from the samples or the rollups.
+
+    Args:
+        connect: Callable returning a DB-API SQLite connection; closing it must release it
+            (e.g. `engine.raw_connection`).
+    """
+
+    def __init__(self, connect):
+        self.connect = connect
+
+    def append(self, samples):
+        """
+        Appends samples and folds them into the hourly and daily rollups.
+
+        Args:
+            samples: Iterable of (vessel_name, ts, fuel_consumption, emissions) tuples or dicts
+                with those keys; `ts` may be epoch seconds, ISO 8601 or a datetime.
+
+        Returns:
+            int: Samples stored. Samples repeating an existing (vessel_name, ts) are ignored.
+        """
+        batch = {}
+        for sample in samples:
+            if isinstance(sample, dict):
+                sample = (sample.get("vessel_name"), sample.get("ts"),
+                          sample.get("fuel_consumption"), sample.get("emissions"))
+            vessel_name, ts, fuel, emissions = sample
+            if not vessel_name:
+                raise ValueError("vessel_name is required")
+            ts = to_timestamp(ts)
+            batch[(vessel_name, ts)] = (vessel_name, ts, float(fuel), float(emissions))
+        if not batch:
+            return 0
+
+        conn = self.connect()
+        try:
+            # The write lock is taken up front so concurrent appenders cannot both count a sample
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._new_rows(conn, batch)
+                conn.executemany(
+                    "INSERT INTO telemetry (vessel_name, ts, fuel_consumption, emissions) VALUES (?, ?, ?, ?)", rows)
+                conn.executemany(_UPSERT_ROLLUP, self._rollup_rows(rows))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        finally:
+            conn.close()
+        return len(rows)
+
+    @staticmethod
+    def _new_rows(conn, batch):
+        # Drops samples already stored, reading each vessel's existing timestamps over the batch's time range
+        by_vessel = {}
+        for vessel_name, ts in batch:
+            by_vessel.setdefault(vessel_name, []).append(ts)
+        rows = []
+        for vessel_name, stamps in by_vessel.items():
+            existing = {ts for (ts,) in conn.execute(
+                "SELECT ts FROM telemetry WHERE vessel_name = ? AND ts BETWEEN ? AND ?",
+                (vessel_name, min(stamps), max(stamps)))}
+            rows.extend(batch[(vessel_name, ts)] for ts in stamps if ts not in existing)
+        return rows
+
+    @staticmethod
+    def _rollup_rows(rows):
+        buckets = {}
+        for vessel_name, ts, fuel, emissions in rows:
+            for seconds in RESOLUTIONS.values():
+                key = (seconds, vessel_name, int(ts // seconds) * seconds)
+                agg = buckets.get(key)
+                if agg is None:
+                    buckets[key] = [1, fuel, fuel, fuel, emissions, emissions, emissions]
+                else:
+                    agg[0] += 1
+                    agg[1] += fuel
+                    agg[2] = min(agg[2], fuel)
+                    agg[3] = max(agg[3], fuel)
+                    agg[4] += emissions
+                    agg[5] = min(agg[5], emissions)
+                    agg[6] = max(agg[6], emissions)
+        return [key + tuple(agg) for key, agg in buckets.items()]
+
+    def series(self, vessel_name=None, start=None, end=None, resolution="auto"):
+        """
+        Returns a time series for one vessel, or the whole fleet, as columns.
+
+        Args:
+            vessel_name (str): Vessel to read; None aggregates every vessel (rollups only).
+            start, end: Inclusive time range (epoch seconds, ISO 8601 or datetime); open-ended if None.
+            resolution (str): "raw", "hour", "day" or "auto" (chosen from the span).
+
+        Returns:
+            dict: For "raw", lists "ts", "fuel_consumption" and "emissions". For rollups, lists
+            "bucket", "samples" and sum/avg/min/max of fuel_consumption and emissions per bucket.
+
+        Raises:
+            ValueError: On an unknown resolution, or a raw fleet-wide query.
+        """
+        start, end = to_timestamp(start), to_timestamp(end)
+        if resolution == "auto":
+            resolution = pick_resolution(start, end)
+            if resolution == "raw" and vessel_name is None:
+                resolution = "hour"
+        conn = self.connect()
+        try:
+            if resolution == "raw":
+                if vessel_name is None:
+                    raise ValueError("Raw telemetry is only available per vessel")
+                rows = conn.execute(
+                    '''SELECT ts, fuel_consumption, emissions FROM telemetry
+                       WHERE vessel_name = ? AND ts BETWEEN ? AND ? ORDER BY ts''',
+                    (vessel_name, start if start is not None else float('-inf'),
+                     end if end is not None else float('inf'))).fetchall()
+                return {"resolution": "raw", "vessel_name": vessel_name,
+                        **dict(zip(("ts", "fuel_consumption", "emissions"), map(list, zip(*rows)) if rows else ([], [], [])))}
+            if resolution not in RESOLUTIONS:
+                raise ValueError(f"resolution must be one of: auto, raw, {', '.join(RESOLUTIONS)}")
+            rows = self._rollups(conn, RESOLUTIONS[resolution], vessel_name, start, end)
+        finally:
+            conn.close()
+        columns = {name: [] for name in ("bucket", "samples", "fuel_sum", "fuel_avg", "fuel_min", "fuel_max",
+                                         "emissions_sum", "emissions_avg", "emissions_min", "emissions_max")}
+        for bucket, samples, fuel_sum, fuel_min, fuel_max, emissions_sum, emissions_min, emissions_max in rows:
+            for name, value in (("bucket", bucket), ("samples", samples), ("fuel_sum", fuel_sum),
+                                ("fuel_avg", fuel_sum / samples), ("fuel_min", fuel_min), ("fuel_max", fuel_max),
+                                ("emissions_sum", emissions_sum), ("emissions_avg", emissions_sum / samples),
+                                ("emissions_min", emissions_min), ("emissions_max", emissions_max)):
+                columns[name].append(value)
+        return {"resolution": resolution, "vessel_name": vessel_name, **columns}
+
+    @staticmethod
+    def _rollups(conn, seconds, vessel_name, start, end):
+        # Buckets overlapping [start, end], merged across vessels when vessel_name is None
+        low = int(start // seconds) * seconds if start is not None else -2 ** 62
+        high = end if end is not None else 2 ** 62
+        if vessel_name is not None:
+            return conn.execute(
+                '''SELECT bucket, samples, fuel_sum, fuel_min, fuel_max, emissions_sum, emissions_min, emissions_max
+                   FROM telemetry_rollup WHERE resolution = ? AND vessel_name = ? AND bucket BETWEEN ? AND ?
+                   ORDER BY bucket''', (seconds, vessel_name, low, high)).fetchall()
+        return conn.execute(
+            '''SELECT bucket, SUM(samples), SUM(fuel_sum), MIN(fuel_min), MAX(fuel_max),
+                      SUM(emissions_sum), MIN(emissions_min), MAX(emissions_max)
+               FROM telemetry_rollup WHERE resolution = ? AND bucket BETWEEN ? AND ?
+               GROUP BY bucket ORDER BY bucket''', (seconds, low, high)).fetchall()
+
+    def totals(self, start=None, end=None, vessel_name=None):
+        """
+        Returns sample count, total and average fuel consumption and emissions over a range.
+
+        Whole days inside the range are read from the daily rollup and the partial days at
+        either end from the hourly rollup, so the range is hour-aligned.
+        """
+        start, end = to_timestamp(start), to_timestamp(end)
+        hour, day = RESOLUTIONS["hour"], RESOLUTIONS["day"]
+        low = int(start // hour) * hour if start is not None else None
+        high = end if end is not None else None
+        first_day = -(-low // day) * day if low is not None else None  # first midnight at or after low
+        last_day = int((high + 1) // day) * day - day if high is not None else None  # last day ending by high
+        conn = self.connect()
+        try:
+            if first_day is not None and last_day is not None and first_day > last_day:
+                ranges = [(hour, low, high)]
+            else:
+                ranges = [(day, first_day, last_day)]
+                if low is not None and low < first_day:
+                    ranges.append((hour, low, first_day - 1))
+                if high is not None:
+                    ranges.append((hour, last_day + day, high))
+            samples = fuel = emissions = 0
+            for seconds, range_start, range_end in ranges:
+                condition = "resolution = ?"
+                params = [seconds]
+                if vessel_name is not None:
+                    condition += " AND vessel_name = ?"
+                    params.append(vessel_name)
+                if range_start is not None:
+                    condition += " AND bucket >= ?"
+                    params.append(range_start)
+                if range_end is not None:
+                    condition += " AND bucket <= ?"
+                    params.append(range_end)
+                count, fuel_sum, emissions_sum = conn.execute(
+                    f"SELECT SUM(samples), SUM(fuel_sum), SUM(emissions_sum) FROM telemetry_rollup WHERE {condition}",
+                    params).fetchone()
+                samples += count or 0
+                fuel += fuel_sum or 0
+                emissions += emissions_sum or 0
+        finally:
+            conn.close()
+        return {
+            "samples": samples,
+            "fuel_consumption": round(fuel, 2),
+            "emissions": round(emissions, 2),
+            "avg_fuel_consumption": round(fuel / samples, 2) if samples else 0,
+            "avg_emissions": round(emissions / samples, 2) if samples else 0,
+        }
+
+
+def acquire_process_lock(path):
+    """
+    Takes a non-blocking exclusive lock on `path`, so only one process on the host runs a job
+    such as the telemetry sampler.
+
+    The lock is held for as long as the returned file stays open and is released by the OS when
+    the process exits, so a crashed holder never leaves a stale lock behind.
+
+    Args:
+        path: Lock file path; created if missing.
+
+    Returns:
+        The open lock file, which the caller must keep referenced, or None if another process
+        already holds the lock.
+    """
+    lock_file = open(path, "a+")
+    try:
+        if os.name == "nt":
+            import msvcrt
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return None
+    return lock_file
+
+
+def benchmark_telemetry(vessels=20, days=90, interval_seconds=60, batch_size=50_000):
+    """
+    Loads `days` of samples every `interval_seconds` for `vessels` vessels into a scratch
+    database, then times range queries against the raw samples and the rollups.
+
+    Returns:
+        dict: Load rate and per-query milliseconds.
+    """
+    from migrations import apply_migrations
+
+    path = os.path.join(tempfile.mkdtemp(), "telemetry.db")
+    conn = sqlite3.connect(path)
+    apply_migrations(conn)
+    conn.close()
+    store = TelemetryStore(lambda: sqlite3.connect(path))
+
+    end = int(time.time() // 86400) * 86400
+    start = end - days * 86400
+    names = [f"Vessel {i}" for i in range(vessels)]
+    total = 0
+    load_start = time.perf_counter()
+    batch = []
+    for ts in range(start, end, interval_seconds):
+        for i, name in enumerate(names):
+            fuel = 50 + (ts // interval_seconds + i) % 50
+            batch.append((name, ts, fuel, fuel * 2.68))
+        if len(batch) >= batch_size:
+            total += store.append(batch)
+            batch = []
+    total += store.append(batch)
+    load_seconds = time.perf_counter() - load_start
+
+    def timed(fn):
+        began = time.perf_counter()
+        result = fn()
+        return round((time.perf_counter() - began) * 1000, 2), result
+
+    month_ago = end - 30 * 86400
+    raw_ms, raw = timed(lambda: store.series(names[0], month_ago, end, resolution="raw"))
+    conn = sqlite3.connect(path)
+    scan_ms, _ = timed(lambda: conn.execute(
+        "SELECT SUM(fuel_consumption), SUM(emissions), COUNT(*) FROM telemetry WHERE ts BETWEEN ? AND ?",
+        (start, end)).fetchone())
+    conn.close()
+    hourly_ms, _ = timed(lambda: store.series(names[0], month_ago, end, resolution="hour"))
+    fleet_daily_ms, _ = timed(lambda: store.series(None, start, end, resolution="day"))
+    totals_ms, totals = timed(lambda: store.totals(start + 3600 * 5, end))
+    os.remove(path)
+    return {
+        "samples": total,
+        "load_seconds": round(load_seconds, 2),
+        "samples_per_second": round(total / load_seconds, 1),
+        "vessel_30d_raw_ms": raw_ms,
+        "vessel_30d_raw_points": len(raw["ts"]),
+        "vessel_30d_hourly_ms": hourly_ms,
+        "fleet_full_range_daily_ms": fleet_daily_ms,
+        "fleet_totals_from_rollups_ms": totals_ms,
+        "fleet_totals_full_scan_ms": scan_ms,
+        "totals_samples": totals["samples"],
+    }
+
+
+if __name__ == "__main__":
+    import json
+    import sys
+
+    args = [int(arg) for arg in sys.argv[1:3]]
+    print(json.dumps(benchmark_telemetry(*args), indent=2))
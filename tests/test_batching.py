@@ -0,0 +1,80 @@
+import threading
+import time
+
+import pytest
+
+from batching import BatchScheduler
+
+
+def submit_concurrently(scheduler, items, timeout=5):
+    results = {}
+    barrier = threading.Barrier(len(items))
+
+    def run(item):
+        barrier.wait()
+        try:
+            results[item] = scheduler.submit(item, timeout=timeout)
+        except Exception as e:
+            results[item] = e
+
+    threads = [threading.Thread(target=run, args=(item,)) for item in items]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout)
+    return results
+
+
+def test_each_caller_gets_the_result_for_its_own_item():
+    batches = []
+
+    def batch_fn(items):
+        batches.append(list(items))
+        return [item * 10 for item in items]
+
+    scheduler = BatchScheduler(batch_fn, max_batch_size=8, max_wait_ms=200)
+    items = list(range(1, 7))
+    results = submit_concurrently(scheduler, items)
+    assert results == {item: item * 10 for item in items}
+    # Items arriving together within max_wait share a batch
+    assert len(batches) < len(items)
+    assert sorted(item for batch in batches for item in batch) == items
+    assert scheduler.stats()["requests"] == len(items)
+
+
+def test_batches_never_exceed_max_batch_size():
+    batches = []
+
+    def batch_fn(items):
+        batches.append(len(items))
+        return list(items)
+
+    scheduler = BatchScheduler(batch_fn, max_batch_size=2, max_wait_ms=100)
+    results = submit_concurrently(scheduler, list(range(5)))
+    assert results == {item: item for item in range(5)}
+    assert max(batches) <= 2
+
+
+def test_a_lone_request_waits_at_most_max_wait():
+    scheduler = BatchScheduler(lambda items: list(items), max_batch_size=8, max_wait_ms=50)
+    scheduler.submit("warm-up", timeout=5)
+    started = time.perf_counter()
+    assert scheduler.submit("alone", timeout=5) == "alone"
+    assert time.perf_counter() - started < 1.0
+    assert scheduler.stats()["max_queue_wait_ms"] >= 40
+
+
+def test_batch_errors_reach_every_caller_in_the_batch():
+    def batch_fn(items):
+        raise RuntimeError("model failed")
+
+    scheduler = BatchScheduler(batch_fn, max_batch_size=4, max_wait_ms=100)
+    results = submit_concurrently(scheduler, ["a", "b"])
+    assert all(isinstance(result, RuntimeError) for result in results.values())
+    assert scheduler.stats()["errors"] >= 1
+
+
+def test_a_short_result_list_fails_the_batch():
+    scheduler = BatchScheduler(lambda items: [], max_batch_size=4, max_wait_ms=0)
+    with pytest.raises(RuntimeError):
+        scheduler.submit("a", timeout=5)
@@ -0,0 +1,86 @@
+import random
+
+import pytest
+
+from berth_scheduling import BerthScheduler, random_assignment
+
+BERTHS = [
+    {"name": "Berth 1", "length": 250, "max_draft": 12},
+    {"name": "Berth 2", "length": 350},
+    {"name": "Berth 3", "length": 400, "available_from": 10},
+]
+
+
+def random_calls(count, seed=1):
+    rng = random.Random(seed)
+    return [{"vessel": f"Vessel {i}", "eta": rng.uniform(0, count * 6), "duration": rng.uniform(6, 30),
+             "length": rng.uniform(100, 380), "draft": rng.uniform(8, 15)} for i in range(count)]
+
+
+def assert_feasible(schedule, calls, berths=BERTHS):
+    berths = {b["name"]: b for b in berths}
+    calls = {c["vessel"]: c for c in calls}
+    by_berth = {}
+    for a in schedule["assignments"]:
+        call, berth = calls[a["vessel"]], berths[a["berth"]]
+        assert call["length"] <= berth["length"]
+        assert call.get("draft", 0) <= berth.get("max_draft", float("inf"))
+        assert a["start"] >= call["eta"] - 1e-9
+        assert a["start"] >= berth.get("available_from", float("-inf")) - 1e-9
+        assert a["end"] == pytest.approx(a["start"] + call["duration"])
+        assert a["wait"] == pytest.approx(a["start"] - call["eta"])
+        by_berth.setdefault(a["berth"], []).append(a)
+    for sequence in by_berth.values():
+        sequence.sort(key=lambda a: a["start"])
+        for first, second in zip(sequence, sequence[1:]):
+            assert second["start"] >= first["end"] - 1e-9
+    assert len(schedule["assignments"]) + len(schedule["unassigned"]) == len(calls)
+    assert schedule["total_wait"] == pytest.approx(sum(a["wait"] for a in schedule["assignments"]), abs=1e-3)
+
+
+def test_plan_is_conflict_free_and_respects_berth_limits():
+    calls = random_calls(200)
+    schedule = BerthScheduler(BERTHS).plan(calls)
+    assert_feasible(schedule, calls)
+    assert schedule["total_wait"] <= random_assignment(calls, BERTHS)
+
+
+def test_calls_go_to_the_shortest_fitting_berth_or_stay_unassigned():
+    calls = [{"vessel": "Giant", "eta": 20, "duration": 10, "length": 450},
+             {"vessel": "Deep", "eta": 20, "duration": 10, "length": 200, "draft": 20},
+             {"vessel": "Small", "eta": 20, "service_hours": 10, "length": 200}]
+    schedule = BerthScheduler(BERTHS).plan(calls)
+    assert schedule["unassigned"] == ["Giant"]
+    berths = {a["vessel"]: a["berth"] for a in schedule["assignments"]}
+    # Ties go to the shortest berth that fits, keeping the long ones free
+    assert berths == {"Small": "Berth 1", "Deep": "Berth 2"}
+    assert schedule["total_wait"] == 0
+
+
+def test_replan_after_a_delay_stays_feasible():
+    calls = random_calls(120, seed=4)
+    scheduler = BerthScheduler(BERTHS)
+    schedule = scheduler.plan(calls)
+    late = dict(sorted(calls, key=lambda c: c["eta"])[60])
+    late["eta"] += 12
+    updated = scheduler.replan(schedule, late)
+    updated_calls = [late if c["vessel"] == late["vessel"] else c for c in calls]
+    assert_feasible(updated, updated_calls)
+    assert scheduler.last_stats["strategy"] == "repair"
+    # The input schedule is left untouched
+    assert_feasible(schedule, calls)
+
+
+def test_replan_never_moves_a_call_already_being_served():
+    scheduler = BerthScheduler(BERTHS)
+    schedule = scheduler.plan([{"vessel": "A", "eta": 0, "duration": 10, "length": 200}])
+    assert scheduler.replan(schedule, {"vessel": "A", "eta": 5, "duration": 10, "length": 200}, now=1) is schedule
+
+
+def test_invalid_input_is_rejected():
+    with pytest.raises(ValueError):
+        BerthScheduler([])
+    with pytest.raises(ValueError):
+        BerthScheduler(BERTHS).plan([{"vessel": "A", "duration": 5}])
+    with pytest.raises(ValueError):
+        BerthScheduler(BERTHS).plan([{"vessel": "A", "eta": 0, "duration": -1}])
@@ -0,0 +1,71 @@
+import sqlite3
+
+import pytest
+
+from bulk_import import SAMPLE_RECORDS, import_records
+from migrations import MIGRATIONS, apply_migrations
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("PRAGMA foreign_keys = ON")
+    apply_migrations(conn)
+    yield conn
+    conn.close()
+
+
+def emission_samples(count=500):
+    return [{"vessel_name": f"Vessel {i % 20}", "fuel_consumption": 100.0 + i, "emissions": 300.0 + i}
+            for i in range(count)]
+
+
+def test_reimporting_identical_rows_changes_nothing(conn):
+    first = import_records(conn, "emissions", emission_samples())
+    assert first["inserted"] == 500
+    again = import_records(conn, "emissions", emission_samples())
+    assert (again["inserted"], again["updated"], again["unchanged"]) == (0, 0, 500)
+    assert conn.execute("SELECT COUNT(*) FROM sustainability").fetchone()[0] == 500
+
+
+def test_only_changed_rows_are_updated(conn):
+    records = [{"shipment_name": f"Shipment {i}", "location": "Port 1", "delay": i % 5} for i in range(100)]
+    import_records(conn, "logistics", records)
+    records[7]["delay"] = 99
+    stats = import_records(conn, "logistics", records)
+    assert (stats["inserted"], stats["updated"], stats["unchanged"]) == (0, 1, 99)
+    assert conn.execute("SELECT delay FROM logistics WHERE shipment_name = 'Shipment 7'").fetchone()[0] == 99
+
+
+def test_repeats_within_one_input_are_counted_as_duplicates(conn):
+    records = emission_samples(10)
+    stats = import_records(conn, "emissions", records + records[:3])
+    assert stats["duplicates"] == 3
+    assert stats["inserted"] == 10
+
+
+def test_seed_cleanup_keeps_identical_rows_that_are_not_sample_data():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("PRAGMA foreign_keys = ON")
+    # Bring the schema to the version right before the cleanup migration
+    cleanup = next(index for index, migration in enumerate(MIGRATIONS) if migration[0] == 4)
+    for version, _, migrate in MIGRATIONS[:cleanup]:
+        migrate(conn)
+        conn.execute(f"PRAGMA user_version = {version}")
+    for _ in range(3):
+        for record in SAMPLE_RECORDS["vessels"]:
+            conn.execute("INSERT INTO vessel (name, destination, status) VALUES (:name, :destination, :status)", record)
+        for record in SAMPLE_RECORDS["emissions"]:
+            conn.execute("INSERT INTO sustainability (vessel_name, fuel_consumption, emissions) "
+                         "VALUES (:vessel_name, :fuel_consumption, :emissions)", record)
+        conn.execute("INSERT INTO logistics (shipment_name, location, delay) VALUES ('Shipment Q', 'Port 9', 5)")
+    conn.commit()
+
+    apply_migrations(conn)
+
+    assert conn.execute("SELECT COUNT(*) FROM vessel").fetchone()[0] == 3
+    assert conn.execute("SELECT COUNT(*) FROM sustainability").fetchone()[0] == 3
+    assert conn.execute("SELECT COUNT(*) FROM logistics WHERE shipment_name = 'Shipment Q'").fetchone()[0] == 3
+    unlinked = conn.execute("SELECT COUNT(*) FROM sustainability WHERE vessel_id IS NULL").fetchone()[0]
+    assert unlinked == 0
+    conn.close()
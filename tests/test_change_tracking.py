@@ -0,0 +1,60 @@
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, text
+
+import change_tracking
+from change_tracking import ChangeTracker, VersionedCache
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE vessels (id INTEGER PRIMARY KEY, name TEXT)"))
+        conn.execute(text("CREATE TABLE operations (id INTEGER PRIMARY KEY, vessel_id INTEGER)"))
+    yield engine
+    engine.dispose()
+
+
+def test_writes_through_the_engine_bump_their_table(engine):
+    tracker = ChangeTracker()
+    tracker.attach(engine)
+    assert tracker.version("vessels", "operations") == (0, 0)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO vessels (name) VALUES ('Vessel A')"))
+        conn.execute(text('UPDATE "vessels" SET name = \'Vessel B\''))
+        conn.execute(text("INSERT OR REPLACE INTO operations (id, vessel_id) VALUES (1, 1)"))
+        conn.execute(text("DELETE FROM operations"))
+    assert tracker.version("vessels", "operations") == (2, 2)
+
+
+def test_reads_do_not_change_the_version(engine):
+    tracker = ChangeTracker()
+    tracker.attach(engine)
+    with engine.connect() as conn:
+        conn.execute(text("SELECT COUNT(*) FROM vessels")).scalar()
+    assert tracker.version("vessels") == (0,)
+    tracker.bump("vessels")
+    assert tracker.version("vessels") == (1,)
+
+
+def test_cache_is_valid_only_at_the_version_it_was_computed_from():
+    cache = VersionedCache(ttl_seconds=30)
+    cache.set((1, 0), {"vessels": 3})
+    assert cache.get((1, 0)) == {"vessels": 3}
+    assert cache.get((2, 0)) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+    cache.invalidate()
+    assert cache.get((1, 0)) is None
+
+
+def test_cache_entries_expire_after_the_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(change_tracking, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    cache = VersionedCache(ttl_seconds=30)
+    cache.set((1,), "value")
+    now[0] += 29
+    assert cache.get((1,)) == "value"
+    now[0] += 2
+    assert cache.get((1,)) is None
@@ -0,0 +1,95 @@
+import os
+import subprocess
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+import chat_engine
+from model_registry import ModelRegistry
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_importing_the_chat_engine_has_no_application_side_effects(tmp_path):
+    # The inference service imports chat_engine; the web application, its scheduler and the models must stay out
+    check = (
+        "import sys, threading, chat_engine\n"
+        "assert 'main' not in sys.modules\n"
+        "assert not [name for name in sys.modules if name.split('.')[0] in ('flask', 'apscheduler', 'torch', 'transformers')]\n"
+        "assert not any(chat_engine.model_registry.is_loaded(name) for name in ('gpt2', 'gpt-neo', 'gpt-neo-prefix'))\n"
+        "assert threading.active_count() == 1\n"
+    )
+    result = subprocess.run([sys.executable, "-c", check], cwd=tmp_path, capture_output=True, text=True,
+                            env={**os.environ, "PYTHONPATH": REPO_ROOT})
+    assert result.returncode == 0, result.stderr
+    assert not (tmp_path / "instance").exists()
+
+
+class StubTokenizer:
+    """Whitespace tokenizer with left padding, shaped like the Hugging Face one for these calls."""
+
+    pad_token_id = 0
+
+    def __init__(self):
+        self.vocab = {"<pad>": 0}
+
+    def _encode(self, text):
+        return [self.vocab.setdefault(word, len(self.vocab)) for word in text.split()]
+
+    def __call__(self, texts, return_tensors=None, padding=False):
+        np = pytest.importorskip("numpy")
+        encoded = [self._encode(text) for text in ([texts] if isinstance(texts, str) else texts)]
+        longest = max(len(ids) for ids in encoded)
+        return SimpleNamespace(
+            input_ids=np.array([[0] * (longest - len(ids)) + ids for ids in encoded]),
+            attention_mask=np.array([[0] * (longest - len(ids)) + [1] * len(ids) for ids in encoded]),
+        )
+
+    def decode(self, ids, skip_special_tokens=False):
+        words = {index: word for word, index in self.vocab.items()}
+        return " ".join(words[int(i)] for i in ids if not (skip_special_tokens and int(i) == 0))
+
+
+class StubModel:
+    """Appends one "more" token per step and follows generate()'s max_length / max_new_tokens rules."""
+
+    def __init__(self, tokenizer):
+        self.token = tokenizer.vocab.setdefault("more", len(tokenizer.vocab))
+
+    def generate(self, input_ids, attention_mask, pad_token_id, max_new_tokens=None, max_length=None, **kwargs):
+        import numpy as np
+
+        new_tokens = max_new_tokens if max_new_tokens is not None else max(0, max_length - input_ids.shape[1])
+        return np.concatenate([input_ids, np.full((input_ids.shape[0], new_tokens), self.token)], axis=1)
+
+
+@pytest.fixture
+def stub_chat_models(monkeypatch):
+    pytest.importorskip("numpy")
+    tokenizer = StubTokenizer()
+    registry = ModelRegistry()
+    registry.register("gpt-neo", lambda: (StubModel(tokenizer), tokenizer))
+    monkeypatch.setattr(chat_engine, "model_registry", registry)
+    monkeypatch.setitem(chat_engine.CONFIG, "CHAT_PREFIX_CACHE", False)
+
+
+def test_batched_short_prompt_keeps_its_full_generation_budget(stub_chat_models):
+    budget = chat_engine.CHAT_GENERATION_SETTINGS["max_new_tokens"]
+    short = "Which berth is free?"
+    long = " ".join(f"detail{i}" for i in range(400))
+
+    alone = chat_engine.generate_chat_batch([short])
+    batched = chat_engine.generate_chat_batch([short, long])
+
+    assert batched[0] == alone[0]
+    for response in batched:
+        assert response.endswith(" more" * budget)
+        assert not response.endswith(" more" * (budget + 1))
+
+
+def test_generation_settings_are_part_of_the_cache_key():
+    key = chat_engine.response_cache.make_key("q", chat_engine.CHAT_MODEL_ID, chat_engine.CHAT_CACHE_SETTINGS)
+    other = chat_engine.response_cache.make_key(
+        "q", chat_engine.CHAT_MODEL_ID, {**chat_engine.CHAT_CACHE_SETTINGS, "max_new_tokens": 1})
+    assert key != other
@@ -0,0 +1,67 @@
+import random
+
+import pytest
+
+from crane_allocation import CraneAllocator, round_robin_makespan
+
+
+def random_fleet(vessels=60, cranes=12, seed=2):
+    rng = random.Random(seed)
+    crane_list = [{"name": f"Crane {i}", "rate": rng.uniform(200, 450), "capacity": rng.choice([40, 50, 65]),
+                   "emissions_per_hour": rng.uniform(20, 120)} for i in range(cranes)]
+    vessel_list = [{"vessel": f"Vessel {j}", "cargo_weight": rng.uniform(2000, 60000),
+                    "max_unit_weight": rng.choice([30, 35, 45, 60])} for j in range(vessels)]
+    return crane_list, vessel_list
+
+
+def assert_feasible(result, cranes, vessels):
+    cranes = {c["name"]: c for c in cranes}
+    hours = dict.fromkeys(cranes, 0.0)
+    assert set(result["allocation"]) == {v["vessel"] for v in vessels}
+    for vessel in vessels:
+        crane = cranes[result["allocation"][vessel["vessel"]]]
+        assert vessel["max_unit_weight"] <= crane["capacity"]
+        hours[crane["name"]] += vessel["cargo_weight"] / crane["rate"]
+    assert result["crane_hours"] == pytest.approx(hours, abs=1e-3)
+    assert result["makespan"] == pytest.approx(max(hours.values()), abs=1e-3)
+    assert result["makespan"] >= result["lower_bound"] - 1e-3
+
+
+def test_allocation_respects_lift_capacity_and_beats_round_robin():
+    cranes, vessels = random_fleet()
+    result = CraneAllocator(cranes).allocate(vessels)
+    assert_feasible(result, cranes, vessels)
+    assert result["makespan"] <= round_robin_makespan(vessels, cranes)
+
+
+def test_emissions_objective_stays_within_the_makespan_allowance():
+    cranes, vessels = random_fleet(seed=5)
+    allocator = CraneAllocator(cranes)
+    fastest = allocator.allocate(vessels)
+    greener = allocator.allocate(vessels, objective="emissions", makespan_slack=0.2)
+    assert_feasible(greener, cranes, vessels)
+    assert greener["makespan"] <= fastest["makespan"] * 1.2 + 1e-3
+    assert greener["emissions_kg"] <= fastest["emissions_kg"] + 1e-6
+
+
+def test_heavy_lifts_only_go_to_cranes_that_can_take_them():
+    cranes = [{"name": "Light", "rate": 1000, "capacity": 30}, {"name": "Heavy", "rate": 100, "capacity": 80}]
+    vessels = [{"vessel": "Project cargo", "cargo_weight": 500, "max_unit_weight": 70},
+               {"vessel": "Boxes", "cargo_weight": 500, "max_unit_weight": 20}]
+    result = CraneAllocator(cranes).allocate(vessels)
+    assert result["allocation"] == {"Project cargo": "Heavy", "Boxes": "Light"}
+    assert result["makespan"] == 5.0
+
+
+def test_invalid_input_is_rejected():
+    with pytest.raises(ValueError):
+        CraneAllocator([])
+    with pytest.raises(ValueError):
+        CraneAllocator([{"name": "Broken", "rate": 0}])
+    allocator = CraneAllocator([{"name": "Light", "rate": 100, "capacity": 30}])
+    with pytest.raises(ValueError, match="No crane can lift"):
+        allocator.allocate([{"vessel": "A", "cargo_weight": 10, "max_unit_weight": 40}])
+    with pytest.raises(ValueError):
+        allocator.allocate([{"vessel": "A", "cargo_weight": -1}])
+    with pytest.raises(ValueError):
+        allocator.allocate([], objective="cost")
@@ -0,0 +1,81 @@
+import csv
+import gzip
+import io
+import json
+import sqlite3
+
+import pytest
+
+from data_export import csv_chunks, export_query, gzip_chunks, iter_chunks, ndjson_chunks
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE operations (id INTEGER PRIMARY KEY, vessel_name TEXT, timestamp TEXT, fuel REAL)")
+    conn.executemany("INSERT INTO operations VALUES (?, ?, ?, ?)", [
+        (1, "Vessel A", "2026-01-01T00:00:00", 50.5),
+        (2, 'Vessel "B", Ltd', "2026-01-02T00:00:00", 60.0),
+        (3, "Vessel\nC", "2026-01-03T00:00:00", None),
+        (4, "Vessel D", "2026-01-04T00:00:00", 80.25),
+    ])
+    yield conn
+    conn.close()
+
+
+def declared_types(conn):
+    return {row[1]: row[2] for row in conn.execute("PRAGMA table_info(operations)")}
+
+
+def export_rows(conn, chunk_size=2, **filters):
+    columns, query, params = export_query("operations", declared_types(conn), **filters)
+    return columns, list(iter_chunks(conn.execute(query, params), chunk_size))
+
+
+def test_csv_quotes_commas_quotes_and_newlines(conn):
+    columns, chunks = export_rows(conn)
+    text = "".join(csv_chunks(columns, chunks))
+    rows = list(csv.reader(io.StringIO(text)))
+    assert rows[0] == ["id", "vessel_name", "timestamp", "fuel"]
+    assert rows[2][1] == 'Vessel "B", Ltd'
+    assert rows[3][1] == "Vessel\nC"
+    assert len(rows) == 5
+
+
+def test_rows_are_read_in_chunks(conn):
+    _, chunks = export_rows(conn, chunk_size=3)
+    assert [len(rows) for rows in chunks] == [3, 1]
+
+
+def test_columns_are_projected_in_the_requested_order(conn):
+    columns, chunks = export_rows(conn, columns=["fuel", "id"])
+    assert columns == ["fuel", "id"]
+    assert chunks[0][0] == (50.5, 1)
+    with pytest.raises(ValueError, match="Unknown columns: draft"):
+        export_query("operations", declared_types(conn), columns=["id", "draft"])
+
+
+def test_id_and_time_ranges_are_inclusive(conn):
+    _, chunks = export_rows(conn, columns=["id"], id_from="2", id_to=3)
+    assert [row for rows in chunks for row in rows] == [(2,), (3,)]
+    _, chunks = export_rows(conn, columns=["id"], since="2026-01-02T00:00:00", until="2026-01-03T00:00:00")
+    assert [row for rows in chunks for row in rows] == [(2,), (3,)]
+    with pytest.raises(ValueError):
+        export_query("operations", declared_types(conn), id_from="two")
+    with pytest.raises(ValueError):
+        export_query("operations", declared_types(conn), since="2026-01-01", time_column="fuel_type")
+
+
+def test_ndjson_emits_one_object_per_row(conn):
+    columns, chunks = export_rows(conn, columns=["id", "fuel"])
+    lines = "".join(ndjson_chunks(columns, chunks)).splitlines()
+    assert [json.loads(line) for line in lines][2] == {"id": 3, "fuel": None}
+    assert len(lines) == 4
+
+
+def test_gzip_output_is_one_valid_stream(conn):
+    columns, chunks = export_rows(conn)
+    plain = "".join(csv_chunks(columns, chunks))
+    columns, chunks = export_rows(conn)
+    compressed = b"".join(gzip_chunks(csv_chunks(columns, chunks)))
+    assert gzip.decompress(compressed).decode("utf-8") == plain
@@ -0,0 +1,59 @@
+import threading
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from db_pool import connect_sqlite, default_pragmas, engine_options
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "vessel_operations.db")
+
+
+def test_connections_get_the_tuned_pragmas(db_path):
+    conn = connect_sqlite(db_path, default_pragmas(cache_mb=32, mmap_mb=128, busy_timeout_ms=2500))
+
+    def pragma(name):
+        return conn.execute(f"PRAGMA {name}").fetchone()[0]
+
+    try:
+        assert pragma("journal_mode") == "wal"
+        assert pragma("synchronous") == 1  # NORMAL
+        assert pragma("cache_size") == -32 * 1024
+        assert pragma("mmap_size") == 128 * 1024 * 1024
+        assert pragma("temp_store") == 2  # MEMORY
+        assert pragma("busy_timeout") == 2500
+        assert pragma("foreign_keys") == 1
+    finally:
+        conn.close()
+
+
+def test_pooled_engine_reuses_tuned_connections(db_path):
+    engine = create_engine("sqlite://", **engine_options(db_path, pool_size=2, max_overflow=0))
+    try:
+        with engine.connect() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            first = conn.connection.dbapi_connection
+        with engine.connect() as conn:
+            assert conn.connection.dbapi_connection is first
+        # Raw connections come from the same pool and may be used from another thread
+        raw = engine.raw_connection()
+        try:
+            errors = []
+
+            def use():
+                try:
+                    raw.execute("SELECT 1")
+                except Exception as e:
+                    errors.append(e)
+
+            thread = threading.Thread(target=use)
+            thread.start()
+            thread.join()
+            assert not errors
+            assert raw.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+        finally:
+            raw.close()
+    finally:
+        engine.dispose()
@@ -0,0 +1,48 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from emissions import FUEL_TYPES, compute_fleet_emissions, fleet_emissions_loop
+
+
+@pytest.fixture
+def fleet():
+    rng = np.random.default_rng(3)
+    fuel = rng.uniform(50, 100, size=(40, 24))
+    fuel_types = rng.choice(list(FUEL_TYPES), size=40)
+    return fuel, fuel_types
+
+
+@pytest.mark.parametrize("unit", ["kg", "litres"])
+def test_vectorized_totals_match_the_loop(fleet, unit):
+    fuel, fuel_types = fleet
+    result = compute_fleet_emissions(fuel, fuel_types, unit=unit)
+    reference = fleet_emissions_loop(fuel.tolist(), fuel_types.tolist(), unit=unit)
+    for key in ("fuel_kg", "co2_kg", "sox_kg", "nox_kg"):
+        assert np.allclose(result[key], [reference[v][key] for v in range(len(fuel))])
+        assert result["fleet"][key] == pytest.approx(sum(totals[key] for totals in reference.values()))
+    assert np.allclose(result["fleet_co2_kg_by_step"].sum(), result["fleet"]["co2_kg"])
+    assert result["fleet"]["vessels"] == 40 and result["fleet"]["steps"] == 24
+
+
+def test_single_step_and_lowercase_fuel_types():
+    result = compute_fleet_emissions([100.0, 100.0], ["hfo", "lng"])
+    assert result["co2_kg"].tolist() == pytest.approx([311.4, 275.0])
+    assert result["sox_kg"][1] == 0.0
+    assert result["fleet"]["steps"] == 1
+
+
+def test_carbon_intensity_is_per_dwt_mile():
+    result = compute_fleet_emissions([[1000.0], [1000.0]], ["MGO", "MGO"],
+                                     distance_nm=[100.0, 0.0], capacity_dwt=[50_000, 50_000])
+    assert result["cii"][0] == pytest.approx(3206.0 * 1000 / (100 * 50_000))
+    assert np.isnan(result["cii"][1])
+
+
+def test_bad_input_is_rejected():
+    with pytest.raises(ValueError, match="Unknown fuel types"):
+        compute_fleet_emissions([1.0], ["COAL"])
+    with pytest.raises(ValueError):
+        compute_fleet_emissions([1.0, 2.0], ["HFO"])
+    with pytest.raises(ValueError):
+        compute_fleet_emissions([1.0], ["HFO"], unit="tonnes")
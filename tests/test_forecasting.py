@@ -0,0 +1,89 @@
+import sqlite3
+
+import pytest
+
+from forecasting import RunningStatsForecaster
+from migrations import apply_migrations
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "forecast.db")
+    conn = sqlite3.connect(path)
+    apply_migrations(conn)
+    conn.close()
+    return path
+
+
+def execute(db_path, sql, rows=None):
+    conn = sqlite3.connect(db_path)
+    try:
+        with conn:
+            if rows is None:
+                conn.execute(sql)
+            else:
+                conn.executemany(sql, rows)
+    finally:
+        conn.close()
+
+
+def stats(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return {(t, d, b): (n, round(total, 6), round(total_sq, 6)) for t, d, b, n, total, total_sq in
+                conn.execute("SELECT target, dimension, bucket, n, total, total_sq FROM forecast_stats WHERE n > 0")}
+    finally:
+        conn.close()
+
+
+def test_triggers_keep_the_statistics_equal_to_the_history(db_path):
+    execute(db_path, "INSERT INTO operations (shipment_name, route, weather, delay_hours) VALUES (?, ?, ?, ?)", [
+        ("S1", "Asia-Europe", "Storm", 10.0),
+        ("S2", " asia-europe ", "storm", 14.0),
+        ("S3", "Asia-Europe", "Clear", 2.0),
+        ("S4", None, "Clear", 4.0),
+    ])
+    execute(db_path, "UPDATE operations SET delay_hours = 6.0 WHERE shipment_name = 'S3'")
+    execute(db_path, "DELETE FROM operations WHERE shipment_name = 'S4'")
+    current = stats(db_path)
+    assert current[("delay", "all", "*")] == (3, 30.0, 332.0)
+    assert current[("delay", "route", "asia-europe")] == (3, 30.0, 332.0)
+    assert current[("delay", "weather", "storm")] == (2, 24.0, 296.0)
+    assert current[("delay", "route_weather", "asia-europe|clear")] == (1, 6.0, 36.0)
+    assert ("delay", "weather", "clear") in current and current[("delay", "weather", "clear")][0] == 1
+
+
+def test_sparse_buckets_are_shrunk_towards_their_parent(db_path):
+    execute(db_path, "INSERT INTO voyages (vessel_name, route, weather, fuel_consumption) VALUES (?, ?, ?, ?)",
+            [("V", "Common", "Clear", 100.0)] * 20 + [("V", "Rare", "Clear", 200.0)])
+    forecaster = RunningStatsForecaster(lambda: sqlite3.connect(db_path), prior_weight=5)
+    overall_mean = (20 * 100.0 + 200.0) / 21
+    rare = forecaster.predict("fuel", route="rare")
+    assert rare["basis"] == "route"
+    assert overall_mean < rare["prediction"] < 200.0
+    common = forecaster.predict("fuel", route="Common", weather="clear")
+    assert common["basis"] == "route_weather"
+    assert common["prediction"] == pytest.approx(100.0, abs=1.0)
+    assert common["std"] == 0.0 and common["samples"] == 20
+    unknown = forecaster.predict("fuel", route="Nowhere")
+    assert unknown["basis"] == "all" and unknown["prediction"] == pytest.approx(overall_mean, abs=1e-3)
+
+
+def test_no_history_and_unknown_targets(db_path):
+    forecaster = RunningStatsForecaster(lambda: sqlite3.connect(db_path))
+    assert forecaster.predict("delay")["prediction"] is None
+    with pytest.raises(ValueError):
+        forecaster.predict("speed")
+
+
+def test_statistics_reload_only_when_the_version_changes(db_path):
+    version = [0]
+    forecaster = RunningStatsForecaster(lambda: sqlite3.connect(db_path), version=lambda: version[0], ttl_seconds=60)
+    assert forecaster.predict("delay")["prediction"] is None
+    execute(db_path, "INSERT INTO operations (route, weather, delay_hours) VALUES ('R', 'W', 5.0)")
+    assert forecaster.predict("delay")["prediction"] is None  # still the cached snapshot
+    version[0] += 1
+    assert forecaster.predict("delay")["prediction"] == 5.0
+    results = forecaster.score_batch("delay", [{"shipment_name": "S", "location": "R"}, {"route": "R", "weather": "W"}])
+    assert [r["prediction"] for r in results] == [5.0, 5.0] and results[0]["shipment_name"] == "S"
+    assert forecaster.reloads == 2
@@ -0,0 +1,102 @@
+import os
+import stat
+import sys
+import threading
+import time
+from multiprocessing import AuthenticationError
+
+import pytest
+
+from inference_service import (InferenceClient, InferenceServer, InferenceServiceBusy, is_local_address,
+                               parse_address, service_authkey)
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="uses a Unix socket")
+
+AUTHKEY = b"test-key"
+
+
+def start_server(address, chat_fn=None, stream_fn=None, max_pending=4):
+    server = InferenceServer(
+        address, AUTHKEY,
+        chat_fn=chat_fn or (lambda prompt, speculative=None: prompt.upper()),
+        stream_fn=stream_fn or (lambda prompt, speculative=None: iter(prompt.split())),
+        max_pending=max_pending)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    deadline = time.time() + 5
+    while not os.path.exists(address):
+        assert time.time() < deadline, "inference server did not start"
+        time.sleep(0.01)
+    return server
+
+
+@pytest.fixture
+def address(tmp_path):
+    return str(tmp_path / "inference.sock")
+
+
+def test_addresses_are_parsed_and_classified():
+    assert parse_address("127.0.0.1:6001") == ("127.0.0.1", 6001)
+    assert parse_address(":6001") == ("127.0.0.1", 6001)
+    assert parse_address("/run/inference.sock") == "/run/inference.sock"
+    assert is_local_address(("127.0.0.1", 6001)) and is_local_address("/run/inference.sock")
+    assert not is_local_address(("0.0.0.0", 6001))
+
+
+def test_authkey_is_required_off_loopback_and_shared_through_the_key_file(tmp_path, monkeypatch):
+    monkeypatch.delenv("INFERENCE_SERVICE_AUTHKEY", raising=False)
+    path = tmp_path / "inference_service.key"
+    monkeypatch.setenv("INFERENCE_SERVICE_AUTHKEY_FILE", str(path))
+    with pytest.raises(RuntimeError):
+        service_authkey(("10.0.0.5", 6001))
+    key = service_authkey(("127.0.0.1", 6001))
+    assert len(key) == 64 and service_authkey(("127.0.0.1", 6001)) == key
+    assert stat.S_IMODE(path.stat().st_mode) == 0o600
+    monkeypatch.setenv("INFERENCE_SERVICE_AUTHKEY", "from-env")
+    assert service_authkey(("10.0.0.5", 6001)) == b"from-env"
+
+
+def test_chat_and_stream_round_trip(address):
+    start_server(address)
+    client = InferenceClient(address, AUTHKEY, timeout=5)
+    assert client.chat("ship ahoy") == "SHIP AHOY"
+    assert list(client.stream("ship ahoy")) == ["ship", "ahoy"]
+    # Both calls reused the same pooled connection
+    assert client._pool.qsize() == 1
+
+
+def test_wrong_authkey_is_rejected(address):
+    start_server(address)
+    with pytest.raises(AuthenticationError):
+        InferenceClient(address, b"wrong-key", timeout=5).chat("hello")
+    # The server keeps serving other clients
+    assert InferenceClient(address, AUTHKEY, timeout=5).chat("hello") == "HELLO"
+
+
+def test_requests_over_max_pending_get_a_busy_reply(address):
+    started, release = threading.Event(), threading.Event()
+
+    def slow_chat(prompt, speculative=None):
+        started.set()
+        release.wait(5)
+        return prompt
+
+    start_server(address, chat_fn=slow_chat, max_pending=1)
+    first = threading.Thread(target=InferenceClient(address, AUTHKEY, timeout=5).chat, args=("first",))
+    first.start()
+    assert started.wait(5)
+    client = InferenceClient(address, AUTHKEY, timeout=5)
+    with pytest.raises(InferenceServiceBusy):
+        client.chat("second")
+    release.set()
+    first.join(5)
+    # The busy reply left the connection usable
+    assert client.chat("third") == "third"
+
+
+def test_stale_pooled_connection_is_replaced(address):
+    start_server(address)
+    client = InferenceClient(address, AUTHKEY, timeout=5)
+    assert client.chat("before") == "BEFORE"
+    # Simulate a connection the service dropped while it sat in the pool
+    client._pool.queue[0].close()
+    assert client.chat("after") == "AFTER"
@@ -0,0 +1,63 @@
+import pytest
+from sqlalchemy import Column, Integer, String, create_engine
+from sqlalchemy.orm import Session, declarative_base
+
+from keyset import decode_cursor, encode_cursor, fetch_page
+
+Base = declarative_base()
+
+
+class Vessel(Base):
+    __tablename__ = "vessels"
+    id = Column(Integer, primary_key=True)
+    name = Column(String)
+    status = Column(String)
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        # Ids with gaps, as left behind by deletes
+        session.add_all(Vessel(id=vessel_id, name=f"Vessel {vessel_id}", status="At Sea" if vessel_id % 2 else "Docked")
+                        for vessel_id in (1, 2, 4, 7, 8, 11, 15))
+        session.commit()
+        yield session
+    engine.dispose()
+
+
+def test_cursor_round_trips_and_rejects_garbage():
+    token = encode_cursor(12345)
+    assert "=" not in token
+    assert decode_cursor(token) == 12345
+    for bad in ("not-a-cursor", encode_cursor("abc"), "e30"):  # e30 is "{}"
+        with pytest.raises(ValueError):
+            decode_cursor(bad)
+
+
+def test_pages_cover_every_row_once_in_id_order(session):
+    query = session.query(Vessel.id, Vessel.name)
+    seen, cursor, pages = [], None, 0
+    while True:
+        rows, cursor = fetch_page(query, Vessel.id, 3, cursor)
+        seen.extend(row[0] for row in rows)
+        pages += 1
+        if cursor is None:
+            break
+    assert seen == [1, 2, 4, 7, 8, 11, 15]
+    assert pages == 3
+
+
+def test_last_full_page_has_no_next_cursor(session):
+    rows, cursor = fetch_page(session.query(Vessel.id), Vessel.id, 7)
+    assert len(rows) == 7 and cursor is None
+
+
+def test_filters_apply_across_pages(session):
+    query = session.query(Vessel.id).filter(Vessel.status == "At Sea")
+    rows, cursor = fetch_page(query, Vessel.id, 2)
+    assert [row[0] for row in rows] == [1, 7]
+    rows, cursor = fetch_page(query, Vessel.id, 2, cursor)
+    assert [row[0] for row in rows] == [11, 15]
+    assert cursor is None
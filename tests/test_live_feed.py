@@ -0,0 +1,124 @@
+import threading
+
+import pytest
+
+pytest.importorskip("requests")
+
+from live_feed import LiveFeedClient, MockFeedServer, diff_vessels, normalize_vessel
+
+
+def make_records(regions, per_region):
+    return {
+        region: [{"shipname": f"{region} {i}", "destination": "Port X", "nav_status": "Moored"} for i in range(per_region)]
+        for region in regions
+    }
+
+
+@pytest.fixture
+def feed():
+    server = MockFeedServer(make_records(["north", "south", "east"], 250), fail_first=2)
+    url = server.start()
+    yield server, url
+    server.stop()
+
+
+def test_fetches_every_page_of_every_region_after_retries(feed):
+    server, url = feed
+    client = LiveFeedClient(url, regions=["north", "south", "east"], page_size=100, backoff=0.01)
+    records, changed = client.fetch_all()
+    client.close()
+
+    assert changed
+    assert len(records) == 750
+    assert {normalize_vessel(r)["name"] for r in records} == {f"{region} {i}" for region in ("north", "south", "east") for i in range(250)}
+    assert client.last_stats["pages"] == 9
+
+
+def test_unchanged_feed_is_served_from_304_responses(feed):
+    server, url = feed
+    client = LiveFeedClient(url, regions=["north", "south", "east"], page_size=100, backoff=0.01)
+    first, _ = client.fetch_all()
+    records, changed = client.fetch_all()
+    client.close()
+
+    assert not changed
+    assert records == first
+    assert server.not_modified == 9
+
+    server.set_records(make_records(["north", "south", "east"], 260))
+    client = LiveFeedClient(url, regions=["north"], page_size=100, backoff=0.01)
+    records, changed = client.fetch_all()
+    client.close()
+    assert changed and len(records) == 260
+
+
+def test_304_without_a_cached_page_is_refetched(feed):
+    server, url = feed
+    warm = LiveFeedClient(url, regions=["north"], page_size=1000, backoff=0.01)
+    warm.fetch_all()
+    etag = warm._pages[("north", 1)][0]
+    warm.close()
+
+    # A fresh client whose requests carry a stale validator it has no page for
+    client = LiveFeedClient(url, regions=["north"], page_size=1000, backoff=0.01)
+    client.session.headers["If-None-Match"] = etag
+    records, changed = client.fetch_all()
+    client.close()
+
+    assert changed
+    assert len(records) == 250
+
+
+def test_concurrent_requests_stay_within_max_workers():
+    server = MockFeedServer(make_records([f"r{i}" for i in range(6)], 500))
+    url = server.start()
+    client = LiveFeedClient(url, regions=[f"r{i}" for i in range(6)], max_workers=3, page_size=50)
+    in_flight, peak, lock = [0], [0], threading.Lock()
+    original_get = client.session.get
+
+    def counting_get(*args, **kwargs):
+        with lock:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+        try:
+            return original_get(*args, **kwargs)
+        finally:
+            with lock:
+                in_flight[0] -= 1
+
+    client.session.get = counting_get
+    records, _ = client.fetch_all()
+    client.close()
+    server.stop()
+
+    assert len(records) == 3000
+    assert peak[0] <= 3
+
+
+def test_vessel_diff_counts_only_real_changes():
+    current = [
+        (1, "Vessel A", "Port X", "At Sea"),
+        (2, "Vessel B", "Port Y", "Docked"),
+        (3, "Vessel C", "Port Z", "At Sea"),
+        (4, "Vessel A", "Port X", "At Sea"),  # duplicate of id 1
+    ]
+    feed = [
+        {"name": "Vessel A", "destination": "Port X", "status": "At Sea"},
+        {"name": "Vessel B", "destination": "Port Y", "status": "Docked"},
+        {"name": "Vessel B", "destination": "Port Z", "status": "At Sea"},  # later entry wins
+        {"name": "Vessel D", "destination": "Port X", "status": "Moored"},
+        {"name": "", "destination": "Port X", "status": "Moored"},
+    ]
+    changes = diff_vessels(current, feed)
+    assert changes["inserts"] == [{"name": "Vessel D", "destination": "Port X", "status": "Moored"}]
+    assert changes["updates"] == [{"id": 2, "destination": "Port Z", "status": "At Sea"}]
+    assert sorted(changes["delete_ids"]) == [3, 4]
+    assert changes["unchanged"] == 1
+
+
+def test_unchanged_feed_produces_no_writes():
+    current = [(1, "Vessel A", "Port X", "At Sea"), (2, "Vessel B", "Port Y", "Docked")]
+    feed = [{"name": name, "destination": destination, "status": status} for _, name, destination, status in current]
+    changes = diff_vessels(current, feed)
+    assert not changes["inserts"] and not changes["updates"] and not changes["delete_ids"]
+    assert changes["unchanged"] == 2
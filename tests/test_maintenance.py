@@ -0,0 +1,61 @@
+import sqlite3
+import time
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from maintenance import get_score, record_service, refresh_scores
+from migrations import apply_migrations
+
+DAY = 86400
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    apply_migrations(conn)
+    today = int(time.time() // DAY) * DAY
+    for vessel, load in (("Vessel A", 80.0), ("Vessel B", 120.0)):
+        conn.executemany("INSERT INTO telemetry_rollup VALUES (86400, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                         ((vessel, today - day * DAY, 288, load * 288, load * 0.7, load * 1.6, load * 288 * 2.68, 0.0, 0.0)
+                          for day in range(1, 31)))
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def test_refresh_scores_every_vessel_with_telemetry(conn):
+    stats = refresh_scores(conn)
+    assert stats["vessels"] == 2
+    score = get_score(conn, "Vessel A")
+    assert score["operating_hours"] == pytest.approx(30 * 24)
+    assert score["risk"] == "low"
+
+
+def test_service_without_new_telemetry_removes_the_stale_score(conn):
+    refresh_scores(conn)
+    record_service(conn, "Vessel A", notes="Main engine overhaul")
+    stats = refresh_scores(conn)
+    assert stats["vessels"] == 1
+    assert get_score(conn, "Vessel A") is None
+    assert get_score(conn, "Vessel B") is not None
+
+
+def test_hours_are_counted_from_the_last_service(conn):
+    ten_days_ago = time.time() - 10 * DAY
+    record_service(conn, "Vessel B", ten_days_ago)
+    refresh_scores(conn)
+    assert get_score(conn, "Vessel B")["operating_hours"] < get_score(conn, "Vessel A")["operating_hours"]
+
+
+def test_record_service_validates_its_input(conn):
+    with pytest.raises(ValueError):
+        record_service(conn, "")
+    with pytest.raises(ValueError):
+        record_service(conn, "Vessel A", time.time() + DAY)
+    with pytest.raises(ValueError):
+        record_service(conn, "Vessel A", "not a date")
+    row = record_service(conn, "Vessel A", "2026-01-05T08:00:00Z")
+    assert conn.execute("SELECT vessel_name, performed_at FROM maintenance_log WHERE id = ?",
+                        (row["id"],)).fetchone() == ("Vessel A", row["performed_at"])
@@ -0,0 +1,88 @@
+import sqlite3
+
+import pytest
+
+import metrics
+from metrics import Registry, TimedConnection, finish_request, timed_connection, track_request
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, value REAL)")
+    conn.executemany("INSERT INTO t (value) VALUES (?)", ((i * 0.5,) for i in range(10)))
+    yield conn
+    finish_request()
+    conn.close()
+
+
+def histogram_count(histogram, *labels):
+    for name, label_text, value in histogram.samples():
+        if name.endswith("_count") and all(f'"{label}"' in label_text for label in labels):
+            return value
+    return 0
+
+
+def test_raw_connections_are_only_wrapped_while_timing_is_wanted(conn):
+    assert timed_connection(conn) is conn
+    track_request()
+    assert isinstance(timed_connection(conn), TimedConnection)
+
+
+def test_tracked_request_counts_raw_statements(conn):
+    track_request()
+    timed = timed_connection(conn)
+    assert timed.execute("SELECT value FROM t WHERE id = ?", (3,)).fetchone() == (1.0,)
+    cursor = timed.cursor().execute("SELECT COUNT(*) FROM t")
+    assert cursor.fetchone() == (10,)
+    assert [row[0] for row in timed.cursor().execute("SELECT id FROM t WHERE id <= 2")] == [1, 2]
+    queries, seconds = finish_request()
+    assert queries == 3
+    assert seconds > 0
+
+
+def test_statement_histogram_is_separate_from_request_tracking(conn, monkeypatch):
+    before = histogram_count(metrics.db_query_seconds, "select")
+    TimedConnection(conn).execute("SELECT 1")
+    assert histogram_count(metrics.db_query_seconds, "select") == before
+    monkeypatch.setattr(metrics, "_record_statements", True)
+    TimedConnection(conn).execute("SELECT 1")
+    assert histogram_count(metrics.db_query_seconds, "select") == before + 1
+
+
+def test_failed_statements_are_counted(conn):
+    track_request()
+    with pytest.raises(sqlite3.OperationalError):
+        timed_connection(conn).execute("SELECT missing FROM t")
+    assert any('statement="select"' in labels and value >= 1 for _, labels, value in metrics.db_query_errors.samples())
+
+
+def test_engine_queries_are_timed_once_by_events():
+    sqlalchemy = pytest.importorskip("sqlalchemy")
+    from sqlalchemy.pool import StaticPool
+
+    engine = sqlalchemy.create_engine("sqlite://", creator=lambda: sqlite3.connect(":memory:", check_same_thread=False),
+                                      poolclass=StaticPool)
+    metrics.instrument_engine(engine)
+    with engine.connect() as conn:
+        conn.execute(sqlalchemy.text("SELECT 1")).fetchone()
+        track_request()
+        for _ in range(4):
+            conn.execute(sqlalchemy.text("SELECT 1")).fetchone()
+        queries, _ = finish_request()
+    engine.dispose()
+    assert queries == 4
+
+
+def test_render_writes_prometheus_text_format():
+    registry = Registry(prefix="test_")
+    requests = registry.counter("requests_total", "Requests.", ("route",))
+    latency = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1))
+    requests.inc(2, '/api/"x"')
+    latency.observe(0.5)
+    text = registry.render()
+    assert '# TYPE test_requests_total counter' in text
+    assert 'test_requests_total{route="/api/\\"x\\""} 2' in text
+    assert 'test_latency_seconds_bucket{le="0.1"} 0' in text
+    assert 'test_latency_seconds_bucket{le="+Inf"} 1' in text
+    assert 'test_latency_seconds_count 1' in text
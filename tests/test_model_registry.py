@@ -0,0 +1,110 @@
+import threading
+
+import pytest
+
+from model_registry import ModelRegistry
+
+MB = 1024 * 1024
+
+
+class FakeTensor:
+    def __init__(self, size_mb):
+        self.size_mb = size_mb
+
+    def numel(self):
+        return int(self.size_mb * MB)
+
+    def element_size(self):
+        return 1
+
+
+class FakeModel:
+    def __init__(self, size_mb):
+        self.weights = [FakeTensor(size_mb)]
+
+    def parameters(self):
+        return self.weights
+
+
+def counting_loader(size_mb, loads, name):
+    def load():
+        loads.append(name)
+        return FakeModel(size_mb)
+    return load
+
+
+def test_models_load_once_on_first_use():
+    loads = []
+    registry = ModelRegistry()
+    registry.register("a", counting_loader(10, loads, "a"))
+    assert not registry.is_loaded("a")
+    assert registry.get("a") is registry.get("a")
+    assert loads == ["a"]
+    stats = registry.stats()["models"]["a"]
+    assert stats["loads"] == 1 and stats["hits"] == 1 and stats["size_mb"] == 10
+    with pytest.raises(KeyError):
+        registry.get("missing")
+
+
+def test_concurrent_callers_share_a_single_load():
+    loads = []
+    release = threading.Event()
+
+    def slow_load():
+        release.wait(5)
+        loads.append("a")
+        return FakeModel(1)
+
+    registry = ModelRegistry()
+    registry.register("a", slow_load)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get("a"))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert loads == ["a"]
+    assert len(results) == 4 and all(result is results[0] for result in results)
+
+
+def test_least_recently_used_model_is_evicted_over_budget():
+    loads = []
+    registry = ModelRegistry(memory_budget_mb=25)
+    for name in ("a", "b", "c"):
+        registry.register(name, counting_loader(10, loads, name))
+    registry.get("a")
+    registry.get("b")
+    registry.get("a")  # b is now the least recently used
+    registry.get("c")
+    assert registry.is_loaded("a") and registry.is_loaded("c")
+    assert not registry.is_loaded("b")
+    assert registry.stats()["models"]["b"]["evictions"] == 1
+    assert registry.resident_mb() == 20
+
+
+def test_dependents_are_dropped_with_their_model():
+    loads = []
+    registry = ModelRegistry()
+    registry.register("model", counting_loader(10, loads, "model"))
+    registry.register("prefix", counting_loader(1, loads, "prefix"), depends_on=("model",))
+    registry.get("model")
+    registry.get("prefix")
+    assert registry.unload("model")
+    assert not registry.is_loaded("model") and not registry.is_loaded("prefix")
+    assert not registry.unload("model")
+
+
+def test_eviction_keeps_what_the_new_model_is_built_from():
+    loads = []
+    registry = ModelRegistry(memory_budget_mb=10.5)
+    registry.register("model", counting_loader(10, loads, "model"))
+    registry.register("other", counting_loader(10, loads, "other"))
+    registry.register("prefix", counting_loader(1, loads, "prefix"), depends_on=("model",))
+    registry.get("model")
+    registry.get("prefix")  # over budget, but the model it was built from must stay
+    assert registry.is_loaded("model") and registry.is_loaded("prefix")
+    # Evicting the model for another one takes its dependent with it
+    registry.get("other")
+    assert not registry.is_loaded("model") and not registry.is_loaded("prefix")
+    assert registry.stats()["models"]["prefix"]["evictions"] == 1
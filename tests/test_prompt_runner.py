@@ -0,0 +1,76 @@
+import json
+import time
+import urllib.error
+
+import pytest
+
+from prompt_runner import RateLimiter, StubCompletionServer, http_completion, is_retryable, run_batch
+
+PROMPTS = [f"Question {i}: which berth is free?" for i in range(40)]
+
+
+def read_results(path):
+    with open(path, encoding="utf-8") as file:
+        return [json.loads(line) for line in file]
+
+
+def test_run_batch_completes_every_row_against_the_stub(tmp_path):
+    output = str(tmp_path / "results.jsonl")
+    with StubCompletionServer(latency_seconds=0.01, seed=1) as server:
+        report = run_batch(PROMPTS, http_completion(server.url), output, concurrency=16)
+        assert server.requests == len(PROMPTS)
+    assert (report["succeeded"], report["failed"], report["skipped"]) == (len(PROMPTS), 0, 0)
+    # A queued connection that overflowed the listen backlog would show up as a ~1 s stall
+    assert report["latency_ms"]["max"] < 500
+    results = read_results(output)
+    assert sorted(result["row"] for result in results) == list(range(len(PROMPTS)))
+    assert all(result["response"].startswith("Stub answer to:") for result in results)
+
+
+def test_rerun_resumes_from_the_checkpoint(tmp_path):
+    output = str(tmp_path / "results.jsonl")
+    with StubCompletionServer(latency_seconds=0.0, seed=2) as server:
+        complete = http_completion(server.url)
+        run_batch(PROMPTS[:15], complete, output, concurrency=4)
+        report = run_batch(PROMPTS, complete, output, concurrency=4)
+        assert server.requests == len(PROMPTS)
+    assert (report["skipped"], report["succeeded"]) == (15, len(PROMPTS) - 15)
+    assert len(read_results(output)) == len(PROMPTS)
+
+
+def test_server_errors_are_retried(tmp_path):
+    output = str(tmp_path / "results.jsonl")
+    with StubCompletionServer(latency_seconds=0.0, failure_rate=0.3, seed=3) as server:
+        report = run_batch(PROMPTS, http_completion(server.url), output, concurrency=8,
+                           max_retries=10, backoff_seconds=0.001)
+        assert server.failures > 0
+    assert report["succeeded"] == len(PROMPTS)
+    assert report["retries"] == server.failures
+
+
+def test_client_errors_are_not_retried_or_checkpointed(tmp_path):
+    output = str(tmp_path / "results.jsonl")
+    with StubCompletionServer(latency_seconds=0.0) as server:
+        report = run_batch(PROMPTS[:5], http_completion(server.url + "/missing"), output, backoff_seconds=0.001)
+        assert server.requests == 5
+    assert (report["failed"], report["retries"]) == (5, 0)
+    assert all(result["status"] == "error" and result["attempts"] == 1 for result in read_results(output))
+    assert (tmp_path / "results.jsonl.checkpoint").read_text() == ""
+
+
+def test_is_retryable_only_skips_client_errors():
+    def http_error(code):
+        return urllib.error.HTTPError("http://stub", code, "error", {}, None)
+
+    assert not is_retryable(http_error(400))
+    assert is_retryable(http_error(429))
+    assert is_retryable(http_error(503))
+    assert is_retryable(TimeoutError())
+
+
+def test_rate_limiter_caps_requests_per_second():
+    limiter = RateLimiter(rate_per_second=50, burst=1)
+    started = time.monotonic()
+    for _ in range(11):
+        limiter.acquire()
+    assert time.monotonic() - started == pytest.approx(0.2, abs=0.1)
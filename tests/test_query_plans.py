@@ -0,0 +1,52 @@
+import sqlite3
+
+import pytest
+
+from migrations import API_QUERIES, MIGRATIONS, apply_migrations, check_query_plans, explain_query_plan, schema_version
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    apply_migrations(conn)
+    yield conn
+    conn.close()
+
+
+def populate(conn, rows=2000):
+    conn.executemany("INSERT INTO vessel (name, destination, status) VALUES (?, ?, ?)",
+                     ((f"Vessel {i}", f"Port {i % 40}", ("Docked", "At Sea", "Anchored")[i % 3]) for i in range(rows)))
+    conn.executemany("INSERT INTO logistics (shipment_name, location, delay) VALUES (?, ?, ?)",
+                     ((f"Shipment {i}", f"Port {i % 40}", i % 72) for i in range(rows)))
+    conn.executemany("INSERT INTO sustainability (vessel_name, fuel_consumption, emissions) VALUES (?, ?, ?)",
+                     ((f"Vessel {i % (rows // 2)}", 100.0 + i % 50, 300.0 + i % 80) for i in range(rows)))
+    conn.commit()
+    conn.execute("ANALYZE")
+
+
+def test_migrations_reach_latest_version_and_are_idempotent(conn):
+    latest = MIGRATIONS[-1][0]
+    assert schema_version(conn) == latest
+    assert apply_migrations(conn) == latest
+
+
+@pytest.mark.parametrize("name", sorted(API_QUERIES))
+def test_api_query_uses_its_index(conn, name):
+    sql, params, index = API_QUERIES[name]
+    plan = explain_query_plan(conn, sql, params)
+    assert any(index in line for line in plan), plan
+    assert not any(line.startswith("SCAN") and "INDEX" not in line for line in plan), plan
+
+
+@pytest.mark.parametrize("name", sorted(API_QUERIES))
+def test_api_query_uses_its_index_with_table_statistics(conn, name):
+    populate(conn)
+    sql, params, index = API_QUERIES[name]
+    plan = explain_query_plan(conn, sql, params)
+    assert any(index in line for line in plan), plan
+
+
+def test_check_query_plans_reports_a_missing_index(conn):
+    conn.execute("DROP INDEX ix_vessel_name")
+    with pytest.raises(AssertionError, match="vessel_by_name"):
+        check_query_plans(conn, {"vessel_by_name": API_QUERIES["vessel_by_name"]})
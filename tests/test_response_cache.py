@@ -0,0 +1,66 @@
+from types import SimpleNamespace
+
+import pytest
+
+import response_cache
+from response_cache import ResponseCache, normalize_prompt
+
+SETTINGS = {"max_new_tokens": 64, "num_return_sequences": 1}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(response_cache, "time", SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+def test_trivially_different_prompts_share_a_key():
+    assert normalize_prompt("  What is a   Shipping label?? ") == "what is a shipping label"
+    key = ResponseCache.make_key("What is a shipping label?", "gpt-neo", SETTINGS)
+    assert ResponseCache.make_key("what is a  shipping label", "gpt-neo", SETTINGS) == key
+    assert ResponseCache.make_key("What is a shipping label?", "gpt2", SETTINGS) != key
+    assert ResponseCache.make_key("What is a shipping label?", "gpt-neo", {**SETTINGS, "max_new_tokens": 32}) != key
+    assert ResponseCache.make_key("What is a bill of lading?", "gpt-neo", SETTINGS) != key
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = ResponseCache(ttl_seconds=60)
+    cache.set("k", "answer")
+    clock[0] += 59
+    assert cache.get("k") == "answer"
+    clock[0] += 2
+    assert cache.get("k") is None
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["expired"] == 1 and stats["misses"] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_entries=2, ttl_seconds=0)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"
+    cache.set("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1" and cache.get("c") == "3"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_sqlite_tier_survives_a_restart(tmp_path, clock):
+    path = str(tmp_path / "response_cache.db")
+    ResponseCache(sqlite_path=path, ttl_seconds=60).set("k", "answer")
+    restarted = ResponseCache(sqlite_path=path, ttl_seconds=60)
+    assert restarted.get("k") == "answer"
+    assert restarted.stats()["persistent_hits"] == 1
+    # Promoted to memory, so the next lookup does not touch SQLite
+    assert restarted.get("k") == "answer"
+    assert restarted.stats()["hits"] == 1
+
+
+def test_expired_sqlite_entries_are_deleted(tmp_path, clock):
+    path = str(tmp_path / "response_cache.db")
+    ResponseCache(sqlite_path=path, ttl_seconds=60).set("k", "answer")
+    clock[0] += 61
+    restarted = ResponseCache(sqlite_path=path, ttl_seconds=60)
+    assert restarted.get("k") is None
+    assert restarted._conn.execute("SELECT COUNT(*) FROM response_cache").fetchone()[0] == 0
@@ -0,0 +1,45 @@
+import random
+
+import pytest
+
+from route_engine import METRICS, SAMPLE_NETWORK, VESSEL_CLASSES, RouteEngine, RouteGraph, build_grid_graph
+
+COST_KEYS = {"distance": "distance_nm", "time": "hours", "fuel": "fuel_t"}
+
+
+@pytest.fixture(scope="module")
+def grid():
+    return build_grid_graph(40, 30)
+
+
+def test_landmark_bounds_give_the_same_costs_as_plain_search(grid):
+    with_landmarks, plain = RouteEngine(grid, landmarks=6), RouteEngine(grid, landmarks=0)
+    rng = random.Random(3)
+    for _ in range(150):
+        origin, destination = rng.choice(grid.names), rng.choice(grid.names)
+        vessel_class, metric = rng.choice(list(VESSEL_CLASSES)), rng.choice(METRICS)
+        fast = with_landmarks.route(origin, destination, vessel_class, metric)
+        slow = plain.route(origin, destination, vessel_class, metric)
+        assert (fast is None) == (slow is None)
+        if fast:
+            assert fast[COST_KEYS[metric]] == pytest.approx(slow[COST_KEYS[metric]], abs=0.011)
+
+
+def test_landmarks_expand_fewer_nodes_for_restricted_drafts(grid):
+    with_landmarks, plain = RouteEngine(grid, landmarks=6), RouteEngine(grid, landmarks=0)
+    rng = random.Random(5)
+    pairs = [(rng.choice(grid.names), rng.choice(grid.names)) for _ in range(50)]
+
+    def expanded(engine):
+        routes = [engine.route(origin, destination, "post_panamax") for origin, destination in pairs]
+        return sum(route["expanded_nodes"] for route in routes if route)
+
+    assert expanded(with_landmarks) < expanded(plain)
+
+
+def test_deep_draft_routes_avoid_shallow_lanes():
+    engine = RouteEngine(RouteGraph.from_dict(SAMPLE_NETWORK))
+    route = engine.route("Singapore", "Rotterdam", "vlcc")
+    assert "Suez Canal" not in route["path"]
+    assert route["path"][:2] == ["Singapore", "Cape of Good Hope"]
+    assert set(engine.stats()["landmarks"]) == set(VESSEL_CLASSES)
@@ -0,0 +1,100 @@
+import os
+import sqlite3
+import subprocess
+import sys
+
+import pytest
+
+from migrations import apply_migrations
+from telemetry import TelemetryStore, acquire_process_lock, pick_resolution, to_timestamp
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_sampler_lock_is_held_by_one_process_only(tmp_path):
+    path = str(tmp_path / "telemetry_sampler.lock")
+    lock = acquire_process_lock(path)
+    assert lock is not None
+    other = subprocess.run(
+        [sys.executable, "-c", f"from telemetry import acquire_process_lock; print(acquire_process_lock({path!r}))"],
+        capture_output=True, text=True, check=True, env={**os.environ, "PYTHONPATH": REPO_ROOT})
+    assert other.stdout.strip() == "None"
+    lock.close()
+    again = acquire_process_lock(path)
+    assert again is not None
+    again.close()
+
+
+HOUR = 3600
+DAY = 86400
+START = 1_767_225_600  # 2026-01-01T00:00:00Z
+
+
+@pytest.fixture
+def store(tmp_path):
+    path = str(tmp_path / "telemetry.db")
+    conn = sqlite3.connect(path)
+    apply_migrations(conn)
+    conn.close()
+    return TelemetryStore(lambda: sqlite3.connect(path))
+
+
+def test_timestamps_accept_epoch_iso_and_datetimes():
+    assert to_timestamp(START) == START
+    assert to_timestamp(str(START)) == START
+    assert to_timestamp("2026-01-01T00:00:00Z") == START
+    assert to_timestamp("2026-01-01T01:00:00+01:00") == START
+    with pytest.raises(ValueError):
+        to_timestamp("yesterday")
+
+
+def test_resolution_follows_the_span():
+    assert pick_resolution(START, START + HOUR) == "raw"
+    assert pick_resolution(START, START + 7 * DAY) == "hour"
+    assert pick_resolution(START, START + 90 * DAY) == "day"
+
+
+def test_rollups_match_the_raw_samples(store):
+    # One sample every 10 minutes for two days, for two vessels
+    samples = [(vessel, START + i * 600, 50.0 + i % 6, 100.0 + i % 6)
+               for vessel in ("Vessel A", "Vessel B") for i in range(2 * 24 * 6)]
+    assert store.append(samples) == len(samples)
+    hourly = store.series("Vessel A", START, START + 2 * DAY - 1, resolution="hour")
+    assert len(hourly["bucket"]) == 48
+    assert hourly["samples"] == [6] * 48
+    assert hourly["fuel_min"][0] == 50.0 and hourly["fuel_max"][0] == 55.0
+    assert hourly["fuel_avg"][0] == pytest.approx(52.5)
+    daily = store.series("Vessel A", START, START + 2 * DAY - 1, resolution="day")
+    assert daily["bucket"] == [START, START + DAY]
+    assert sum(daily["fuel_sum"]) == pytest.approx(sum(fuel for vessel, _, fuel, _ in samples if vessel == "Vessel A"))
+    fleet = store.series(None, START, START + 2 * DAY - 1, resolution="day")
+    assert fleet["samples"] == [288, 288]
+
+
+def test_repeated_samples_are_not_counted_twice(store):
+    samples = [("Vessel A", START + i * 60, 50.0, 100.0) for i in range(10)]
+    store.append(samples)
+    assert store.append(samples[5:] + [("Vessel A", START + 600, 50.0, 100.0)]) == 1
+    assert store.series("Vessel A", START, START + HOUR - 1, resolution="hour")["samples"] == [11]
+    raw = store.series("Vessel A", START, START + HOUR, resolution="raw")
+    assert len(raw["ts"]) == 11 and raw["ts"] == sorted(raw["ts"])
+
+
+def test_totals_combine_daily_and_hourly_buckets(store):
+    samples = [("Vessel A", START + i * HOUR, 10.0, 20.0) for i in range(3 * 24)]
+    store.append(samples)
+    # From 06:00 on day one to 17:59 on day three: 18 + 24 + 18 hours
+    totals = store.totals(START + 6 * HOUR, START + 2 * DAY + 18 * HOUR - 1, vessel_name="Vessel A")
+    assert totals["samples"] == 60
+    assert totals["fuel_consumption"] == 600.0
+    assert totals["avg_emissions"] == 20.0
+    assert store.totals()["samples"] == 72
+
+
+def test_raw_fleet_queries_and_unknown_resolutions_are_rejected(store):
+    with pytest.raises(ValueError):
+        store.series(None, START, START + HOUR, resolution="raw")
+    with pytest.raises(ValueError):
+        store.series("Vessel A", START, START + HOUR, resolution="minute")
+    with pytest.raises(ValueError):
+        store.append([("", START, 1.0, 1.0)])